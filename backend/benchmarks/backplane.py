@@ -0,0 +1,284 @@
+"""Cross-process delivery through the SQLite and Redis backplanes.
+
+Runs two worker processes per backend, each holding one backplane (the way
+two uvicorn workers would) and driven over stdin/stdout:
+
+  sqlite — both workers share a throwaway event database
+  redis  — both workers talk to a minimal RESP stub started here (AUTH,
+           SUBSCRIBE, PUBLISH), so no Redis server is needed
+
+For each backend, worker A publishes --events frames and then worker B
+publishes as many. Every frame has to reach the other worker exactly once and
+in order, and a worker must never get its own frames back (origin
+de-duplication). Publish-to-delivery latency is reported as p50/p95.
+
+Then, per backend:
+
+  redis  — the stub drops every subscriber connection; both workers must
+           resubscribe and deliver the next round of frames
+  sqlite — a third worker joins late; it must not replay older events but
+           must receive new ones
+
+The exit status is non-zero if a check fails.
+
+Usage (from backend/):
+    python -m benchmarks.backplane --events 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.upload_memory import BACKEND_DIR, free_port
+
+sys.path.insert(0, BACKEND_DIR)
+
+from services.backplane import _encode_resp, _read_resp  # noqa: E402
+
+
+def _bulk(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return f"${len(data)}\r\n".encode() + data + b"\r\n"
+
+
+class RespStub:
+    """Just enough of Redis for the backplane: AUTH, SUBSCRIBE and PUBLISH."""
+
+    def __init__(self, password: str):
+        self.password = password
+        self.subscribers: dict[str, set[asyncio.StreamWriter]] = {}
+        self.subscriptions = 0
+        self.server: asyncio.base_events.Server | None = None
+
+    async def start(self, port: int):
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", port)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        authed = not self.password
+        try:
+            while True:
+                command = await _read_resp(reader)
+                name, args = command[0].upper(), command[1:]
+                if name == "AUTH":
+                    authed = args[-1] == self.password
+                    writer.write(b"+OK\r\n" if authed else b"-WRONGPASS invalid password\r\n")
+                elif not authed:
+                    writer.write(b"-NOAUTH Authentication required.\r\n")
+                elif name == "SUBSCRIBE":
+                    for channel in args:
+                        self.subscribers.setdefault(channel, set()).add(writer)
+                        self.subscriptions += 1
+                        writer.write(b"*3\r\n" + _bulk("subscribe") + _bulk(channel) + b":1\r\n")
+                elif name == "PUBLISH":
+                    channel, message = args
+                    receivers = list(self.subscribers.get(channel, ()))
+                    for subscriber in receivers:
+                        subscriber.write(_encode_resp("message", channel, message))
+                    writer.write(f":{len(receivers)}\r\n".encode())
+                else:
+                    writer.write(f"-ERR unknown command '{name}'\r\n".encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for subscribers in self.subscribers.values():
+                subscribers.discard(writer)
+            writer.close()
+
+    def drop_subscribers(self):
+        for subscribers in self.subscribers.values():
+            for writer in subscribers:
+                writer.transport.abort()
+            subscribers.clear()
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+# -- Worker process --
+
+async def worker(kind: str):
+    from services.backplane import create_backplane
+
+    def emit(event: dict):
+        sys.stdout.write(json.dumps(event) + "\n")
+        sys.stdout.flush()
+
+    backplane = create_backplane(kind)
+    await backplane.start(lambda conversation_id, frame: emit(
+        {"event": "received", "conversation_id": conversation_id, "frame": frame},
+    ))
+    emit({"event": "ready", "origin": backplane.origin})
+    loop = asyncio.get_running_loop()
+    while line := await loop.run_in_executor(None, sys.stdin.readline):
+        command = json.loads(line)
+        if "publish" in command:
+            await backplane.publish(*command["publish"])
+        elif "stats" in command:
+            emit({"event": "stats", **backplane.get_stats()})
+    await backplane.stop()
+
+
+# -- Driver --
+
+class Worker:
+    def __init__(self, name: str, kind: str, env: dict):
+        self.name, self.kind, self.env = name, kind, env
+        self.received: list[tuple[str, float]] = []
+        self.stats: asyncio.Future | None = None
+        self._ready = asyncio.Event()
+
+    async def start(self, timeout: float = 10):
+        self.proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "benchmarks.backplane", "--worker", self.kind,
+            cwd=BACKEND_DIR, env={**os.environ, **self.env},
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+        )
+        self._reader = asyncio.create_task(self._read())
+        await asyncio.wait_for(self._ready.wait(), timeout)
+
+    async def _read(self):
+        while line := await self.proc.stdout.readline():
+            event = json.loads(line)
+            if event["event"] == "ready":
+                self._ready.set()
+            elif event["event"] == "received":
+                self.received.append((event["frame"], time.perf_counter()))
+            elif event.pop("event") == "stats" and self.stats is not None:
+                self.stats.set_result(event)
+
+    def send(self, command: dict):
+        self.proc.stdin.write((json.dumps(command) + "\n").encode())
+
+    async def get_stats(self) -> dict:
+        self.stats = asyncio.get_running_loop().create_future()
+        self.send({"stats": True})
+        await self.proc.stdin.drain()
+        return await asyncio.wait_for(self.stats, 5)
+
+    async def stop(self):
+        self.proc.stdin.close()
+        try:
+            await asyncio.wait_for(self.proc.wait(), 5)
+        except asyncio.TimeoutError:
+            self.proc.kill()
+            await self.proc.wait()
+        await self._reader
+
+
+async def wait_for(condition, timeout: float) -> bool:
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+async def send_round(sender: Worker, receivers: list[Worker], tag: str, n: int, interval: float) -> dict:
+    """Publish n frames from sender; check each receiver gets them once, in order."""
+    frames = [f"{tag}-{i}" for i in range(n)]
+    sent_at = {}
+    starts = {w.name: len(w.received) for w in [sender, *receivers]}
+    for frame in frames:
+        sent_at[frame] = time.perf_counter()
+        sender.send({"publish": ["conv-1", frame]})
+        await sender.proc.stdin.drain()
+        await asyncio.sleep(interval)
+    await wait_for(lambda: all(len(w.received) - starts[w.name] >= n for w in receivers), 10)
+    # Give stray duplicates or echoes a moment to show up
+    await asyncio.sleep(0.3)
+
+    latencies, in_order = [], True
+    for w in receivers:
+        got = [frame for frame, _ in w.received[starts[w.name]:]]
+        in_order = in_order and got == frames
+        latencies += [(at - sent_at[frame]) * 1000 for frame, at in w.received[starts[w.name]:] if frame in sent_at]
+    echoes = len(sender.received) - starts[sender.name]
+    return {
+        "sender": sender.name,
+        "frames": n,
+        "delivered_in_order": in_order,
+        "echoes_to_sender": echoes,
+        "p50_ms": round(statistics.median(latencies), 2) if latencies else None,
+        "p95_ms": round(sorted(latencies)[int(len(latencies) * 0.95) - 1], 2) if latencies else None,
+        "ok": in_order and echoes == 0,
+    }
+
+
+async def run_backend(kind: str, args) -> dict:
+    stub = None
+    env = {"BROADCAST_BACKPLANE": kind, "BACKPLANE_POLL_MS": str(args.poll_ms)}
+    tmp = tempfile.TemporaryDirectory()
+    if kind == "redis":
+        port = free_port()
+        stub = RespStub(password="secret")
+        await stub.start(port)
+        env["REDIS_URL"] = f"redis://:secret@127.0.0.1:{port}/0"
+    else:
+        env["BACKPLANE_SQLITE_PATH"] = os.path.join(tmp.name, "backplane.db")
+
+    a, b = Worker("a", kind, env), Worker("b", kind, env)
+    workers = [a, b]
+    result = {"backend": kind}
+    try:
+        await a.start()
+        await b.start()
+        result["a_to_b"] = await send_round(a, [b], "a", args.events, args.interval_ms / 1000)
+        result["b_to_a"] = await send_round(b, [a], "b", args.events, args.interval_ms / 1000)
+        checks = [result["a_to_b"]["ok"], result["b_to_a"]["ok"]]
+
+        if kind == "redis":
+            before = stub.subscriptions
+            stub.drop_subscribers()
+            resubscribed = await wait_for(lambda: stub.subscriptions >= before + 2, 10)
+            result["reconnect"] = {
+                "resubscribed": resubscribed,
+                **await send_round(a, [b], "after-drop", args.events // 4 or 1, args.interval_ms / 1000),
+            }
+            checks.append(resubscribed and result["reconnect"]["ok"])
+        else:
+            late = Worker("late", kind, env)
+            workers.append(late)
+            await late.start()
+            result["late_joiner"] = await send_round(a, [b, late], "late", args.events // 4 or 1,
+                                                     args.interval_ms / 1000)
+            checks.append(result["late_joiner"]["ok"])
+
+        result["worker_stats"] = {w.name: await w.get_stats() for w in workers}
+        result["ok"] = all(checks)
+    finally:
+        for w in workers:
+            if hasattr(w, "proc"):
+                await w.stop()
+        if stub is not None:
+            await stub.stop()
+        tmp.cleanup()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200, help="frames per direction")
+    parser.add_argument("--interval-ms", type=float, default=2, help="pause between published frames")
+    parser.add_argument("--poll-ms", type=int, default=20, help="BACKPLANE_POLL_MS for the sqlite workers")
+    parser.add_argument("--backends", nargs="+", default=["sqlite", "redis"], choices=["sqlite", "redis"])
+    parser.add_argument("--worker", choices=["sqlite", "redis"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        asyncio.run(worker(args.worker))
+        return
+
+    results = [asyncio.run(run_backend(kind, args)) for kind in args.backends]
+    print(json.dumps({"benchmark": "backplane", "params": vars(args), "results": results}, indent=2))
+    sys.exit(0 if all(r["ok"] for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Translating a questionnaire: one request per item vs translate_batch.
+
+Starts the mock Groq server (benchmarks.mock_groq) and translates the same
+set of questions into several languages three ways, with the cache off:
+
+  sequential — translate_text for each (text, target) in turn
+  concurrent — translate_text for every item at once (asyncio.gather)
+  batch      — translate_batch, packing items per language pair
+
+Usage (from backend/):
+    python -m benchmarks.batch_translation --questions 40 --languages es,fr,hi
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.live_transcription import wait_port
+from benchmarks.upload_memory import BACKEND_DIR, free_port
+
+
+async def run(args) -> list[dict]:
+    # Imported late so GROQ_API_BASE and the cache switch are already in the environment
+    from services import grok_service, http_client
+
+    items = [
+        (f"Question {i}: have you had any fever, cough or chest pain in the last {i + 1} days?", "en", lang)
+        for lang in args.languages.split(",")
+        for i in range(args.questions)
+    ]
+    await http_client.start_client()
+    results = []
+    try:
+        started = time.perf_counter()
+        for text, source, target in items:
+            await grok_service.translate_text(text, source, target)
+        results.append({"mode": "sequential", "upstream_requests": len(items)})
+        results[-1]["wall_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(grok_service.translate_text(*item) for item in items))
+        results.append({"mode": "concurrent", "upstream_requests": len(items)})
+        results[-1]["wall_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+        stats: dict = {}
+        started = time.perf_counter()
+        await grok_service.translate_batch(items, stats)
+        results.append({"mode": "batch", "upstream_requests": stats["upstream_requests"]})
+        results[-1]["wall_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    finally:
+        await http_client.close_client()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--languages", default="es,fr,hi")
+    parser.add_argument("--translate-ms", type=float, default=300, help="mock completion base latency")
+    args = parser.parse_args()
+
+    port = free_port()
+    os.environ.update(
+        GROQ_API_BASE=f"http://127.0.0.1:{port}/openai/v1",
+        GROQ_API_KEY="mock",
+        TRANSLATION_CACHE_ENABLED="false",
+    )
+    sys.path.insert(0, BACKEND_DIR)
+    mock = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_groq", "--port", str(port), "--translate-ms", str(args.translate_ms)],
+        cwd=BACKEND_DIR,
+    )
+    try:
+        asyncio.run(wait_port(f"http://127.0.0.1:{port}/calls"))
+        results = asyncio.run(run(args))
+    finally:
+        mock.terminate()
+        mock.wait()
+    print(json.dumps({"benchmark": "batch_translation", "params": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Duplicate upstream requests with and without single-flight coalescing.
+
+Starts the mock Groq server (benchmarks.mock_groq) and, with the translation
+cache off, fires bursts of identical calls the way retrying clients and
+several staff opening the same summary do:
+
+  translate — --duplicates concurrent translate_text calls for each of
+              --texts distinct messages
+  summary   — --duplicates concurrent summarize_conversation calls
+  errors    — identical calls while the upstream answers 400: every caller
+              gets the failure from a single upstream request
+  cancel    — the first caller is cancelled; the others still get the result,
+              and cancelling all of them abandons the shared call
+
+Each scenario reports upstream requests seen by the stub; the exit status is
+non-zero if a correctness check fails.
+
+Usage (from backend/):
+    python -m benchmarks.coalescing --duplicates 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.live_transcription import wait_port
+from benchmarks.upload_memory import BACKEND_DIR, free_port
+from benchmarks.upstream_faults import set_faults, upstream_calls
+
+FAILED_PREFIX = "[Translation failed]"
+
+
+async def run(mock: str, args) -> list[dict]:
+    # Imported late so GROQ_API_BASE and the cache switch are already in the environment
+    from services import grok_service, http_client
+
+    transcript = [
+        {"role": "doctor" if i % 2 else "patient", "original_text": f"Line {i}: my chest hurts since {i} days"}
+        for i in range(12)
+    ]
+
+    async def burst(name: str, calls) -> dict:
+        before = await upstream_calls(mock)
+        started = time.perf_counter()
+        results = await asyncio.gather(*(call() for call in calls))
+        after = await upstream_calls(mock)
+        return {
+            "scenario": name,
+            "callers": len(calls),
+            "upstream_requests": after["chat"] + after["failed"] - before["chat"] - before["failed"],
+            "wall_ms": round((time.perf_counter() - started) * 1000, 1),
+            "results": results,
+        }
+
+    def translate(i: int):
+        return lambda: grok_service.translate_text(f"Message {i}: take two tablets daily", "en", "es")
+
+    await http_client.start_client()
+    out = []
+    try:
+        r = await burst("translate", [translate(i) for i in range(args.texts) for _ in range(args.duplicates)])
+        r["ok"] = not any(t.startswith(FAILED_PREFIX) for t in r.pop("results"))
+        out.append(r)
+
+        r = await burst("summary", [lambda: grok_service.summarize_conversation(transcript)] * args.duplicates)
+        r["ok"] = len(set(r.pop("results"))) == 1
+        out.append(r)
+
+        await set_faults(mock, fail_rate=1.0, status=400, retry_after=None)
+        r = await burst("errors", [translate(-1)] * args.duplicates)
+        r["ok"] = all(t.startswith(FAILED_PREFIX) for t in r.pop("results")) and r["upstream_requests"] == 1
+        out.append(r)
+        await set_faults(mock, fail_rate=0.0)
+
+        before = await upstream_calls(mock)
+        tasks = [asyncio.create_task(translate(-2)()) for _ in range(args.duplicates)]
+        await asyncio.sleep(0.01)
+        tasks[0].cancel()
+        rest = await asyncio.gather(*tasks[1:])
+        abandoned = http_client.get_pool_stats()["coalescing"]["abandoned"]
+        orphans = [asyncio.create_task(translate(-3)()) for _ in range(args.duplicates)]
+        await asyncio.sleep(0.01)
+        for task in orphans:
+            task.cancel()
+        await asyncio.gather(*orphans, return_exceptions=True)
+        after = await upstream_calls(mock)
+        stats = http_client.get_pool_stats()["coalescing"]
+        out.append({
+            "scenario": "cancel",
+            "ok": tasks[0].cancelled() and not any(t.startswith(FAILED_PREFIX) for t in rest)
+            and stats["abandoned"] == abandoned + 1 and stats["in_flight"] == 0,
+            "upstream_requests": after["chat"] - before["chat"],
+            "coalescing": stats,
+        })
+    finally:
+        await http_client.close_client()
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=20)
+    parser.add_argument("--duplicates", type=int, default=3, help="identical concurrent callers per request")
+    parser.add_argument("--translate-ms", type=float, default=200, help="mock completion base latency")
+    parser.add_argument("--no-coalesce", action="store_true", help="run with UPSTREAM_COALESCE_ENABLED=false")
+    args = parser.parse_args()
+
+    port = free_port()
+    mock = f"http://127.0.0.1:{port}"
+    os.environ.update(
+        GROQ_API_BASE=f"{mock}/openai/v1",
+        GROQ_API_KEY="mock",
+        TRANSLATION_CACHE_ENABLED="false",
+        UPSTREAM_COALESCE_ENABLED="false" if args.no_coalesce else "true",
+        UPSTREAM_RATE_CHAT="0",
+    )
+    sys.path.insert(0, BACKEND_DIR)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_groq", "--port", str(port), "--translate-ms", str(args.translate_ms)],
+        cwd=BACKEND_DIR,
+    )
+    try:
+        asyncio.run(wait_port(f"{mock}/calls"))
+        results = asyncio.run(run(mock, args))
+    finally:
+        server.terminate()
+        server.wait()
+    print(json.dumps({"benchmark": "coalescing", "params": vars(args), "results": results}, indent=2))
+    sys.exit(0 if args.no_coalesce or all(r["ok"] for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
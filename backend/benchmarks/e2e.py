@@ -0,0 +1,302 @@
+"""End-to-end load test of the API against a local Groq stand-in.
+
+Starts the mock Groq server (benchmarks.mock_groq) and the API under uvicorn
+with a throwaway database, seeds a few conversations, then runs a mixed
+workload for --duration seconds:
+
+  --users virtual users, each picking operations by weight (--mix):
+    text     — POST /api/messages with typed text
+    voice    — POST /api/audio/upload, then POST /api/messages with the audio
+    history  — GET /api/conversations/{id}/messages
+    search   — GET /api/conversations/search
+    summary  — POST /api/conversations/{id}/summary
+  --listeners WebSocket listeners per conversation, measuring how long after
+  the send request started each new message reaches them ("ws delivery")
+
+Reports count, errors, requests/sec and p50/p95/p99 latency per endpoint as
+JSON. Save a run with --out and diff a later one against it with --compare;
+the comparison gives the relative change of each rate and latency.
+
+Usage (from backend/):
+    python -m benchmarks.e2e --duration 30 --users 16 --out baseline.json
+    python -m benchmarks.e2e --duration 30 --users 16 --compare baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import websockets
+
+from benchmarks.live_transcription import utterance_segments, wait_port
+from benchmarks.upload_memory import BACKEND_DIR, UPLOAD_DIR, free_port, wait_ready
+from benchmarks.ws_turn_latency import percentile
+
+PHRASES = [
+    "Do you have any allergies to medication?",
+    "I have had a headache for three days.",
+    "Please take this twice a day after meals.",
+    "When did the pain start?",
+    "My chest feels tight when I climb stairs.",
+    "We will run a blood test today.",
+]
+SEARCH_TERMS = ["headache", "pain", "blood test", "allergies", "chest", "meals"]
+DEFAULT_MIX = "text=45,voice=10,history=30,search=10,summary=5"
+MARKER = re.compile(r"#bench(\d+)")
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    def add(self, endpoint: str, ms: float, ok: bool = True):
+        self.samples.setdefault(endpoint, []).append(ms)
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self, elapsed: float) -> dict:
+        return {
+            endpoint: {
+                "count": len(values),
+                "errors": self.errors.get(endpoint, 0),
+                "rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50), 2),
+                "p95_ms": round(percentile(values, 95), 2),
+                "p99_ms": round(percentile(values, 99), 2),
+                "mean_ms": round(statistics.fmean(values), 2),
+                "max_ms": round(max(values), 2),
+            }
+            for endpoint, values in sorted(self.samples.items())
+        }
+
+
+async def timed(recorder: Recorder, endpoint: str, request) -> httpx.Response | None:
+    started = time.perf_counter()
+    try:
+        response = await request
+    except httpx.HTTPError:
+        recorder.add(endpoint, (time.perf_counter() - started) * 1000, ok=False)
+        return None
+    recorder.add(endpoint, (time.perf_counter() - started) * 1000, ok=response.status_code < 400)
+    return response
+
+
+class Workload:
+    def __init__(self, client: httpx.AsyncClient, base: str, conversations: list[str], args):
+        self.client = client
+        self.base = base
+        self.conversations = conversations
+        self.args = args
+        self.recorder = Recorder()
+        self.sent: dict[int, float] = {}
+        self.seq = 0
+        self.audio = b"".join(utterance_segments(args.voice_seconds, args.voice_seconds))
+        self.ops = {"text": self.text, "voice": self.voice, "history": self.history,
+                    "search": self.search, "summary": self.summary}
+
+    def _message_text(self, rng: random.Random) -> str:
+        self.seq += 1
+        self.sent[self.seq] = time.perf_counter()
+        return f"{rng.choice(PHRASES)} #bench{self.seq}"
+
+    async def text(self, rng: random.Random, cid: str):
+        await timed(self.recorder, "POST /api/messages (text)", self.client.post(f"{self.base}/api/messages", json={
+            "conversation_id": cid, "role": rng.choice(["doctor", "patient"]), "text": self._message_text(rng),
+        }))
+
+    async def voice(self, rng: random.Random, cid: str):
+        r = await timed(self.recorder, "POST /api/audio/upload", self.client.post(
+            f"{self.base}/api/audio/upload", content=self.audio, headers={"content-type": "audio/webm"},
+        ))
+        if r is None or r.status_code >= 400:
+            return
+        await timed(self.recorder, "POST /api/messages (voice)", self.client.post(f"{self.base}/api/messages", json={
+            "conversation_id": cid, "role": rng.choice(["doctor", "patient"]), "audio_url": r.json()["url"],
+        }))
+
+    async def history(self, rng: random.Random, cid: str):
+        await timed(self.recorder, "GET /api/conversations/{id}/messages",
+                    self.client.get(f"{self.base}/api/conversations/{cid}/messages", params={"limit": 50}))
+
+    async def search(self, rng: random.Random, cid: str):
+        await timed(self.recorder, "GET /api/conversations/search",
+                    self.client.get(f"{self.base}/api/conversations/search", params={"q": rng.choice(SEARCH_TERMS)}))
+
+    async def summary(self, rng: random.Random, cid: str):
+        await timed(self.recorder, "POST /api/conversations/{id}/summary",
+                    self.client.post(f"{self.base}/api/conversations/{cid}/summary"))
+
+    async def user(self, index: int, mix: dict[str, float], deadline: float):
+        rng = random.Random(self.args.seed + index)
+        names, weights = list(mix), list(mix.values())
+        while time.perf_counter() < deadline:
+            op = rng.choices(names, weights)[0]
+            await self.ops[op](rng, rng.choice(self.conversations))
+            if self.args.think_ms:
+                await asyncio.sleep(rng.uniform(0, 2 * self.args.think_ms) / 1000)
+
+    async def listener(self, cid: str, stop: asyncio.Event):
+        url = self.base.replace("http", "ws", 1) + f"/api/ws/{cid}"
+        async with websockets.connect(url, max_size=None) as ws:
+            while not stop.is_set():
+                try:
+                    frame = json.loads(await asyncio.wait_for(ws.recv(), 0.5))
+                except asyncio.TimeoutError:
+                    continue
+                if "type" in frame:
+                    continue
+                match = MARKER.search(frame.get("original_text", ""))
+                if match and int(match.group(1)) in self.sent:
+                    self.recorder.add("ws delivery", (time.perf_counter() - self.sent[int(match.group(1))]) * 1000)
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+async def run(base: str, mock: str, args) -> dict:
+    mix = parse_mix(args.mix)
+    async with httpx.AsyncClient(timeout=120, limits=httpx.Limits(max_connections=args.users * 2)) as client:
+        conversations = []
+        for i in range(args.conversations):
+            r = await client.post(f"{base}/api/conversations", json={
+                "title": f"Benchmark {i}", "doctor_language": "en", "patient_language": "es",
+            })
+            r.raise_for_status()
+            conversations.append(r.json()["id"])
+        workload = Workload(client, base, conversations, args)
+        seed_rng = random.Random(args.seed)
+        for cid in conversations:
+            for _ in range(args.seed_messages):
+                await workload.text(seed_rng, cid)
+        workload.recorder = Recorder()
+        calls_before = (await client.get(f"{mock}/calls")).json()
+
+        stop = asyncio.Event()
+        listeners = [asyncio.create_task(workload.listener(cid, stop))
+                     for cid in conversations for _ in range(args.listeners)]
+        await asyncio.sleep(0.2)  # let listeners subscribe
+        started = time.perf_counter()
+        await asyncio.gather(*(workload.user(i, mix, started + args.duration) for i in range(args.users)))
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0.5)  # last deliveries
+        stop.set()
+        await asyncio.gather(*listeners, return_exceptions=True)
+
+        calls_after = (await client.get(f"{mock}/calls")).json()
+        upstream = (await client.get(f"{base}/health/upstream")).json()
+        for cid in conversations:
+            await client.delete(f"{base}/api/conversations/{cid}")
+
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "endpoints": workload.recorder.report(elapsed),
+        "upstream_calls": {k: calls_after[k] - calls_before.get(k, 0) for k in calls_after},
+        "upstream_pool": {k: upstream.get(k) for k in ("requests", "errors", "peak_in_flight", "avg_latency_ms")},
+    }
+
+
+def compare(current: dict, baseline: dict) -> dict:
+    """Relative change of rate and latencies per endpoint (positive means higher than
+    the baseline), and the absolute change in error count."""
+    diff = {}
+    for endpoint, metrics in current["endpoints"].items():
+        before = baseline.get("results", {}).get("endpoints", {}).get(endpoint)
+        if not before:
+            continue
+        diff[endpoint] = {
+            key: round((metrics[key] - before[key]) / before[key], 3) if before[key] else None
+            for key in ("rps", "p50_ms", "p95_ms", "p99_ms")
+        }
+        diff[endpoint]["errors"] = metrics["errors"] - before["errors"]
+    return diff
+
+
+async def main_async(args):
+    mock_port, api_port = free_port(), free_port()
+    base, mock = f"http://127.0.0.1:{api_port}", f"http://127.0.0.1:{mock_port}"
+    existing_uploads = set(os.listdir(UPLOAD_DIR)) if os.path.isdir(UPLOAD_DIR) else set()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "GROQ_API_BASE": f"{mock}/openai/v1",
+            "GROQ_API_KEY": "mock",
+            "DATABASE_PATH": os.path.join(tmp, "bench.db"),
+            "BACKPLANE_SQLITE_PATH": os.path.join(tmp, "backplane.db"),
+            "TRANSLATION_CACHE_PATH": os.path.join(tmp, "translation_cache.db"),
+        }
+        if args.no_cache:
+            env["TRANSLATION_CACHE_ENABLED"] = "false"
+        mock_server = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.mock_groq", "--port", str(mock_port),
+             "--translate-ms", str(args.translate_ms), "--transcribe-ms", str(args.transcribe_ms),
+             "--tts-ms", str(args.tts_ms), "--jitter-ms", str(args.jitter_ms),
+             "--fail-rate", str(args.fail_rate), "--fail-status", str(args.fail_status)],
+            cwd=BACKEND_DIR, env=env,
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(api_port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL,
+        )
+        try:
+            await wait_port(f"{mock}/calls")
+            await wait_ready(base)
+            results = await run(base, mock, args)
+        finally:
+            for proc in (server, mock_server):
+                proc.terminate()
+                proc.wait()
+            # Uploaded recordings and synthesized audio from this run
+            if os.path.isdir(UPLOAD_DIR):
+                for name in set(os.listdir(UPLOAD_DIR)) - existing_uploads:
+                    os.remove(os.path.join(UPLOAD_DIR, name))
+
+    report = {"benchmark": "e2e", "params": vars(args), "results": results}
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(results, json.load(f))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load")
+    parser.add_argument("--users", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--think-ms", type=float, default=100, help="mean pause between a user's operations")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation weights")
+    parser.add_argument("--conversations", type=int, default=8)
+    parser.add_argument("--seed-messages", type=int, default=20, help="messages per conversation before the run")
+    parser.add_argument("--listeners", type=int, default=2, help="WebSocket listeners per conversation")
+    parser.add_argument("--voice-seconds", type=float, default=6, help="length of each voice message")
+    parser.add_argument("--translate-ms", type=float, default=150, help="mock completion base latency")
+    parser.add_argument("--transcribe-ms", type=float, default=300, help="mock Whisper base latency")
+    parser.add_argument("--tts-ms", type=float, default=200, help="mock speech latency")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="extra random mock latency, 0..N ms")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of mock responses that fail")
+    parser.add_argument("--fail-status", type=int, default=503)
+    parser.add_argument("--no-cache", action="store_true", help="disable the translation cache")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="also write the report to this file")
+    parser.add_argument("--compare", help="baseline report to diff against")
+    parser.add_argument("--verbose", action="store_true", help="show server logs")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
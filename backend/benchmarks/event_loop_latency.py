@@ -0,0 +1,154 @@
+"""Event-loop latency under mixed DB and upstream load: sync vs async sessions.
+
+Runs the same workload twice against a throwaway SQLite database:
+
+  sync   — blocking SessionLocal queries inside async coroutines (the old handlers)
+  async  — AsyncSession queries over aiosqlite (the current handlers)
+
+Each worker loads a conversation's history, counts its messages and then awaits
+a simulated upstream call. A probe coroutine measures how late the event loop
+wakes it up; that lag is what every WebSocket and upstream call in flight sees.
+
+Usage (from backend/):
+    python -m benchmarks.event_loop_latency --workers 50 --iterations 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, select  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.pool import AsyncAdaptedQueuePool  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database import Base  # noqa: E402
+from models import Conversation, Message  # noqa: E402
+
+
+def seed(path: str, conversations: int, messages_per: int) -> list[str]:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    ids = []
+    with Session() as db:
+        for i in range(conversations):
+            conv = Conversation(title=f"Bench {i}")
+            db.add(conv)
+            db.flush()
+            ids.append(conv.id)
+            for j in range(messages_per):
+                db.add(Message(
+                    conversation_id=conv.id,
+                    role="doctor" if j % 2 else "patient",
+                    original_text=f"Message {j} " * 20,
+                    translated_text=f"Mensaje {j} " * 20,
+                ))
+        db.commit()
+    engine.dispose()
+    return ids
+
+
+async def probe(stop: asyncio.Event, interval: float, lags: list[float]):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - started - interval) * 1000)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(mode: str, path: str, conv_ids: list[str], args) -> dict:
+    lags: list[float] = []
+    stop = asyncio.Event()
+
+    if mode == "sync":
+        engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+        Session = sessionmaker(bind=engine)
+
+        async def db_work(conv_id: str):
+            db = Session()
+            try:
+                db.query(Message).filter(Message.conversation_id == conv_id).order_by(Message.timestamp.asc()).all()
+                db.query(Message).filter(Message.conversation_id == conv_id).count()
+            finally:
+                db.close()
+    else:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool)
+        Session = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def db_work(conv_id: str):
+            async with Session() as db:
+                (await db.execute(
+                    select(Message).where(Message.conversation_id == conv_id).order_by(Message.timestamp.asc())
+                )).scalars().all()
+                (await db.execute(
+                    select(func.count()).select_from(Message).where(Message.conversation_id == conv_id)
+                )).scalar_one()
+
+    async def worker():
+        for _ in range(args.iterations):
+            await db_work(random.choice(conv_ids))
+            await asyncio.sleep(args.upstream_ms / 1000)
+
+    probe_task = asyncio.create_task(probe(stop, args.probe_ms / 1000, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.workers)))
+    wall = time.perf_counter() - started
+    stop.set()
+    await probe_task
+
+    if mode == "sync":
+        engine.dispose()
+    else:
+        await engine.dispose()
+
+    ops = args.workers * args.iterations
+    return {
+        "mode": mode,
+        "operations": ops,
+        "wall_seconds": round(wall, 3),
+        "ops_per_second": round(ops / wall, 1),
+        "loop_lag_ms": {
+            "p50": round(percentile(lags, 50), 2),
+            "p95": round(percentile(lags, 95), 2),
+            "p99": round(percentile(lags, 99), 2),
+            "max": round(max(lags), 2) if lags else 0.0,
+            "mean": round(statistics.fmean(lags), 2) if lags else 0.0,
+            "samples": len(lags),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=200, help="messages per conversation")
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--upstream-ms", type=float, default=20, help="simulated upstream latency")
+    parser.add_argument("--probe-ms", type=float, default=5, help="event-loop probe interval")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        conv_ids = seed(path, args.conversations, args.messages)
+        results = [asyncio.run(run(mode, path, conv_ids, args)) for mode in ("sync", "async")]
+
+    print(json.dumps({"benchmark": "event_loop_latency", "params": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""End-of-speech to translated message: whole-file upload vs live segments.
+
+Starts the mock Groq server (benchmarks.mock_groq) and the API under uvicorn,
+with the translation cache off, then replays the same utterance two ways:
+
+  batch — after recording, upload the file and POST /api/messages with its
+          audio_url (transcription of the whole file, then translation)
+  live  — stream self-contained segments over /api/ws/{id}/audio while
+          "recording" in real time, then upload the full file and send stop
+
+The mock transcriber returns the uploaded bytes as text, so each segment
+carries a slice of the utterance padded to a realistic audio size. Reported
+latency runs from the end of speech until the message (the ack in live mode)
+arrives.
+
+Usage (from backend/):
+    python -m benchmarks.live_transcription --seconds 12 --segment-seconds 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+import websockets
+
+from benchmarks.upload_memory import BACKEND_DIR, UPLOAD_DIR, free_port, wait_ready
+
+WORDS_PER_SECOND = 2.5
+# Roughly 32 kbit/s Opus in WebM
+AUDIO_BYTES_PER_SECOND = 4000
+
+
+def utterance_segments(seconds: float, segment_seconds: float) -> list[bytes]:
+    """Audio stand-ins: each segment's words padded with spaces to its audio size."""
+    segments = []
+    word = 0
+    elapsed = 0.0
+    while elapsed < seconds:
+        length = min(segment_seconds, seconds - elapsed)
+        count = max(1, round(length * WORDS_PER_SECOND))
+        text = " ".join(f"word{word + i}" for i in range(count))
+        word += count
+        size = int(length * AUDIO_BYTES_PER_SECOND)
+        segments.append(text.encode().ljust(size, b" "))
+        elapsed += length
+    return segments
+
+
+async def wait_port(url: str):
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not start")
+
+
+async def upload(client: httpx.AsyncClient, base: str, segments: list[bytes], uploaded: list[str]) -> str:
+    r = await client.post(f"{base}/api/audio/upload", content=b"".join(segments),
+                          headers={"content-type": "audio/webm"})
+    r.raise_for_status()
+    uploaded.append(r.json()["filename"])
+    return r.json()["url"]
+
+
+async def batch_run(client: httpx.AsyncClient, base: str, conversation_id: str, segments: list[bytes],
+                    args, uploaded: list[str]) -> float:
+    await asyncio.sleep(args.seconds)  # recording
+    stopped = time.perf_counter()
+    audio_url = await upload(client, base, segments, uploaded)
+    r = await client.post(f"{base}/api/messages", json={
+        "conversation_id": conversation_id, "role": "doctor", "audio_url": audio_url, "pipelined": True,
+    })
+    r.raise_for_status()
+    return (time.perf_counter() - stopped) * 1000
+
+
+async def live_run(client: httpx.AsyncClient, base: str, conversation_id: str, segments: list[bytes],
+                   args, uploaded: list[str]) -> tuple[float, int]:
+    ws_url = base.replace("http", "ws", 1) + f"/api/ws/{conversation_id}/audio"
+    client_id = uuid.uuid4().hex
+    partials = 0
+    async with websockets.connect(ws_url, max_size=None) as ws:
+        await ws.send(json.dumps({"type": "start", "client_id": client_id, "role": "doctor", "pipelined": True}))
+        for segment in segments:
+            # A segment is available once it has been recorded
+            await asyncio.sleep(len(segment) / AUDIO_BYTES_PER_SECOND)
+            await ws.send(segment)
+        stopped = time.perf_counter()
+        audio_url = await upload(client, base, segments, uploaded)
+        await ws.send(json.dumps({"type": "stop", "audio_url": audio_url}))
+        while True:
+            frame = json.loads(await ws.recv())
+            if frame.get("type") == "partial_transcript":
+                partials += 1
+            elif frame.get("type") == "ack" and frame.get("client_id") == client_id:
+                if not frame["ok"]:
+                    raise RuntimeError(f"live recording failed: {frame['error']}")
+                return (time.perf_counter() - stopped) * 1000, partials
+
+
+async def run(base: str, args) -> list[dict]:
+    segments = utterance_segments(args.seconds, args.segment_seconds)
+    samples: dict[str, list[float]] = {"batch": [], "live": []}
+    partial_counts = []
+    uploaded: list[str] = []
+    async with httpx.AsyncClient(timeout=120) as client:
+        conv = (await client.post(f"{base}/api/conversations", json={
+            "title": "Live benchmark", "doctor_language": "en", "patient_language": "es",
+        })).json()
+        for _ in range(args.runs):
+            samples["batch"].append(await batch_run(client, base, conv["id"], segments, args, uploaded))
+            latency, partials = await live_run(client, base, conv["id"], segments, args, uploaded)
+            samples["live"].append(latency)
+            partial_counts.append(partials)
+        await client.delete(f"{base}/api/conversations/{conv['id']}")
+
+    for name in uploaded:
+        try:
+            os.remove(os.path.join(UPLOAD_DIR, name))
+        except FileNotFoundError:
+            pass
+
+    results = [
+        {
+            "mode": mode,
+            "runs": len(values),
+            "median_ms": round(statistics.median(values), 1),
+            "min_ms": round(min(values), 1),
+            "max_ms": round(max(values), 1),
+        }
+        for mode, values in samples.items()
+    ]
+    results[1]["segments"] = len(segments)
+    results[1]["partial_transcripts_per_run"] = round(statistics.fmean(partial_counts), 1)
+    return results
+
+
+async def main_async(args):
+    mock_port, api_port = free_port(), free_port()
+    base = f"http://127.0.0.1:{api_port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "GROQ_API_BASE": f"http://127.0.0.1:{mock_port}/openai/v1",
+            "GROQ_API_KEY": "mock",
+            "DATABASE_PATH": os.path.join(tmp, "bench.db"),
+            "TRANSLATION_CACHE_ENABLED": "false",
+        }
+        mock = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.mock_groq", "--port", str(mock_port),
+             "--transcribe-ms", str(args.transcribe_ms), "--transcribe-ms-per-kb", str(args.transcribe_ms_per_kb),
+             "--translate-ms", str(args.translate_ms)],
+            cwd=BACKEND_DIR, env=env,
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(api_port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+        )
+        try:
+            await wait_port(f"http://127.0.0.1:{mock_port}/calls")
+            await wait_ready(base)
+            results = await run(base, args)
+        finally:
+            for proc in (server, mock):
+                proc.terminate()
+                proc.wait()
+    print(json.dumps({"benchmark": "live_transcription", "params": vars(args), "results": results}, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=12, help="utterance length")
+    parser.add_argument("--segment-seconds", type=float, default=3)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--transcribe-ms", type=float, default=300, help="mock Whisper base latency")
+    parser.add_argument("--transcribe-ms-per-kb", type=float, default=20, help="mock Whisper latency per KB of audio")
+    parser.add_argument("--translate-ms", type=float, default=150, help="mock translation base latency")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
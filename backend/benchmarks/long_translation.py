@@ -0,0 +1,151 @@
+"""Long-message translation: one request vs sentence-chunked parallel segments.
+
+Starts the mock Groq server (benchmarks.mock_groq), whose completion latency
+grows with input length like real decode time, with the translation cache
+off. For each --lengths message size, translates a clinical explanation of
+that many characters --repeat times in each mode:
+
+  single   — TRANSLATE_CHUNK_THRESHOLD=0: the whole message in one request
+  chunked  — split into TRANSLATE_CHUNK_CHARS segments translated concurrently
+  stream   — chunked, through translate_text_stream (segments relayed in order)
+
+and reports median wall-clock time and upstream requests. Each chunked result
+is checked to contain every segment, in order. Segmentation of sample text in
+other scripts (zh, hi, ar, ur, th) is checked to round-trip exactly.
+
+Usage (from backend/):
+    python -m benchmarks.long_translation --lengths 500 1500 3000 6000
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.live_transcription import wait_port
+from benchmarks.upload_memory import BACKEND_DIR, free_port
+from benchmarks.upstream_faults import upstream_calls
+
+PARAGRAPH = (
+    "Your blood pressure was 150 over 95 today, which is higher than we would like. "
+    "Dr. Lee recommends starting lisinopril 10 mg once daily, e.g. in the morning with water. "
+    "Some patients notice a dry cough in the first weeks; tell us if that happens. "
+    "Please check your pressure at home twice a day and write the numbers down. "
+    "If you feel dizzy when standing up, sit down right away and call the clinic.\n\n"
+)
+
+SCRIPT_SAMPLES = {
+    "zh": "你的血压今天是一百五十。请每天早上吃一片药！如果头晕，请马上坐下。有问题吗？",
+    "hi": "आज आपका रक्तचाप ज़्यादा है। रोज़ सुबह एक गोली लें। चक्कर आए तो बैठ जाइए॥",
+    "ar": "ضغط دمك مرتفع اليوم. تناول حبة كل صباح. هل لديك أسئلة؟ اتصل بالعيادة.",
+    "ur": "آج آپ کا بلڈ پریشر زیادہ ہے۔ روزانہ صبح ایک گولی لیں۔ کوئی سوال؟",
+    "th": "ความดันของคุณสูงวันนี้ กรุณากินยาทุกเช้า ถ้าเวียนหัวให้นั่งลงทันที",
+}
+
+
+def message(length: int) -> str:
+    text = PARAGRAPH * (length // len(PARAGRAPH) + 1)
+    return text[:length].rsplit(" ", 1)[0] + "."
+
+
+def words(text: str) -> list[str]:
+    # The mock answers "[<n>] <input>"; drop the markers to compare with the source
+    return re.sub(r"\[\d+\] ", "", text).split()
+
+
+async def run(mock: str, args) -> dict:
+    # Imported late so GROQ_API_BASE and the cache switch are already in the environment
+    from services import grok_service, http_client
+    from services.text_segmenter import split_segments, split_sentences
+
+    async def translate(mode: str, text: str) -> str:
+        if mode == "stream":
+            deltas = []
+
+            async def on_delta(delta: str):
+                deltas.append(delta)
+
+            result = await grok_service.translate_text_stream(text, "en", "es", on_delta)
+            # Chunked streams relay cleaned segments, so they add up to the result exactly
+            assert not grok_service._is_long(text) or "".join(deltas) == result, "deltas differ from the result"
+            return result
+        return await grok_service.translate_text(text, "en", "es")
+
+    await http_client.start_client()
+    results = []
+    try:
+        for length in args.lengths:
+            text = message(length)
+            for mode in ("single", "chunked", "stream"):
+                grok_service.TRANSLATE_CHUNK_THRESHOLD = 0 if mode == "single" else args.threshold
+                timings, ok = [], True
+                before = await upstream_calls(mock)
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    result = await translate(mode, text)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    ok = ok and words(result) == text.split()
+                after = await upstream_calls(mock)
+                results.append({
+                    "chars": len(text),
+                    "mode": mode,
+                    "segments": len(split_segments(text, "en", grok_service.TRANSLATE_CHUNK_CHARS))
+                    if grok_service._is_long(text) else 1,
+                    "upstream_requests": (after["chat"] - before["chat"]) // args.repeat,
+                    "median_ms": round(statistics.median(timings), 1),
+                    "ok": ok,
+                })
+    finally:
+        await http_client.close_client()
+
+    scripts = {
+        lang: {
+            "sentences": len(split_sentences(sample, lang)),
+            "ok": "".join(split_segments(sample, lang, 40)) == sample and len(split_sentences(sample, lang)) > 1,
+        }
+        for lang, sample in SCRIPT_SAMPLES.items()
+    }
+    return {"translation": results, "segmentation": scripts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[500, 1500, 3000, 6000], help="message sizes (chars)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threshold", type=int, default=1200, help="TRANSLATE_CHUNK_THRESHOLD for chunked modes")
+    parser.add_argument("--chunk-chars", type=int, default=500, help="TRANSLATE_CHUNK_CHARS")
+    parser.add_argument("--translate-ms-per-char", type=float, default=0.5, help="mock decode time per input char")
+    args = parser.parse_args()
+
+    port = free_port()
+    mock = f"http://127.0.0.1:{port}"
+    os.environ.update(
+        GROQ_API_BASE=f"{mock}/openai/v1",
+        GROQ_API_KEY="mock",
+        TRANSLATION_CACHE_ENABLED="false",
+        TRANSLATE_CHUNK_CHARS=str(args.chunk_chars),
+        UPSTREAM_RATE_CHAT="0",
+    )
+    sys.path.insert(0, BACKEND_DIR)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_groq", "--port", str(port),
+         "--translate-ms-per-char", str(args.translate_ms_per_char)],
+        cwd=BACKEND_DIR,
+    )
+    try:
+        asyncio.run(wait_port(f"{mock}/calls"))
+        results = asyncio.run(run(mock, args))
+    finally:
+        server.terminate()
+        server.wait()
+    print(json.dumps({"benchmark": "long_translation", "params": vars(args), "results": results}, indent=2))
+    ok = all(r["ok"] for r in results["translation"]) and all(r["ok"] for r in results["segmentation"].values())
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Local stand-in for the Groq OpenAI-compatible API, with configurable latency.
+
+Serves the three endpoints the backend calls, under /openai/v1:
+
+  POST /chat/completions      — echoes the last user message as "[<n>] text"
+                                (each element for a JSON array, as batch
+                                translation sends; SSE deltas when "stream" is set)
+  POST /audio/transcriptions  — treats the uploaded "audio" as UTF-8 text and
+                                returns it, so benchmarks control the transcript
+  POST /audio/speech          — returns a tiny WAV
+
+Latencies are a fixed base plus a size-dependent part, roughly like the real
+service. Point the backend at it with
+GROQ_API_BASE=http://127.0.0.1:<port>/openai/v1.
+
+--jitter-ms adds a uniformly random extra delay to every response.
+Faults can be injected at start-up (--fail-rate, --fail-status, --retry-after)
+or changed at runtime with POST /faults {"fail_rate", "status", "retry_after"};
+a fail_rate of 1 simulates an outage. GET /calls reports request counts.
+
+Usage (from backend/):
+    python -m benchmarks.mock_groq --port 9100 --transcribe-ms 300
+"""
+import argparse
+import asyncio
+import json
+import random
+import struct
+
+from fastapi import FastAPI, Request, UploadFile
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+
+
+def silent_wav(samples: int = 800, rate: int = 8000) -> bytes:
+    data = b"\0\0" * samples
+    header = b"RIFF" + struct.pack("<I", 36 + len(data)) + b"WAVEfmt " + struct.pack(
+        "<IHHIIHH", 16, 1, 1, rate, rate * 2, 2, 16
+    ) + b"data" + struct.pack("<I", len(data))
+    return header + data
+
+
+def create_app(
+    translate_ms: float = 150,
+    translate_ms_per_char: float = 0.5,
+    transcribe_ms: float = 300,
+    transcribe_ms_per_kb: float = 2,
+    tts_ms: float = 200,
+    fail_rate: float = 0.0,
+    fail_status: int = 503,
+    retry_after: float | None = None,
+    jitter_ms: float = 0.0,
+) -> FastAPI:
+    app = FastAPI(title="Mock Groq")
+    app.state.calls = {"chat": 0, "transcribe": 0, "speech": 0, "failed": 0}
+    app.state.faults = {"fail_rate": fail_rate, "status": fail_status, "retry_after": retry_after}
+    wav = silent_wav()
+
+    async def delay(ms: float):
+        await asyncio.sleep((ms + random.uniform(0, jitter_ms)) / 1000)
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        faults = app.state.faults
+        if request.url.path.startswith("/openai/") and random.random() < faults["fail_rate"]:
+            app.state.calls["failed"] += 1
+            headers = {}
+            if faults["retry_after"] is not None:
+                headers["Retry-After"] = str(faults["retry_after"])
+            return Response(json.dumps({"error": {"message": "injected fault"}}), status_code=faults["status"],
+                            media_type="application/json", headers=headers)
+        return await call_next(request)
+
+    @app.post("/faults")
+    async def set_faults(request: Request):
+        app.state.faults.update(await request.json())
+        return app.state.faults
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat(request: Request):
+        app.state.calls["chat"] += 1
+        body = await request.json()
+        text = body["messages"][-1]["content"]
+        await delay(translate_ms + translate_ms_per_char * len(text))
+        n = app.state.calls["chat"]
+        try:
+            batch = json.loads(text)
+        except ValueError:
+            batch = None
+        if isinstance(batch, list):
+            # Batch translation request: answer with a JSON array of the same length
+            reply = json.dumps([f"[{n}] {item}" for item in batch], ensure_ascii=False)
+        else:
+            reply = f"[{n}] {text}"
+        if not body.get("stream"):
+            return {"choices": [{"message": {"role": "assistant", "content": reply}}]}
+
+        async def events():
+            for word in reply.split(" "):
+                yield f"data: {json.dumps({'choices': [{'delta': {'content': word + ' '}}]})}\n\n"
+                await asyncio.sleep(0.005)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/openai/v1/audio/transcriptions")
+    async def transcribe(file: UploadFile):
+        app.state.calls["transcribe"] += 1
+        audio = await file.read()
+        await delay(transcribe_ms + transcribe_ms_per_kb * len(audio) / 1024)
+        # Padding stands in for audio bytes; only the words are "spoken"
+        return PlainTextResponse(" ".join(audio.decode("utf-8", errors="ignore").split()))
+
+    @app.post("/openai/v1/audio/speech")
+    async def speech():
+        app.state.calls["speech"] += 1
+        await delay(tts_ms)
+        return Response(wav, media_type="audio/wav")
+
+    @app.get("/calls")
+    async def calls():
+        return app.state.calls
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--translate-ms", type=float, default=150)
+    parser.add_argument("--translate-ms-per-char", type=float, default=0.5)
+    parser.add_argument("--transcribe-ms", type=float, default=300)
+    parser.add_argument("--transcribe-ms-per-kb", type=float, default=2)
+    parser.add_argument("--tts-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra random latency, 0..N ms")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with an error")
+    parser.add_argument("--fail-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with injected errors")
+    args = parser.parse_args()
+    app = create_app(args.translate_ms, args.translate_ms_per_char, args.transcribe_ms,
+                     args.transcribe_ms_per_kb, args.tts_ms, args.fail_rate, args.fail_status, args.retry_after,
+                     args.jitter_ms)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
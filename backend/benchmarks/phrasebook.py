@@ -0,0 +1,130 @@
+"""Phrasebook lookup throughput, and translate_text on stock phrases.
+
+Loads the phrase tables (PHRASEBOOK_DIR, default backend/phrasebook) and
+times --lookups calls of Phrasebook.lookup for each kind of input:
+
+  exact       — a table phrase as written
+  normalized  — the same phrase lowercased, with extra spaces and "!!"
+  miss_short  — short messages that are not in the tables
+  miss_long   — a full clinical sentence (skips normalization by length)
+
+reporting lookups per second and mean microseconds per lookup. It then runs
+translate_text on --translate-calls exact inputs with GROQ_API_BASE at a closed
+port, so any call that reached the upstream would come back as a failure,
+and times a full reload of the tables.
+
+Usage (from backend/):
+    python -m benchmarks.phrasebook --lookups 200000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+from benchmarks.upload_memory import BACKEND_DIR, free_port
+
+MISSES_SHORT = ["My knee hurts", "Since Tuesday", "Two tablets", "A little", "Sometimes at night"]
+MISS_LONG = (
+    "I have had a sharp pain on the right side of my stomach since yesterday evening, "
+    "and it gets worse when I walk or cough."
+)
+
+
+def samples(pb, count: int, seed: int) -> dict[str, list[tuple[str, str, str]]]:
+    rng = random.Random(seed)
+    exact = [(text, source, target) for source, target, text in pb._index.exact]
+    exact = [rng.choice(exact) for _ in range(count)]
+    pairs = list({(source, target) for _, source, target in exact})
+    return {
+        "exact": exact,
+        "normalized": [(f"  {text.lower()}!! ", source, target) for text, source, target in exact],
+        "miss_short": [(rng.choice(MISSES_SHORT), *rng.choice(pairs)) for _ in range(count)],
+        "miss_long": [(MISS_LONG, *rng.choice(pairs)) for _ in range(count)],
+    }
+
+
+def time_lookups(pb, inputs: list[tuple[str, str, str]], rounds: int) -> dict:
+    lookup = pb.lookup
+    per_round = []
+    hits = 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for text, source, target in inputs:
+            lookup(text, source, target)
+        per_round.append(time.perf_counter() - started)
+    for text, source, target in inputs[:1000]:
+        hits += lookup(text, source, target) is not None
+    best = min(per_round)
+    return {
+        "lookups_per_sec": round(len(inputs) / best),
+        "mean_us": round(best / len(inputs) * 1e6, 3),
+        "median_round_ms": round(statistics.median(per_round) * 1000, 1),
+        "hit_rate": round(hits / min(len(inputs), 1000), 3),
+    }
+
+
+async def translate_hits(inputs: list[tuple[str, str, str]]) -> dict:
+    # Imported late so GROQ_API_BASE is already in the environment
+    from services import grok_service, http_client
+
+    await http_client.start_client()
+    try:
+        started = time.perf_counter()
+        results = [await grok_service.translate_text(*item) for item in inputs]
+        elapsed = time.perf_counter() - started
+    finally:
+        await http_client.close_client()
+    failed = sum(r.startswith("[Translation failed]") for r in results)
+    return {"calls": len(inputs), "mean_us": round(elapsed / len(inputs) * 1e6, 2), "failed": failed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=200000, help="inputs per kind")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--translate-calls", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ.update(
+        GROQ_API_BASE=f"http://127.0.0.1:{free_port()}/openai/v1",
+        GROQ_API_KEY="unused",
+        TRANSLATION_CACHE_ENABLED="false",
+        PHRASEBOOK_ENABLED="true",
+        UPSTREAM_MAX_RETRIES="0",
+    )
+    sys.path.insert(0, BACKEND_DIR)
+    from services.phrasebook import phrasebook
+
+    started = time.perf_counter()
+    if not phrasebook.reload():
+        sys.exit("phrasebook failed to load")
+    reload_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    inputs = samples(phrasebook, args.lookups, args.seed)
+    results = {kind: time_lookups(phrasebook, items, args.rounds) for kind, items in inputs.items()}
+    translate = asyncio.run(translate_hits(inputs["exact"][:args.translate_calls]))
+    stats = phrasebook.get_stats(top=0)
+
+    print(json.dumps({
+        "benchmark": "phrasebook",
+        "params": vars(args),
+        "tables": {"files": stats["files"], "language_pairs": stats["language_pairs"], "entries": stats["entries"]},
+        "reload_ms": reload_ms,
+        "lookup": results,
+        "translate_text": translate,
+    }, indent=2, ensure_ascii=False))
+    ok = (
+        results["exact"]["hit_rate"] == 1.0 and results["normalized"]["hit_rate"] == 1.0
+        and results["miss_short"]["hit_rate"] == 0.0 and results["miss_long"]["hit_rate"] == 0.0
+        and translate["failed"] == 0
+    )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Live translation latency while summaries flood the shared Groq quota.
+
+Starts the mock Groq server (benchmarks.mock_groq) with the translation cache
+off and the chat rate limit at --rate requests/second, then, for each mode:
+
+  fifo      — scheduler disabled: every call queues for the rate limiter in
+              arrival order, as before the scheduler existed
+  priority  — scheduler enabled: summaries are capped at their class
+              concurrency and live translations go first
+
+--summaries long transcripts are summarized at once (map-reduce, so each is
+several upstream calls) while a live translation is sent every --live-interval-ms
+for the length of the flood. Reports live translation latency percentiles,
+summary outcomes (ok / deferred by the scheduler / failed) and the scheduler's
+per-class counters. The exit status is non-zero if live translations fail or
+are not faster in priority mode.
+
+Usage (from backend/):
+    python -m benchmarks.priority_scheduler --summaries 12 --rate 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.live_transcription import wait_port
+from benchmarks.upload_memory import BACKEND_DIR, free_port
+
+FAILED_PREFIX = "[Translation failed]"
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return round(values[min(int(len(values) * p), len(values) - 1)], 1)
+
+
+async def run_mode(mode: str, args) -> dict:
+    from services import grok_service, upstream_scheduler
+
+    # Read on every call; with it off the scheduler is a pass-through and keeps no counters
+    upstream_scheduler.UPSTREAM_SCHED_ENABLED = mode == "priority"
+
+    transcripts = [
+        [
+            {"role": "doctor" if i % 2 else "patient",
+             "original_text": f"Visit {v} line {i}: " + "the pain started three days ago and gets worse at night. " * 4}
+            for i in range(args.lines)
+        ]
+        for v in range(args.summaries)
+    ]
+    flood = [asyncio.create_task(grok_service.summarize_conversation(t)) for t in transcripts]
+
+    latencies, failed = [], 0
+
+    async def live(i: int):
+        nonlocal failed
+        started = time.perf_counter()
+        result = await grok_service.translate_text(f"{mode} live {i}: where does it hurt?", "en", "es")
+        latencies.append((time.perf_counter() - started) * 1000)
+        failed += result.startswith(FAILED_PREFIX)
+
+    live_tasks = []
+    started = time.perf_counter()
+    i = 0
+    while not all(task.done() for task in flood):
+        live_tasks.append(asyncio.create_task(live(i)))
+        i += 1
+        await asyncio.sleep(args.live_interval_ms / 1000)
+    summaries = await asyncio.gather(*flood)
+    await asyncio.gather(*live_tasks)
+
+    outcomes = {"ok": 0, "deferred": 0, "failed": 0}
+    for summary in summaries:
+        if summary == grok_service.SUMMARY_DEFERRED:
+            outcomes["deferred"] += 1
+        elif summary == grok_service.SUMMARY_FAILED:
+            outcomes["failed"] += 1
+        else:
+            outcomes["ok"] += 1
+    return {
+        "mode": mode,
+        "flood_seconds": round(time.perf_counter() - started, 2),
+        "live": {
+            "requests": len(latencies),
+            "failed": failed,
+            "p50_ms": percentile(latencies, 0.5),
+            "p95_ms": percentile(latencies, 0.95),
+            "max_ms": round(max(latencies, default=0.0), 1),
+        },
+        "summaries": outcomes,
+        "scheduler": {
+            name: {k: v for k, v in stats.items() if k in ("admitted", "queued", "shed", "expired", "wait_seconds")}
+            for name, stats in upstream_scheduler.scheduler.get_stats()["classes"].items()
+            if name in ("live", "summary")
+        },
+    }
+
+
+async def run(args) -> list[dict]:
+    from services import http_client
+
+    await http_client.start_client()
+    try:
+        out = []
+        for mode in ("fifo", "priority"):
+            out.append(await run_mode(mode, args))
+            # Let the rate limiter's burst refill before the next mode
+            await asyncio.sleep(args.burst / args.rate)
+        return out
+    finally:
+        await http_client.close_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--summaries", type=int, default=12, help="concurrent long summaries")
+    parser.add_argument("--lines", type=int, default=60, help="messages per summarized transcript")
+    parser.add_argument("--chunk-chars", type=int, default=3000, help="SUMMARY_CHUNK_CHARS for the flood")
+    parser.add_argument("--live-interval-ms", type=float, default=250)
+    parser.add_argument("--rate", type=float, default=10, help="UPSTREAM_RATE_CHAT (requests/second)")
+    parser.add_argument("--burst", type=int, default=20, help="UPSTREAM_BURST_CHAT")
+    parser.add_argument("--translate-ms", type=float, default=150, help="mock completion base latency")
+    args = parser.parse_args()
+
+    port = free_port()
+    mock = f"http://127.0.0.1:{port}"
+    os.environ.update(
+        GROQ_API_BASE=f"{mock}/openai/v1",
+        GROQ_API_KEY="mock",
+        TRANSLATION_CACHE_ENABLED="false",
+        SUMMARY_CHUNK_CHARS=str(args.chunk_chars),
+        UPSTREAM_RATE_CHAT=str(args.rate),
+        UPSTREAM_BURST_CHAT=str(args.burst),
+    )
+    sys.path.insert(0, BACKEND_DIR)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_groq", "--port", str(port), "--translate-ms", str(args.translate_ms)],
+        cwd=BACKEND_DIR,
+    )
+    try:
+        asyncio.run(wait_port(f"{mock}/calls"))
+        results = asyncio.run(run(args))
+    finally:
+        server.terminate()
+        server.wait()
+    print(json.dumps({"benchmark": "priority_scheduler", "params": vars(args), "results": results}, indent=2))
+    fifo, priority = results
+    ok = priority["live"]["failed"] == 0 and priority["live"]["p95_ms"] < fifo["live"]["p95_ms"]
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
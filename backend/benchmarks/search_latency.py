@@ -0,0 +1,110 @@
+"""Search latency as the messages table grows: FTS5 index vs LIKE scan.
+
+Seeds a throwaway database in steps (e.g. 10k, 100k rows), runs the
+search_conversations handler with the FTS5 index and with the LIKE fallback,
+and prints per-size latency percentiles as JSON.
+
+Usage (from backend/):
+    python -m benchmarks.search_latency --sizes 10000 100000 --queries 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.pool import AsyncAdaptedQueuePool  # noqa: E402
+
+from database import Base  # noqa: E402
+from migrations import run_migrations  # noqa: E402
+from routers import conversations  # noqa: E402
+
+WORDS = (
+    "pain fever cough headache nausea dizziness chest breath allergy aspirin ibuprofen "
+    "blood pressure sugar insulin dose tablet morning evening week month swelling rash "
+    "stomach back knee sleep appetite vomiting infection antibiotic follow test scan"
+).split()
+
+
+def grow(path: str, target: int, conversations_per: int = 40):
+    conn = sqlite3.connect(path)
+    current = conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+    batch = []
+    conv_id = None
+    for i in range(current, target):
+        if i % conversations_per == 0:
+            conv_id = str(uuid.uuid4())
+            conn.execute("INSERT INTO conversations (id, title, message_count) VALUES (?, ?, 0)", (conv_id, f"Visit {i}"))
+        sentence = " ".join(random.choices(WORDS, k=12))
+        batch.append((str(uuid.uuid4()), conv_id, "doctor", sentence, sentence.upper(), (datetime(2026, 1, 1) + timedelta(seconds=i)).isoformat(" ")))
+        if len(batch) >= 5000:
+            conn.executemany("INSERT INTO messages (id, conversation_id, role, original_text, translated_text, timestamp) VALUES (?, ?, ?, ?, ?, ?)", batch)
+            batch.clear()
+    if batch:
+        conn.executemany("INSERT INTO messages (id, conversation_id, role, original_text, translated_text, timestamp) VALUES (?, ?, ?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.close()
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def measure(path: str, queries: list[str], use_fts: bool) -> dict:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    latencies = []
+    for q in queries:
+        conversations._fts_tokenizer = None if use_fts else ""
+        async with Session() as db:
+            started = time.perf_counter()
+            await conversations.search_conversations(q=q, db=db)
+            latencies.append((time.perf_counter() - started) * 1000)
+    await engine.dispose()
+    conversations._fts_tokenizer = None
+    return {
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "max_ms": round(max(latencies), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(7)
+    queries = [" ".join(random.sample(WORDS, 2)) for _ in range(args.queries)]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        engine.dispose()
+        for size in sorted(args.sizes):
+            grow(path, size)
+            results.append({
+                "messages": size,
+                "fts": asyncio.run(measure(path, queries, use_fts=True)),
+                "like": asyncio.run(measure(path, queries, use_fts=False)),
+            })
+
+    print(json.dumps({"benchmark": "search_latency", "params": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Load test: server memory while many large audio uploads stream in concurrently.
+
+Starts the API under uvicorn in a subprocess, fires concurrent uploads (raw
+body and multipart), samples the server's resident memory from /proc while
+they run, and prints peak RSS growth and throughput as JSON. Uploaded files
+are removed afterwards. Linux only (reads /proc/<pid>/status).
+
+Usage (from backend/):
+    python -m benchmarks.upload_memory --uploads 32 --size-mb 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UPLOAD_DIR = os.path.join(BACKEND_DIR, "uploads")
+CHUNK = 256 * 1024
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+async def wait_ready(base: str):
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                if (await client.get(f"{base}/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def body(size: int):
+    block = b"\0" * CHUNK
+    sent = 0
+    while sent < size:
+        n = min(CHUNK, size - sent)
+        yield block[:n]
+        sent += n
+
+
+async def run(base: str, pid: int, args, mode: str, sample_path: str) -> dict:
+    size = args.size_mb * 1024 * 1024
+    peak = baseline = rss_kb(pid)
+    stop = asyncio.Event()
+
+    async def sampler():
+        nonlocal peak
+        while not stop.is_set():
+            peak = max(peak, rss_kb(pid))
+            await asyncio.sleep(0.05)
+
+    async def upload(client: httpx.AsyncClient) -> str:
+        if mode == "raw":
+            r = await client.post(f"{base}/api/audio/upload", content=body(size),
+                                  headers={"content-type": "audio/webm"})
+        else:
+            with open(sample_path, "rb") as f:
+                r = await client.post(f"{base}/api/audio/upload", files={"file": ("rec.webm", f, "audio/webm")})
+        r.raise_for_status()
+        return r.json()["filename"]
+
+    sampler_task = asyncio.create_task(sampler())
+    started = time.perf_counter()
+    limits = httpx.Limits(max_connections=args.uploads)
+    async with httpx.AsyncClient(timeout=300, limits=limits) as client:
+        filenames = await asyncio.gather(*(upload(client) for _ in range(args.uploads)))
+    wall = time.perf_counter() - started
+    stop.set()
+    await sampler_task
+
+    for name in filenames:
+        try:
+            os.remove(os.path.join(UPLOAD_DIR, name))
+        except FileNotFoundError:
+            pass
+
+    total_mb = args.uploads * args.size_mb
+    return {
+        "mode": mode,
+        "uploads": args.uploads,
+        "upload_mb": args.size_mb,
+        "total_mb": total_mb,
+        "wall_seconds": round(wall, 2),
+        "mb_per_second": round(total_mb / wall, 1),
+        "rss_baseline_mb": round(baseline / 1024, 1),
+        "rss_peak_mb": round(peak / 1024, 1),
+        "rss_growth_mb": round((peak - baseline) / 1024, 1),
+    }
+
+
+async def main_async(args):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = {**os.environ, "MAX_UPLOAD_BYTES": str(args.size_mb * 1024 * 1024 + 1)}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        await wait_ready(base)
+        with tempfile.NamedTemporaryFile(suffix=".webm") as sample:
+            sample.write(b"\0" * (args.size_mb * 1024 * 1024))
+            sample.flush()
+            results = [await run(base, server.pid, args, mode, sample.name) for mode in ("raw", "multipart")]
+    finally:
+        server.terminate()
+        server.wait()
+    print(json.dumps({"benchmark": "upload_memory", "params": vars(args), "results": results}, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=32, help="concurrent uploads")
+    parser.add_argument("--size-mb", type=int, default=8, help="size of each upload")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Upstream governor under injected faults: throttling, outage, recovery, rate limits.
+
+Starts the mock Groq server (benchmarks.mock_groq) and drives grok_service
+against it through five scenarios, flipping faults at runtime via POST /faults:
+
+  throttled — 30% of requests get 429 + Retry-After; every call should still
+              succeed through retries
+  outage    — every request gets 503; the chat breaker should open and later
+              calls should fail fast without reaching the upstream
+  recovery  — faults cleared; after the cooldown one probe closes the breaker
+  cancelled_probe — the breaker is tripped again and the half-open probe is
+              cancelled mid-request; the next call must still be let through
+              as a probe and close the breaker
+  rate      — a burst larger than the bucket; the upstream should never see
+              more than burst + rate * elapsed requests
+
+Each scenario reports "ok" plus its measurements; the exit status is non-zero
+if any scenario fails.
+
+Usage (from backend/):
+    python -m benchmarks.upstream_faults
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.live_transcription import wait_port
+from benchmarks.upload_memory import BACKEND_DIR, free_port
+
+FAILED_PREFIX = "[Translation failed]"
+
+
+async def set_faults(base: str, **faults):
+    async with httpx.AsyncClient() as client:
+        (await client.post(f"{base}/faults", json=faults)).raise_for_status()
+
+
+async def upstream_calls(base: str) -> dict:
+    async with httpx.AsyncClient() as client:
+        return (await client.get(f"{base}/calls")).json()
+
+
+async def run(mock: str, args) -> list[dict]:
+    # Imported late so the governor picks up the scenario settings from the environment
+    from services import grok_service, http_client
+    from services.upstream_governor import governor
+
+    await http_client.start_client()
+    results = []
+    try:
+        async def translate_many(n: int, tag: str) -> list[str]:
+            return list(await asyncio.gather(*(
+                grok_service.translate_text(f"{tag} {i}", "en", "es") for i in range(n)
+            )))
+
+        # Throttled: 429s with Retry-After are retried until they succeed
+        await set_faults(mock, fail_rate=0.3, status=429, retry_after=0.2)
+        started = time.perf_counter()
+        out = await translate_many(args.requests, "throttled")
+        failed = sum(t.startswith(FAILED_PREFIX) for t in out)
+        chat = governor.get_stats()["chat"]
+        results.append({
+            "scenario": "throttled",
+            "ok": failed == 0 and chat["retries"] > 0,
+            "failed": failed,
+            "retries": chat["retries"],
+            "wall_ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+
+        # Outage: the breaker opens and stops sending traffic upstream
+        await set_faults(mock, fail_rate=1.0, status=503, retry_after=None)
+        await translate_many(args.breaker_threshold, "outage")
+        before = await upstream_calls(mock)
+        started = time.perf_counter()
+        out = await translate_many(args.requests, "fast-fail")
+        fast_fail_ms = (time.perf_counter() - started) * 1000
+        after = await upstream_calls(mock)
+        breaker = governor.get_stats()["chat"]["breaker"]
+        results.append({
+            "scenario": "outage",
+            "ok": breaker["state"] == "open" and after["failed"] == before["failed"]
+            and all(t.startswith(FAILED_PREFIX) for t in out),
+            "breaker": breaker,
+            "upstream_requests_while_open": after["failed"] - before["failed"],
+            "fast_fail_ms_total": round(fast_fail_ms, 1),
+        })
+
+        # Recovery: after the cooldown a single probe closes the breaker again
+        await set_faults(mock, fail_rate=0.0)
+        await asyncio.sleep(args.cooldown + 0.1)
+        out = await translate_many(1, "probe")
+        breaker = governor.get_stats()["chat"]["breaker"]
+        results.append({
+            "scenario": "recovery",
+            "ok": breaker["state"] == "closed" and not out[0].startswith(FAILED_PREFIX),
+            "breaker": breaker,
+        })
+
+        # Cancelled probe: the probe slot is released, so the next call can probe
+        await set_faults(mock, fail_rate=1.0, status=503, retry_after=None)
+        await translate_many(args.breaker_threshold, "trip")
+        await set_faults(mock, fail_rate=0.0)
+        await asyncio.sleep(args.cooldown + 0.1)
+        # Long enough that the mock is still "decoding" when the probe is cancelled
+        slow = asyncio.create_task(grok_service.translate_text("slow probe " * 300, "en", "es"))
+        await asyncio.sleep(0.2)
+        probing = governor.get_stats()["chat"]["breaker"]["state"]
+        slow.cancel()
+        try:
+            await slow
+        except asyncio.CancelledError:
+            pass
+        out = await translate_many(1, "after-cancel")
+        breaker = governor.get_stats()["chat"]["breaker"]
+        results.append({
+            "scenario": "cancelled_probe",
+            "ok": probing == "half_open" and breaker["state"] == "closed"
+            and not out[0].startswith(FAILED_PREFIX),
+            "state_during_probe": probing,
+            "breaker": breaker,
+        })
+
+        # Rate: a burst beyond the bucket is spread out instead of sent at once
+        before = await upstream_calls(mock)
+        started = time.perf_counter()
+        out = await translate_many(args.burst_requests, "rate")
+        elapsed = time.perf_counter() - started
+        after = await upstream_calls(mock)
+        limiter = governor.get_stats()["chat"]["limiter"]
+        sent = after["chat"] - before["chat"]
+        allowed = limiter["burst"] + limiter["rate_per_second"] * elapsed + 1
+        results.append({
+            "scenario": "rate",
+            "ok": sent == args.burst_requests and sent <= allowed
+            and not any(t.startswith(FAILED_PREFIX) for t in out),
+            "requests": sent,
+            "elapsed_s": round(elapsed, 2),
+            "max_allowed": round(allowed, 1),
+            "limiter": limiter,
+        })
+    finally:
+        await http_client.close_client()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--burst-requests", type=int, default=30)
+    parser.add_argument("--rate", type=float, default=10, help="chat requests per second")
+    parser.add_argument("--burst", type=int, default=5)
+    parser.add_argument("--breaker-threshold", type=int, default=3)
+    parser.add_argument("--cooldown", type=float, default=1.0, help="breaker cooldown seconds")
+    args = parser.parse_args()
+
+    port = free_port()
+    mock = f"http://127.0.0.1:{port}"
+    os.environ.update(
+        GROQ_API_BASE=f"{mock}/openai/v1",
+        GROQ_API_KEY="mock",
+        TRANSLATION_CACHE_ENABLED="false",
+        TRANSLATE_CHUNK_THRESHOLD="0",
+        UPSTREAM_RATE_CHAT=str(args.rate),
+        UPSTREAM_BURST_CHAT=str(args.burst),
+        UPSTREAM_BREAKER_THRESHOLD=str(args.breaker_threshold),
+        UPSTREAM_BREAKER_COOLDOWN=str(args.cooldown),
+        UPSTREAM_MAX_RETRIES="5",
+        UPSTREAM_BACKOFF_BASE="0.05",
+    )
+    sys.path.insert(0, BACKEND_DIR)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_groq", "--port", str(port), "--translate-ms", "20"],
+        cwd=BACKEND_DIR,
+    )
+    try:
+        asyncio.run(wait_port(f"{mock}/calls"))
+        results = asyncio.run(run(mock, args))
+    finally:
+        server.terminate()
+        server.wait()
+    print(json.dumps({"benchmark": "upstream_faults", "params": vars(args), "results": results}, indent=2))
+    sys.exit(0 if all(r["ok"] for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
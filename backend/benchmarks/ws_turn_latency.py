@@ -0,0 +1,144 @@
+"""Per-turn latency: POST /api/messages vs "send_text" frames on the WebSocket.
+
+Starts the API under uvicorn in a subprocess (or uses --base-url), creates a
+conversation and sends the same chat turns both ways, sequentially:
+
+  http  — one POST /api/messages per turn over a keep-alive httpx client
+  ws    — one "send_text" frame per turn on a single socket, timed until its ack
+
+Turns are pipelined (TTS off the critical path) and repeat a small phrase set,
+so after the first round translations come from the cache and the numbers are
+dominated by transport, request handling and the database write. Both modes
+hit the same server, alternating rounds to cancel out drift.
+
+Usage (from backend/):
+    python -m benchmarks.ws_turn_latency --turns 200
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+import websockets
+
+from benchmarks.upload_memory import BACKEND_DIR, free_port, wait_ready
+
+PHRASES = [
+    "How are you feeling today?",
+    "Do you have any allergies?",
+    "Please take this twice a day.",
+    "When did the pain start?",
+]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(mode: str, samples: list[float]) -> dict:
+    return {
+        "mode": mode,
+        "turns": len(samples),
+        "p50_ms": round(percentile(samples, 50), 2),
+        "p95_ms": round(percentile(samples, 95), 2),
+        "p99_ms": round(percentile(samples, 99), 2),
+        "mean_ms": round(statistics.fmean(samples), 2) if samples else 0.0,
+    }
+
+
+async def http_turn(client: httpx.AsyncClient, base: str, conversation_id: str, text: str) -> float:
+    started = time.perf_counter()
+    r = await client.post(f"{base}/api/messages", json={
+        "conversation_id": conversation_id, "role": "doctor", "text": text, "pipelined": True,
+    })
+    r.raise_for_status()
+    return (time.perf_counter() - started) * 1000
+
+
+async def ws_turn(ws, text: str) -> float:
+    client_id = uuid.uuid4().hex
+    started = time.perf_counter()
+    await ws.send(json.dumps({
+        "type": "send_text", "client_id": client_id, "role": "doctor", "text": text, "pipelined": True,
+    }))
+    while True:
+        frame = json.loads(await ws.recv())
+        if frame.get("type") == "ack" and frame.get("client_id") == client_id:
+            if not frame["ok"]:
+                raise RuntimeError(f"send_text failed: {frame['error']}")
+            return (time.perf_counter() - started) * 1000
+
+
+async def run(base: str, args) -> list[dict]:
+    async with httpx.AsyncClient(timeout=60) as client:
+        conv = (await client.post(f"{base}/api/conversations", json={
+            "title": "WS benchmark", "doctor_language": "en", "patient_language": "es",
+        })).json()
+        ws_url = base.replace("http", "ws", 1) + f"/api/ws/{conv['id']}"
+        samples: dict[str, list[float]] = {"http": [], "ws": []}
+        phrases = itertools.cycle(PHRASES)
+
+        async with websockets.connect(ws_url, max_size=None) as ws:
+            # Warm-up: fill the translation cache and open both connections
+            for phrase in PHRASES:
+                await http_turn(client, base, conv["id"], phrase)
+                await ws_turn(ws, phrase)
+
+            rounds = max(1, args.turns // args.batch)
+            for i in range(rounds):
+                order = ("http", "ws") if i % 2 == 0 else ("ws", "http")
+                for mode in order:
+                    for _ in range(args.batch):
+                        text = next(phrases)
+                        if mode == "http":
+                            samples["http"].append(await http_turn(client, base, conv["id"], text))
+                        else:
+                            samples["ws"].append(await ws_turn(ws, text))
+
+        await client.delete(f"{base}/api/conversations/{conv['id']}")
+
+    results = [summarize(mode, values) for mode, values in samples.items()]
+    http_p50, ws_p50 = results[0]["p50_ms"], results[1]["p50_ms"]
+    results.append({"mode": "saving", "p50_ms_per_turn": round(http_p50 - ws_p50, 2)})
+    return results
+
+
+async def main_async(args):
+    if args.base_url:
+        results = await run(args.base_url.rstrip("/"), args)
+    else:
+        port = free_port()
+        base = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=os.environ.copy(), stdout=subprocess.DEVNULL,
+        )
+        try:
+            await wait_ready(base)
+            results = await run(base, args)
+        finally:
+            server.terminate()
+            server.wait()
+    print(json.dumps({"benchmark": "ws_turn_latency", "params": vars(args), "results": results}, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200, help="turns per mode")
+    parser.add_argument("--batch", type=int, default=20, help="turns per mode before switching")
+    parser.add_argument("--base-url", help="benchmark an already running server instead of starting one")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
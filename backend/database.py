@@ -1,16 +1,56 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 os.makedirs(DATA_DIR, exist_ok=True)
 
-DATABASE_URL = f"sqlite:///{os.path.join(DATA_DIR, 'medibridge.db')}"
+DATABASE_PATH = os.getenv("DATABASE_PATH", os.path.join(DATA_DIR, "medibridge.db"))
+DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
 
+# Sync engine: schema creation and work already running in a worker thread
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine: request handlers, so queries never block the event loop. aiosqlite
+# defaults to NullPool; a real pool keeps connections (and the page cache, mmap and
+# pragmas set up on connect) alive across requests
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=int(os.getenv("SQLITE_POOL_SIZE", "5")),
+    max_overflow=int(os.getenv("SQLITE_MAX_OVERFLOW", "10")),
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+# Storage profile applied to every new SQLite connection
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",  # readers no longer block on writers
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "synchronous": "NORMAL",  # safe with WAL, far fewer fsyncs than FULL
+    "cache_size": -int(os.getenv("SQLITE_CACHE_KB", "65536")),  # negative = KiB
+    "mmap_size": int(os.getenv("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024))),
+    "temp_store": "MEMORY",
+}
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+event.listen(engine, "connect", _apply_sqlite_pragmas)
+event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+
 
 def get_db():
     db = SessionLocal()
@@ -18,3 +58,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,20 +1,55 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 
-from database import engine, Base
-from routers import chat, conversations, audio
+from database import engine, async_engine, Base
+from migrations import run_migrations
+from routers import admin, chat, conversations, audio, translate
+from services import http_client
+from services.translation_cache import translation_cache
+from services.phrasebook import PHRASEBOOK_ENABLED, phrasebook
+from services import tts_cache
+from services.broadcast_hub import hub
+from services.upstream_governor import governor
+from services.upstream_scheduler import scheduler
+from services import metrics
+from services.logging_config import setup_logging, stop_logging
+from services.profiler import PROFILING_ENABLED, ProfilerMiddleware, profiler
 
 load_dotenv()
+setup_logging()
 
-# Create database tables
+# Create database tables, then bring existing databases up to date
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled upstream client shared by every Groq call
+    await http_client.start_client()
+    await hub.start()
+    if PHRASEBOOK_ENABLED:
+        await phrasebook.start()
+    if PROFILING_ENABLED:
+        profiler.start()
+    yield
+    profiler.stop()
+    await phrasebook.stop()
+    await hub.stop()
+    await http_client.close_client()
+    await async_engine.dispose()
+    stop_logging()
+
 
 app = FastAPI(
     title="MediBridge API",
     description="Healthcare Doctor-Patient Translation API",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS configuration
@@ -39,12 +74,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Has-More", "ETag", "Server-Timing"],
 )
+app.add_middleware(ProfilerMiddleware)
+# Outermost, so request timings include CORS handling
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Register routers
 app.include_router(chat.router)
 app.include_router(conversations.router)
 app.include_router(audio.router)
+app.include_router(translate.router)
+app.include_router(admin.router)
 
 
 @app.get("/")
@@ -60,3 +101,38 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/health/upstream")
+async def upstream_health():
+    """Connection pool usage, scheduler queues, rate limiters and circuit breakers for Groq calls."""
+    return {
+        **http_client.get_pool_stats(),
+        "scheduler": scheduler.get_stats(),
+        "governor": governor.get_stats(),
+    }
+
+
+@app.get("/health/cache")
+async def cache_health():
+    """Hit/miss counters for the phrasebook and the translation and TTS caches."""
+    return {
+        "phrasebook": phrasebook.get_stats(top=0),
+        "translation": translation_cache.get_stats(),
+        "tts": tts_cache.get_stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Request, pipeline stage and upstream latency histograms in Prometheus text format."""
+    if not metrics.METRICS_ENABLED:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/health/broadcast")
+async def broadcast_health():
+    """WebSocket fan-out queue depth and slow-consumer evictions."""
+    return hub.get_stats()
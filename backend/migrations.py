@@ -0,0 +1,105 @@
+"""Lightweight schema migrations for existing SQLite databases.
+
+`Base.metadata.create_all` only creates missing tables, so changes to existing
+tables (new indexes, columns) are applied here. The schema version is tracked
+in SQLite's `PRAGMA user_version`; each step runs once, in order.
+"""
+import logging
+import sqlite3
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+# The trigram tokenizer (SQLite 3.34+) keeps the substring semantics of the old
+# ILIKE search and works for scripts without word spacing (zh, ja, th).
+FTS_TOKENIZER = "trigram case_sensitive 0" if sqlite3.sqlite_version_info >= (3, 34, 0) else "unicode61 remove_diacritics 2"
+
+
+def _add_message_indexes(conn: Connection):
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_messages_conversation_timestamp "
+        "ON messages (conversation_id, timestamp)"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_conversations_updated_at ON conversations (updated_at)"
+    ))
+
+
+def _add_message_count(conn: Connection):
+    columns = {row[1] for row in conn.execute(text("PRAGMA table_info(conversations)"))}
+    if "message_count" not in columns:
+        conn.execute(text("ALTER TABLE conversations ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0"))
+    conn.execute(text(
+        "UPDATE conversations SET message_count = "
+        "(SELECT COUNT(*) FROM messages WHERE messages.conversation_id = conversations.id)"
+    ))
+
+
+def _add_messages_fts(conn: Connection):
+    # External-content index keyed on the implicit rowid of messages (its primary
+    # key is TEXT). VACUUM may renumber those rowids and silently desync the index,
+    # so compact the database only through vacuum(), which rebuilds it afterwards.
+    try:
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+            "original_text, translated_text, content='messages', content_rowid='rowid', "
+            f"tokenize='{FTS_TOKENIZER}')"
+        ))
+    except OperationalError as e:
+        # SQLite built without FTS5: search falls back to a LIKE scan
+        logger.warning("FTS5 unavailable, skipping search index", extra={"error": repr(e)})
+        return
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN "
+        "INSERT INTO messages_fts(rowid, original_text, translated_text) "
+        "VALUES (new.rowid, new.original_text, new.translated_text); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN "
+        "INSERT INTO messages_fts(messages_fts, rowid, original_text, translated_text) "
+        "VALUES ('delete', old.rowid, old.original_text, old.translated_text); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF original_text, translated_text ON messages BEGIN "
+        "INSERT INTO messages_fts(messages_fts, rowid, original_text, translated_text) "
+        "VALUES ('delete', old.rowid, old.original_text, old.translated_text); "
+        "INSERT INTO messages_fts(rowid, original_text, translated_text) "
+        "VALUES (new.rowid, new.original_text, new.translated_text); END"
+    ))
+    conn.execute(text("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')"))
+
+
+def vacuum(engine: Engine):
+    """VACUUM the database, then rebuild messages_fts against the renumbered rowids."""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM"))
+        has_fts = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'")
+        ).first()
+        if has_fts:
+            conn.execute(text("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')"))
+
+
+# (version, description, step) — append new steps, never reorder
+MIGRATIONS = [
+    (1, "index messages on (conversation_id, timestamp)", _add_message_indexes),
+    (2, "maintained conversations.message_count", _add_message_count),
+    (3, "FTS5 search index over message text", _add_messages_fts),
+]
+
+
+def run_migrations(engine: Engine) -> int:
+    """Apply pending migrations and return the resulting schema version."""
+    with engine.begin() as conn:
+        version = conn.execute(text("PRAGMA user_version")).scalar_one()
+        for step_version, description, step in MIGRATIONS:
+            if step_version <= version:
+                continue
+            logger.info("Applying migration", extra={"version": step_version, "description": description})
+            step(conn)
+            conn.execute(text(f"PRAGMA user_version = {step_version}"))
+            version = step_version
+    return version
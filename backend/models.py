@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Index, Integer
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -11,6 +11,9 @@ def generate_uuid():
 
 class Conversation(Base):
     __tablename__ = "conversations"
+    __table_args__ = (
+        Index("ix_conversations_updated_at", "updated_at"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     title = Column(String, default="New Conversation")
@@ -18,12 +21,17 @@ class Conversation(Base):
     patient_language = Column(String, default="es")
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    # Maintained by send_message in the same transaction as the message insert
+    message_count = Column(Integer, default=0, server_default="0", nullable=False)
 
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan", order_by="Message.timestamp")
 
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_conversation_timestamp", "conversation_id", "timestamp"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     conversation_id = Column(String, ForeignKey("conversations.id"), nullable=False)
@@ -37,3 +45,14 @@ class Message(Base):
     timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     conversation = relationship("Conversation", back_populates="messages")
+
+
+class ConversationSummary(Base):
+    __tablename__ = "conversation_summaries"
+
+    conversation_id = Column(String, ForeignKey("conversations.id"), primary_key=True)
+    summary = Column(Text, nullable=False)
+    # Last message folded into the summary, and how many messages it covers
+    last_message_id = Column(String, nullable=False)
+    message_count = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,74 @@
+import asyncio
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import PlainTextResponse
+
+from services.phrasebook import phrasebook
+from services.profiler import PROFILING_ENABLED, check_admin_token, profiler
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints need ADMIN_TOKEN set on the server and sent as X-Admin-Token."""
+    from fastapi import HTTPException
+    if not check_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def require_profiling():
+    from fastapi import HTTPException
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+
+
+@router.get("/profiler", dependencies=[Depends(require_profiling), Depends(require_admin)])
+async def profiler_status():
+    """Sampler settings and counters: profiled requests, samples, stalls."""
+    return profiler.get_stats()
+
+
+@router.get("/profiles", dependencies=[Depends(require_profiling), Depends(require_admin)])
+async def list_profiles(
+    kind: Optional[Literal["request", "stall"]] = None,
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Recorded request profiles and event-loop stalls, newest first (without stacks)."""
+    return await asyncio.to_thread(profiler.ring.list, kind, limit)
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_profiling), Depends(require_admin)])
+async def get_profile(profile_id: str, format: Literal["json", "folded"] = "json"):
+    """Download one profile or stall.
+
+    `format=folded` returns "stack count" lines, the input format of
+    flamegraph.pl and speedscope.
+    """
+    record = await asyncio.to_thread(profiler.ring.get, profile_id)
+    if record is None:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "folded":
+        lines = [f"{stack} {count}" for stack, count in record.get("stacks", {}).items()]
+        return PlainTextResponse("\n".join(lines) + "\n", headers={
+            "Content-Disposition": f'attachment; filename="{record["kind"]}-{profile_id}.folded"',
+        })
+    return record
+
+
+@router.get("/phrasebook", dependencies=[Depends(require_admin)])
+async def phrasebook_status(top: int = Query(20, ge=0, le=500)):
+    """Loaded phrase tables, lookup counters and the most used phrases."""
+    return phrasebook.get_stats(top)
+
+
+@router.post("/phrasebook/reload", dependencies=[Depends(require_admin)])
+async def reload_phrasebook():
+    """Reload the phrase tables now instead of waiting for the file watcher.
+
+    A table that fails to load leaves the previous ones in service (409).
+    """
+    if not await asyncio.to_thread(phrasebook.reload):
+        from fastapi import HTTPException
+        raise HTTPException(status_code=409, detail="Phrasebook failed to load; previous tables kept")
+    return phrasebook.get_stats(top=0)
@@ -1,33 +1,239 @@
+import asyncio
 import os
+import re
 import uuid
-from fastapi import APIRouter, UploadFile, File
-from fastapi.responses import FileResponse
+from stat import S_ISREG
+from fastapi import APIRouter, Request
+from fastapi.responses import Response, StreamingResponse
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
 
 router = APIRouter(prefix="/api/audio", tags=["audio"])
 
 UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))  # Whisper's file limit
+CHUNK_SIZE = 256 * 1024
+# Allowance for multipart boundaries and part headers when checking Content-Length
+MULTIPART_OVERHEAD = 16 * 1024
+
+# Uploads are uuid-named and TTS files content-addressed, so a URL never changes content
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def _reject_too_large():
+    from fastapi import HTTPException
+    raise HTTPException(status_code=413, detail=f"Audio file exceeds {MAX_UPLOAD_BYTES} bytes")
+
+
+async def _write_stream(chunks, filepath: str) -> int:
+    """Write an async iterator of byte chunks to disk without blocking the event loop."""
+    size = 0
+    f = await asyncio.to_thread(open, filepath, "wb")
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise UploadTooLarge()
+            await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        await asyncio.to_thread(f.close)
+        await asyncio.to_thread(os.remove, filepath)
+        raise
+    await asyncio.to_thread(f.close)
+    return size
+
+
+class _MultipartFile:
+    """The `file` part of a multipart request body, parsed as the body arrives.
+
+    Unlike request.form(), nothing is spooled to a temporary file first, so
+    the size limit is enforced per chunk and the upload is written only once.
+    """
+
+    def __init__(self, request: Request, boundary: bytes):
+        self._body = request.stream().__aiter__()
+        self._parser = MultipartParser(boundary, callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+        self._headers: dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._in_file = False
+        self._done = False
+        self._pending: list[bytes] = []
+        self.filename: str | None = None
+
+    # -- Parser callbacks --
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if options.get(b"name") == b"file" and self.filename is None:
+            self._in_file = True
+            self.filename = options.get(b"filename", b"").decode("utf-8", "replace") or "audio.webm"
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self._pending.append(bytes(data[start:end]))
+
+    def _on_part_end(self):
+        if self._in_file:
+            self._in_file = False
+            self._done = True
+
+    # -- Reading --
+
+    async def _feed(self) -> bool:
+        """Parse the next body chunk. False once the body is exhausted."""
+        try:
+            chunk = await self._body.__anext__()
+        except StopAsyncIteration:
+            self._parser.finalize()
+            return False
+        try:
+            self._parser.write(chunk)
+        except MultipartParseError:
+            from fastapi import HTTPException
+            raise HTTPException(status_code=400, detail="Malformed multipart body")
+        return True
+
+    async def start(self) -> bool:
+        """Read up to the headers of the `file` part. False if the body has none."""
+        while self.filename is None:
+            if not await self._feed():
+                return False
+        return True
+
+    async def chunks(self):
+        while True:
+            if self._pending:
+                data = b"".join(self._pending)
+                self._pending.clear()
+                yield data
+            if self._done:
+                return
+            if not await self._feed():
+                from fastapi import HTTPException
+                raise HTTPException(status_code=400, detail="Incomplete multipart body")
+
 
 @router.post("/upload")
-async def upload_audio(file: UploadFile = File(...)):
-    """Upload an audio file and return its URL."""
-    ext = os.path.splitext(file.filename or "audio.webm")[1] or ".webm"
+async def upload_audio(request: Request):
+    """Upload an audio file and return its URL.
+
+    Accepts multipart form data with a `file` field, or the raw audio as the
+    request body (`Content-Type: audio/*`). Either way the file is streamed
+    to disk as the body arrives; once it passes MAX_UPLOAD_BYTES the upload is
+    rejected with 413 without reading the rest.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD:
+        _reject_too_large()
+
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        boundary = parse_options_header(content_type)[1].get(b"boundary")
+        upload = _MultipartFile(request, boundary) if boundary else None
+        if upload is None or not await upload.start():
+            from fastapi import HTTPException
+            raise HTTPException(status_code=422, detail="Missing 'file' field")
+        original_name = upload.filename
+        chunks = upload.chunks()
+    else:
+        original_name = request.headers.get("x-filename", "audio.webm")
+        chunks = request.stream()
+
+    ext = os.path.splitext(original_name)[1] or ".webm"
     filename = f"{uuid.uuid4()}{ext}"
     filepath = os.path.join(UPLOAD_DIR, filename)
 
-    content = await file.read()
-    with open(filepath, "wb") as f:
-        f.write(content)
+    try:
+        size = await _write_stream(chunks, filepath)
+    except UploadTooLarge:
+        _reject_too_large()
+
+    return {"filename": filename, "url": f"/api/audio/{filename}", "size": size}
+
 
-    return {"filename": filename, "url": f"/api/audio/{filename}", "size": len(content)}
+def _file_etag(filename: str, stat: os.stat_result) -> str:
+    # Not the mtime: the TTS cache touches files on every hit to track recency
+    stem = os.path.splitext(filename)[0]
+    return f'"{stem}-{stat.st_size:x}"'
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Whether an If-None-Match header matches etag, using weak comparison."""
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in (tag.removeprefix("W/") for tag in tags)
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Parse a single `bytes=start-end` range. Returns None for unsupported forms."""
+    match = _RANGE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    start_s, end_s = match.groups()
+    if start_s == "":
+        # Suffix range: the last N bytes
+        length = int(end_s)
+        return max(size - length, 0), size - 1
+    start = int(start_s)
+    end = min(int(end_s), size - 1) if end_s else size - 1
+    return start, end
+
+
+async def _iter_file(filepath: str, start: int, end: int):
+    f = await asyncio.to_thread(open, filepath, "rb")
+    try:
+        await asyncio.to_thread(f.seek, start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await asyncio.to_thread(f.read, min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
 
 
 @router.get("/{filename}")
-async def get_audio(filename: str):
-    """Serve an uploaded audio file."""
-    filepath = os.path.join(UPLOAD_DIR, filename)
-    if not os.path.exists(filepath):
+async def get_audio(filename: str, request: Request):
+    """Serve an uploaded audio file, with Range and conditional request support."""
+    filepath = os.path.join(UPLOAD_DIR, os.path.basename(filename))
+    try:
+        stat = await asyncio.to_thread(os.stat, filepath)
+    except (FileNotFoundError, NotADirectoryError):
+        stat = None
+    if stat is None or not S_ISREG(stat.st_mode):
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Audio file not found")
 
@@ -39,4 +245,28 @@ async def get_audio(filename: str):
     elif filename.endswith(".ogg"):
         media_type = "audio/ogg"
 
-    return FileResponse(filepath, media_type=media_type)
+    etag = _file_etag(os.path.basename(filepath), stat)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    size = stat.st_size
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range == etag):
+        byte_range = _parse_range(range_header, size)
+        if byte_range is not None:
+            start, end = byte_range
+            if start >= size or start > end:
+                return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(_iter_file(filepath, start, end), status_code=206, media_type=media_type, headers=headers)
+
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(_iter_file(filepath, 0, size - 1), media_type=media_type, headers=headers)
@@ -1,24 +1,41 @@
+import asyncio
+import hashlib
 import json
+import logging
 import os
-import uuid
+import re
+import time
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, Request, Response, WebSocket, WebSocketDisconnect
+from sqlalchemy import and_, or_, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, ValidationError
+from typing import Callable, Optional
 
-from database import get_db
-from models import Message, Conversation
-from services.grok_service import translate_text, transcribe_audio, text_to_speech
+from database import AsyncSessionLocal, get_async_db
+from models import Message, Conversation, generate_uuid
+from routers.audio import etag_matches
+from services import metrics
+from services.grok_service import translate_text, translate_text_stream, transcribe_audio
+from services.translation_cache import FAILED_PREFIX
+from services.tts_cache import get_or_create_tts
+from services.broadcast_hub import Connection, hub
+from services.live_transcription import LiveTranscription, SegmentLimitExceeded
 
 router = APIRouter(prefix="/api", tags=["chat"])
+logger = logging.getLogger(__name__)
 
 # Upload directory — same as audio.py: backend/uploads/
 UPLOADS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uploads")
 os.makedirs(UPLOADS_DIR, exist_ok=True)
 
-# Store active WebSocket connections per conversation
-active_connections: dict[str, list[WebSocket]] = {}
+
+# Default for SendMessageRequest.pipelined: reply as soon as the translation is
+# ready and produce TTS in the background.
+SEND_MESSAGE_PIPELINED = os.getenv("SEND_MESSAGE_PIPELINED", "false").lower() in ("1", "true", "yes")
+# Default for SendMessageRequest.stream: relay translation deltas over the
+# conversation WebSocket while the completion is streaming.
+TRANSLATION_STREAMING = os.getenv("TRANSLATION_STREAMING", "false").lower() in ("1", "true", "yes")
 
 
 class SendMessageRequest(BaseModel):
@@ -26,6 +43,8 @@ class SendMessageRequest(BaseModel):
     role: str  # "doctor" or "patient"
     text: str = ""
     audio_url: Optional[str] = None
+    pipelined: Optional[bool] = None
+    stream: Optional[bool] = None
 
 
 class MessageResponse(BaseModel):
@@ -39,69 +58,175 @@ class MessageResponse(BaseModel):
     audio_url: Optional[str]
     translated_audio_url: Optional[str]
     timestamp: str
+    audio_pending: bool = False
+    timings: Optional[dict[str, float]] = None
 
     class Config:
         from_attributes = True
 
 
-@router.post("/messages", response_model=MessageResponse)
-async def send_message(req: SendMessageRequest, db: Session = Depends(get_db)):
-    """Send a message, translate it, and broadcast to WebSocket clients."""
-    conversation = db.query(Conversation).filter(Conversation.id == req.conversation_id).first()
-    if not conversation:
-        from fastapi import HTTPException
-        raise HTTPException(status_code=404, detail="Conversation not found")
+def message_to_dict(message: Message) -> dict:
+    return {
+        "id": message.id,
+        "conversation_id": message.conversation_id,
+        "role": message.role,
+        "original_text": message.original_text,
+        "translated_text": message.translated_text,
+        "original_language": message.original_language,
+        "translated_language": message.translated_language,
+        "audio_url": message.audio_url,
+        "translated_audio_url": message.translated_audio_url,
+        "timestamp": message.timestamp.isoformat(),
+    }
 
-    # Determine source and target languages based on role
-    if req.role == "doctor":
-        source_lang = conversation.doctor_language
-        target_lang = conversation.patient_language
-    else:
-        source_lang = conversation.patient_language
-        target_lang = conversation.doctor_language
+
+async def broadcast(conversation_id: str, payload: dict):
+    """Send a JSON payload to every WebSocket listening on a conversation."""
+    await hub.publish(conversation_id, payload)
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def _stage_done(timings: dict[str, float], stage: str, started: float, labels: dict[str, str], ok: bool = True):
+    """Record a finished pipeline stage in the turn's timings and the stage histogram."""
+    timings[f"{stage}_ms"] = _elapsed_ms(started)
+    metrics.observe_stage(stage, timings[f"{stage}_ms"], outcome="ok" if ok else "error", **labels)
+
+
+async def _tts_stage(message_id: str, conversation_id: str, text: str, language: str, timings: dict[str, float],
+                     labels: dict[str, str]):
+    """Background stage: voice the translation, attach it to the message and announce it."""
+    started = time.perf_counter()
+    translated_audio_url = await get_or_create_tts(text, language)
+    _stage_done(timings, "tts", started, labels, ok=bool(translated_audio_url))
+    if not translated_audio_url:
+        logger.warning("No TTS audio generated", extra={"message_id": message_id, **labels})
+        return
+
+    async with AsyncSessionLocal() as db:
+        message = await db.get(Message, message_id)
+        if not message:
+            return
+        message.translated_audio_url = translated_audio_url
+        await db.commit()
+
+    await broadcast(conversation_id, {
+        "type": "audio_ready",
+        "id": message_id,
+        "conversation_id": conversation_id,
+        "translated_audio_url": translated_audio_url,
+        "timings": timings,
+    })
+    logger.debug("TTS audio ready", extra={"message_id": message_id, "url": translated_audio_url,
+                                          "tts_ms": timings["tts_ms"]})
+
+
+def _languages(conversation: Conversation, role: str) -> tuple[str, str]:
+    """(source, target) languages for a message sent by `role`."""
+    if role == "doctor":
+        return conversation.doctor_language, conversation.patient_language
+    return conversation.patient_language, conversation.doctor_language
+
+
+async def _process_message(
+    req: SendMessageRequest,
+    schedule: Callable[..., object],
+    prepared: Optional[tuple[str, str]] = None,
+    timings: Optional[dict[str, float]] = None,
+    endpoint: str = "http",
+) -> MessageResponse:
+    """Translate, persist and broadcast one chat turn.
+
+    Shared by the HTTP endpoint and the WebSocket "send_text"/"send_audio"
+    frames. `schedule(fn, *args)` runs follow-up work (pipelined TTS) after
+    the reply has been sent. Live transcription passes the finished
+    `(transcript, translation)` as `prepared`, skipping both stages.
+    Stage timings are labelled with `endpoint` and the language pair.
+
+    The conversation is read and the message persisted in two short sessions;
+    no connection or SQLite read transaction is held across the upstream calls.
+    """
+    request_started = time.perf_counter()
+    timings = {} if timings is None else timings
+    pipelined = SEND_MESSAGE_PIPELINED if req.pipelined is None else req.pipelined
+    streaming = TRANSLATION_STREAMING if req.stream is None else req.stream
+    message_id = generate_uuid()
+
+    async with AsyncSessionLocal() as db:
+        conversation = await db.get(Conversation, req.conversation_id)
+        if not conversation:
+            from fastapi import HTTPException
+            raise HTTPException(status_code=404, detail="Conversation not found")
+
+        # Determine source and target languages based on role
+        source_lang, target_lang = _languages(conversation, req.role)
+    labels = {"endpoint": endpoint, "language_pair": f"{source_lang}-{target_lang}"}
 
     # If audio was provided, transcribe it to get the actual text
     original_text = req.text.strip()
-    if req.audio_url:
+    translated = None
+    if prepared is not None:
+        original_text, translated = prepared
+        if not original_text:
+            translated = None
+        # Live transcription timed its own stages, measured from the end of recording
+        live_stages = {"live_tail_transcribe": "tail_transcribe_ms", "live_translate": "stop_to_translation_ms"}
+        for stage, key in live_stages.items():
+            if key in timings:
+                metrics.observe_stage(stage, timings[key], **labels)
+    elif req.audio_url:
         # Resolve the audio file path from the URL
         filename = req.audio_url.split("/")[-1]
         file_path = os.path.join(UPLOADS_DIR, filename)
-        print(f"[Audio] Looking for file at: {file_path}, exists: {os.path.exists(file_path)}")
         if os.path.exists(file_path):
+            started = time.perf_counter()
             transcribed = await transcribe_audio(file_path, language=source_lang)
-            print(f"[Audio] Transcription result: '{transcribed}'")
+            _stage_done(timings, "transcribe", started, labels, ok=bool(transcribed))
+            logger.debug("Transcribed audio", extra={"file": filename, "chars": len(transcribed)})
             if transcribed:
                 original_text = transcribed
         else:
-            print(f"[Audio] File NOT found at {file_path}")
-            # List what IS in the uploads dir for debugging
-            try:
-                files = os.listdir(UPLOADS_DIR)
-                print(f"[Audio] Files in uploads dir: {files[:10]}")
-            except Exception as e:
-                print(f"[Audio] Could not list uploads dir: {e}")
+            logger.warning("Audio file not found", extra={"file": filename, "audio_url": req.audio_url})
 
     if not original_text:
         original_text = "(Voice message — transcription unavailable)"
 
     # Translate the message
-    translated = await translate_text(original_text, source_lang, target_lang)
+    if translated is None:
+        started = time.perf_counter()
+        if streaming:
+            async def relay_delta(delta: str):
+                if "first_delta_ms" not in timings:
+                    timings["first_delta_ms"] = _elapsed_ms(request_started)
+                await broadcast(req.conversation_id, {
+                    "type": "translation_delta",
+                    "id": message_id,
+                    "conversation_id": req.conversation_id,
+                    "role": req.role,
+                    "original_text": original_text,
+                    "delta": delta,
+                })
 
-    # Generate TTS for the translated text
+            translated = await translate_text_stream(original_text, source_lang, target_lang, relay_delta)
+        else:
+            translated = await translate_text(original_text, source_lang, target_lang)
+        _stage_done(timings, "translate", started, labels, ok=not translated.startswith(FAILED_PREFIX))
+
+    # Generate TTS for the translated text (reuses cached audio for repeat phrases)
     translated_audio_url = None
-    tts_audio = await text_to_speech(translated, language=target_lang)
-    if tts_audio:
-        tts_filename = f"tts_{uuid.uuid4().hex}.wav"
-        tts_path = os.path.join(UPLOADS_DIR, tts_filename)
-        with open(tts_path, "wb") as f:
-            f.write(tts_audio)
-        translated_audio_url = f"/api/audio/{tts_filename}"
-        print(f"[TTS] Saved to {tts_path}")
-    else:
-        print("[TTS] No audio generated")
+    if not pipelined:
+        started = time.perf_counter()
+        translated_audio_url = await get_or_create_tts(translated, target_lang)
+        _stage_done(timings, "tts", started, labels, ok=bool(translated_audio_url))
+        if not translated_audio_url:
+            logger.warning("No TTS audio generated", extra={"message_id": message_id, **labels})
 
     # Create and save message
+    started = time.perf_counter()
     message = Message(
+        id=message_id,
         conversation_id=req.conversation_id,
         role=req.role,
         original_text=original_text,
@@ -112,88 +237,372 @@ async def send_message(req: SendMessageRequest, db: Session = Depends(get_db)):
         translated_audio_url=translated_audio_url,
         timestamp=datetime.now(timezone.utc),
     )
-    db.add(message)
+    async with AsyncSessionLocal() as db:
+        db.add(message)
 
-    conversation.updated_at = datetime.now(timezone.utc)
-    db.commit()
-    db.refresh(message)
+        # Bump the denormalized count atomically in the same transaction
+        await db.execute(
+            update(Conversation)
+            .where(Conversation.id == req.conversation_id)
+            .values(message_count=Conversation.message_count + 1, updated_at=datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        await db.refresh(message)
+    _stage_done(timings, "persist", started, labels)
 
     # Broadcast to WebSocket clients
-    msg_data = {
-        "id": message.id,
-        "conversation_id": message.conversation_id,
-        "role": message.role,
-        "original_text": message.original_text,
-        "translated_text": message.translated_text,
-        "original_language": message.original_language,
-        "translated_language": message.translated_language,
-        "audio_url": message.audio_url,
-        "translated_audio_url": message.translated_audio_url,
-        "timestamp": message.timestamp.isoformat(),
-    }
+    started = time.perf_counter()
+    msg_data = message_to_dict(message)
+    if pipelined:
+        msg_data["audio_pending"] = True
+    await broadcast(req.conversation_id, msg_data)
+    _stage_done(timings, "broadcast", started, labels)
+    timings["time_to_first_text_ms"] = _elapsed_ms(request_started)
 
-    if req.conversation_id in active_connections:
-        for ws in active_connections[req.conversation_id]:
-            try:
-                await ws.send_text(json.dumps(msg_data))
-            except Exception:
-                pass
+    if pipelined:
+        schedule(_tts_stage, message.id, req.conversation_id, translated, target_lang, timings, labels)
 
     return MessageResponse(
-        id=message.id,
-        conversation_id=message.conversation_id,
-        role=message.role,
-        original_text=message.original_text,
-        translated_text=message.translated_text,
-        original_language=message.original_language,
-        translated_language=message.translated_language,
-        audio_url=message.audio_url,
-        translated_audio_url=message.translated_audio_url,
-        timestamp=message.timestamp.isoformat(),
+        **message_to_dict(message),
+        audio_pending=pipelined,
+        timings=timings,
     )
 
 
+@router.post("/messages", response_model=MessageResponse)
+async def send_message(req: SendMessageRequest, background_tasks: BackgroundTasks):
+    """Send a message, translate it, and broadcast to WebSocket clients.
+
+    In pipelined mode the message is persisted, broadcast and returned as soon
+    as the translation is ready; TTS follows as an "audio_ready" WebSocket event.
+    In streaming mode partial translations are broadcast as "translation_delta"
+    events before the final message.
+
+    Clients holding the conversation WebSocket can send the same turn as a
+    "send_text" or "send_audio" frame instead (see websocket_endpoint).
+    """
+    return await _process_message(req, background_tasks.add_task)
+
+
+async def _history_etag(db: AsyncSession, conversation_id: str, params: str) -> str:
+    """Weak ETag from the last message id and counts; changes whenever history does."""
+    # message_count is maintained on every insert, so only the voiced count needs a scan
+    row = (await db.execute(
+        text(
+            "SELECT message_count, "
+            "(SELECT COUNT(translated_audio_url) FROM messages WHERE conversation_id = :cid), "
+            "(SELECT id FROM messages WHERE conversation_id = :cid ORDER BY timestamp DESC, id DESC LIMIT 1) "
+            "FROM conversations WHERE id = :cid"
+        ),
+        {"cid": conversation_id},
+    )).first()
+    count, voiced, last_id = row or (0, 0, None)
+    digest = hashlib.sha1(f"{conversation_id}|{last_id}|{count}|{voiced}|{params}".encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+async def _message_position(db: AsyncSession, conversation_id: str, message_id: str) -> tuple[datetime, str]:
+    message = await db.get(Message, message_id)
+    if not message or message.conversation_id != conversation_id:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=400, detail=f"Unknown message cursor: {message_id}")
+    return message.timestamp, message.id
+
+
 @router.get("/conversations/{conversation_id}/messages", response_model=list[MessageResponse])
-async def get_messages(conversation_id: str, db: Session = Depends(get_db)):
-    """Get all messages in a conversation."""
-    messages = (
-        db.query(Message)
-        .filter(Message.conversation_id == conversation_id)
-        .order_by(Message.timestamp.asc())
-        .all()
-    )
+async def get_messages(
+    conversation_id: str,
+    request: Request,
+    response: Response,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get messages in a conversation, oldest first.
+
+    - `before` / `after`: message ids to page backwards / forwards from
+    - `since`: only messages newer than this timestamp (reconnect delta)
+    - `limit`: page size; `X-Has-More` tells whether more messages exist
+
+    Responses carry an `ETag`; a matching `If-None-Match` returns 304.
+    """
+    params = f"{before}|{after}|{since}|{limit}"
+    etag = await _history_etag(db, conversation_id, params)
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    query = select(Message).where(Message.conversation_id == conversation_id)
+    if after:
+        ts, mid = await _message_position(db, conversation_id, after)
+        query = query.where(or_(Message.timestamp > ts, and_(Message.timestamp == ts, Message.id > mid)))
+    if since:
+        # Timestamps are stored as naive UTC
+        if since.tzinfo:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        query = query.where(Message.timestamp > since)
+    if before:
+        ts, mid = await _message_position(db, conversation_id, before)
+        query = query.where(or_(Message.timestamp < ts, and_(Message.timestamp == ts, Message.id < mid)))
+        # Page backwards from the cursor, then restore chronological order
+        query = query.order_by(Message.timestamp.desc(), Message.id.desc())
+    else:
+        query = query.order_by(Message.timestamp.asc(), Message.id.asc())
+    if limit:
+        query = query.limit(limit + 1)
+
+    messages = list((await db.execute(query)).scalars().all())
+    if limit:
+        response.headers["X-Has-More"] = "true" if len(messages) > limit else "false"
+        messages = messages[:limit]
+    if before:
+        messages.reverse()
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
     return [
-        MessageResponse(
-            id=m.id,
-            conversation_id=m.conversation_id,
-            role=m.role,
-            original_text=m.original_text,
-            translated_text=m.translated_text,
-            original_language=m.original_language,
-            translated_language=m.translated_language,
-            audio_url=m.audio_url,
-            translated_audio_url=m.translated_audio_url,
-            timestamp=m.timestamp.isoformat(),
-        )
+        MessageResponse(**message_to_dict(m))
         for m in messages
     ]
 
 
+# Background work started from WebSocket frames; referenced so it is not garbage collected
+_ws_tasks: set[asyncio.Task] = set()
+
+
+def _spawn(fn, *args) -> asyncio.Task:
+    task = asyncio.create_task(fn(*args))
+    _ws_tasks.add(task)
+    task.add_done_callback(_ws_tasks.discard)
+    return task
+
+
+async def _handle_send_frame(conn: Connection, conversation_id: str, frame: dict, turn_lock: asyncio.Lock):
+    """Run a "send_text"/"send_audio" frame through the normal message path and ack it."""
+    started = time.perf_counter()
+    ack = {"type": "ack", "client_id": frame.get("client_id")}
+    fields = {k: v for k, v in frame.items() if k not in ("type", "client_id", "conversation_id")}
+    if frame["type"] == "send_text":
+        fields.pop("audio_url", None)
+        if not str(fields.get("text", "")).strip():
+            hub.send(conn, {**ack, "ok": False, "status": 422, "error": "'text' is required"})
+            return
+    else:
+        fields.pop("text", None)
+        if not fields.get("audio_url"):
+            hub.send(conn, {**ack, "ok": False, "status": 422, "error": "'audio_url' is required"})
+            return
+
+    from fastapi import HTTPException
+    try:
+        req = SendMessageRequest(**fields, conversation_id=conversation_id)
+        # One turn at a time per socket, so messages persist in the order they were sent
+        async with turn_lock:
+            message = await _process_message(req, _spawn, endpoint="ws")
+    except ValidationError as e:
+        hub.send(conn, {**ack, "ok": False, "status": 422, "error": str(e)})
+        return
+    except HTTPException as e:
+        hub.send(conn, {**ack, "ok": False, "status": e.status_code, "error": e.detail})
+        return
+    except Exception:
+        logger.exception("Failed to process WebSocket frame", extra={"frame_type": frame["type"]})
+        hub.send(conn, {**ack, "ok": False, "status": 500, "error": "Internal error"})
+        return
+
+    hub.send(conn, {**ack, "ok": True, "message": message.model_dump(), "server_ms": _elapsed_ms(started)})
+
+
 @router.websocket("/ws/{conversation_id}")
 async def websocket_endpoint(websocket: WebSocket, conversation_id: str):
-    """WebSocket endpoint for real-time message updates."""
-    await websocket.accept()
+    """WebSocket endpoint for real-time message updates.
 
-    if conversation_id not in active_connections:
-        active_connections[conversation_id] = []
-    active_connections[conversation_id].append(websocket)
+    Besides the plain-text "ping" keepalive, clients may send JSON frames:
+
+    - {"type": "send_text", "client_id", "role", "text", "pipelined"?, "stream"?}
+    - {"type": "send_audio", "client_id", "role", "audio_url", "pipelined"?, "stream"?}
+    - {"type": "typing", "client_id", "role", "active"}
+
+    Send frames go through the same translate/persist/broadcast path as
+    POST /api/messages and are answered with {"type": "ack", "client_id", "ok",
+    "message" | "error"}. Typing indicators are relayed to the conversation.
+    """
+    await websocket.accept()
+    conn = hub.connect(conversation_id, websocket)
+    turn_lock = asyncio.Lock()
 
     try:
         while True:
             data = await websocket.receive_text()
             if data == "ping":
-                await websocket.send_text("pong")
+                # Through the queue, so the writer task stays the only sender
+                conn.offer("pong")
+                continue
+
+            try:
+                frame = json.loads(data)
+            except ValueError:
+                frame = None
+            if not isinstance(frame, dict):
+                hub.send(conn, {"type": "error", "error": "Frames must be JSON objects"})
+                continue
+
+            frame_type = frame.get("type")
+            if frame_type in ("send_text", "send_audio"):
+                # Handled in a task so pings and typing frames keep flowing during translation
+                _spawn(_handle_send_frame, conn, conversation_id, frame, turn_lock)
+            elif frame_type == "typing":
+                await broadcast(conversation_id, {
+                    "type": "typing",
+                    "conversation_id": conversation_id,
+                    "client_id": frame.get("client_id"),
+                    "role": frame.get("role"),
+                    "active": bool(frame.get("active", True)),
+                })
+            else:
+                hub.send(conn, {
+                    "type": "error",
+                    "client_id": frame.get("client_id"),
+                    "error": f"Unknown frame type: {frame_type}",
+                })
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.disconnect(conn)
+
+
+async def _finish_live(conn: Connection, req: SendMessageRequest, client_id: Optional[str],
+                       session: LiveTranscription, turn_lock: asyncio.Lock):
+    """Recording stopped: wait for the last segments, then persist and ack the message."""
+    started = time.perf_counter()
+    ack = {"type": "ack", "client_id": client_id}
+    from fastapi import HTTPException
+    try:
+        transcript, translation, timings = await session.finish()
+        hub.send(conn, {"type": "final_transcript", "client_id": client_id, "text": transcript})
+        async with turn_lock:
+            message = await _process_message(
+                req, _spawn, prepared=(transcript, translation), timings=timings, endpoint="ws_audio"
+            )
+    except HTTPException as e:
+        hub.send(conn, {**ack, "ok": False, "status": e.status_code, "error": e.detail})
+        return
+    except Exception:
+        logger.exception("Failed to finish live recording", extra={"client_id": client_id})
+        hub.send(conn, {**ack, "ok": False, "status": 500, "error": "Internal error"})
+        return
+
+    hub.send(conn, {**ack, "ok": True, "message": message.model_dump(), "server_ms": _elapsed_ms(started)})
+
+
+@router.websocket("/ws/{conversation_id}/audio")
+async def live_audio_endpoint(websocket: WebSocket, conversation_id: str):
+    """Live voice messages: stream audio while recording, get partial transcripts back.
+
+    Client frames:
+
+    - {"type": "start", "client_id", "role", "format"?, "pipelined"?}
+    - binary: one self-contained audio segment (a complete file of `format`,
+      "webm" by default), transcribed as soon as it arrives
+    - {"type": "stop", "audio_url"?}: recording finished; `audio_url` is the
+      full recording uploaded for playback
+    - {"type": "cancel"}
+
+    The server sends "partial_transcript" frames as segments are transcribed,
+    a "final_transcript" after stop, then an "ack" like the conversation socket.
+    The message itself is broadcast on the conversation socket as usual.
+    """
+    await websocket.accept()
+    # Not subscribed to conversation broadcasts; the hub only serializes our sends
+    conn = hub.connect(conversation_id, websocket, subscribe=False)
+    turn_lock = asyncio.Lock()
+    session: Optional[LiveTranscription] = None
+    req: Optional[SendMessageRequest] = None
+    client_id: Optional[str] = None
+
+    try:
+        while True:
+            data = await websocket.receive()
+            if data["type"] == "websocket.disconnect":
+                break
+
+            if data.get("bytes") is not None:
+                if session is None:
+                    hub.send(conn, {"type": "error", "error": "Send a start frame before audio"})
+                    continue
+                try:
+                    session.add_segment(data["bytes"])
+                except SegmentLimitExceeded as e:
+                    session.cancel()
+                    session = None
+                    hub.send(conn, {"type": "ack", "client_id": client_id, "ok": False, "status": 413, "error": str(e)})
+                continue
+
+            text_data = data.get("text") or ""
+            if text_data == "ping":
+                conn.offer("pong")
+                continue
+            try:
+                frame = json.loads(text_data)
+            except ValueError:
+                frame = None
+            if not isinstance(frame, dict):
+                hub.send(conn, {"type": "error", "error": "Frames must be JSON objects"})
+                continue
+
+            frame_type = frame.get("type")
+            if frame_type == "start":
+                if session is not None:
+                    session.cancel()
+                    session = None
+                client_id = frame.get("client_id")
+                try:
+                    req = SendMessageRequest(
+                        conversation_id=conversation_id,
+                        role=frame.get("role"),
+                        pipelined=frame.get("pipelined"),
+                    )
+                except ValidationError as e:
+                    hub.send(conn, {"type": "ack", "client_id": client_id, "ok": False, "status": 422, "error": str(e)})
+                    continue
+                async with AsyncSessionLocal() as db:
+                    conversation = await db.get(Conversation, conversation_id)
+                if not conversation:
+                    hub.send(conn, {"type": "ack", "client_id": client_id, "ok": False, "status": 404,
+                                    "error": "Conversation not found"})
+                    continue
+                source_lang, target_lang = _languages(conversation, req.role)
+                extension = "." + (re.sub(r"[^a-z0-9]", "", str(frame.get("format", "webm")).lower())[:8] or "webm")
+
+                async def on_partial(index: int, segment_text: str, transcript: str, client_id=client_id):
+                    hub.send(conn, {
+                        "type": "partial_transcript",
+                        "client_id": client_id,
+                        "segment": index,
+                        "text": segment_text,
+                        "transcript": transcript,
+                    })
+
+                session = LiveTranscription(source_lang, target_lang, extension, on_partial)
+            elif frame_type == "stop":
+                if session is None or req is None:
+                    hub.send(conn, {"type": "error", "client_id": client_id, "error": "No recording in progress"})
+                    continue
+                audio_url = frame.get("audio_url")
+                _spawn(_finish_live, conn, req.model_copy(update={"audio_url": audio_url}), client_id, session, turn_lock)
+                session = None
+            elif frame_type == "cancel":
+                if session is not None:
+                    session.cancel()
+                    session = None
+            else:
+                hub.send(conn, {"type": "error", "client_id": frame.get("client_id"),
+                                "error": f"Unknown frame type: {frame_type}"})
     except WebSocketDisconnect:
-        active_connections[conversation_id].remove(websocket)
-        if not active_connections[conversation_id]:
-            del active_connections[conversation_id]
+        pass
+    finally:
+        if session is not None:
+            session.cancel()
+        hub.disconnect(conn)
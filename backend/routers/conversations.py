@@ -1,13 +1,15 @@
+import base64
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy import and_, delete, or_, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import Optional
 
-from database import get_db
-from models import Conversation, Message
-from services.grok_service import summarize_conversation
+from database import AsyncSessionLocal, get_async_db
+from models import Conversation, ConversationSummary, Message
+from services.grok_service import SUMMARY_DEFERRED, SUMMARY_FAILED, summarize_conversation, update_summary
 
 router = APIRouter(prefix="/api/conversations", tags=["conversations"])
 
@@ -45,10 +47,45 @@ class SearchResult(BaseModel):
     timestamp: str
     context_before: str = ""
     context_after: str = ""
+    original_snippet: str = ""
+    translated_snippet: str = ""
+    rank: float = 0.0
+
+
+def _to_response(conv: Conversation) -> ConversationResponse:
+    return ConversationResponse(
+        id=conv.id,
+        title=conv.title,
+        doctor_language=conv.doctor_language,
+        patient_language=conv.patient_language,
+        created_at=conv.created_at.isoformat(),
+        updated_at=conv.updated_at.isoformat(),
+        message_count=conv.message_count or 0,
+    )
+
+
+def _as_datetime(value) -> datetime:
+    # Raw SQL rows return SQLite's stored text rather than a datetime
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+def encode_cursor(conv: Conversation) -> str:
+    raw = f"{conv.updated_at.isoformat()}|{conv.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        updated_at, conv_id = raw.split("|", 1)
+        return datetime.fromisoformat(updated_at), conv_id
+    except (ValueError, UnicodeDecodeError):
+        from fastapi import HTTPException
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 @router.post("", response_model=ConversationResponse)
-async def create_conversation(req: CreateConversationRequest, db: Session = Depends(get_db)):
+async def create_conversation(req: CreateConversationRequest, db: AsyncSession = Depends(get_async_db)):
     """Create a new conversation."""
     conv = Conversation(
         title=req.title,
@@ -56,171 +93,293 @@ async def create_conversation(req: CreateConversationRequest, db: Session = Depe
         patient_language=req.patient_language,
     )
     db.add(conv)
-    db.commit()
-    db.refresh(conv)
+    await db.commit()
+    await db.refresh(conv)
 
-    return ConversationResponse(
-        id=conv.id,
-        title=conv.title,
-        doctor_language=conv.doctor_language,
-        patient_language=conv.patient_language,
-        created_at=conv.created_at.isoformat(),
-        updated_at=conv.updated_at.isoformat(),
-        message_count=0,
-    )
+    return _to_response(conv)
 
 
 @router.patch("/{conversation_id}", response_model=ConversationResponse)
-async def rename_conversation(conversation_id: str, req: RenameConversationRequest, db: Session = Depends(get_db)):
+async def rename_conversation(conversation_id: str, req: RenameConversationRequest, db: AsyncSession = Depends(get_async_db)):
     """Rename a conversation."""
-    conv = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+    conv = await db.get(Conversation, conversation_id)
     if not conv:
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Conversation not found")
 
     conv.title = req.title.strip() or conv.title
     conv.updated_at = datetime.now(timezone.utc)
-    db.commit()
-    db.refresh(conv)
+    await db.commit()
+    await db.refresh(conv)
 
-    msg_count = db.query(Message).filter(Message.conversation_id == conv.id).count()
-    return ConversationResponse(
-        id=conv.id,
-        title=conv.title,
-        doctor_language=conv.doctor_language,
-        patient_language=conv.patient_language,
-        created_at=conv.created_at.isoformat(),
-        updated_at=conv.updated_at.isoformat(),
-        message_count=msg_count,
-    )
+    return _to_response(conv)
 
 
 @router.delete("/{conversation_id}")
-async def delete_conversation(conversation_id: str, db: Session = Depends(get_db)):
+async def delete_conversation(conversation_id: str, db: AsyncSession = Depends(get_async_db)):
     """Delete a conversation and all its messages."""
-    conv = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+    conv = await db.get(Conversation, conversation_id)
     if not conv:
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    db.query(Message).filter(Message.conversation_id == conversation_id).delete()
-    db.delete(conv)
-    db.commit()
+    await db.execute(delete(ConversationSummary).where(ConversationSummary.conversation_id == conversation_id))
+    await db.execute(delete(Message).where(Message.conversation_id == conversation_id))
+    await db.delete(conv)
+    await db.commit()
     return {"ok": True, "deleted": conversation_id}
 
 
 @router.get("", response_model=list[ConversationResponse])
-async def list_conversations(db: Session = Depends(get_db)):
-    """List all conversations, most recent first."""
-    convs = db.query(Conversation).order_by(Conversation.updated_at.desc()).all()
-    result = []
-    for conv in convs:
-        msg_count = db.query(Message).filter(Message.conversation_id == conv.id).count()
-        result.append(
-            ConversationResponse(
-                id=conv.id,
-                title=conv.title,
-                doctor_language=conv.doctor_language,
-                patient_language=conv.patient_language,
-                created_at=conv.created_at.isoformat(),
-                updated_at=conv.updated_at.isoformat(),
-                message_count=msg_count,
+async def list_conversations(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """List conversations, most recent first.
+
+    With `limit`, results are keyset-paginated on (updated_at, id); pass the
+    `X-Next-Cursor` response header back as `cursor` to fetch the next page.
+    """
+    query = select(Conversation).order_by(Conversation.updated_at.desc(), Conversation.id.desc())
+    if cursor:
+        updated_at, conv_id = decode_cursor(cursor)
+        query = query.where(
+            or_(
+                Conversation.updated_at < updated_at,
+                and_(Conversation.updated_at == updated_at, Conversation.id < conv_id),
             )
         )
-    return result
+    if limit:
+        query = query.limit(limit + 1)
+
+    convs = (await db.execute(query)).scalars().all()
+    if limit and len(convs) > limit:
+        convs = convs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(convs[-1])
+    return [_to_response(conv) for conv in convs]
+
+
+# Neighbouring messages are looked up per hit through the
+# (conversation_id, timestamp) index, inside the search query itself. Messages
+# are ordered by (timestamp, id), as in history pages, so equal timestamps tie-break.
+_SEARCH_SQL = """
+SELECT m.id, m.conversation_id, m.role, m.original_text, m.translated_text, m.timestamp,
+       c.title AS conversation_title,
+       {rank} AS rank,
+       {original_snippet} AS original_snippet,
+       {translated_snippet} AS translated_snippet,
+       (SELECT p.original_text FROM messages p
+        WHERE p.conversation_id = m.conversation_id AND (p.timestamp, p.id) < (m.timestamp, m.id)
+        ORDER BY p.timestamp DESC, p.id DESC LIMIT 1) AS context_before,
+       (SELECT n.original_text FROM messages n
+        WHERE n.conversation_id = m.conversation_id AND (n.timestamp, n.id) > (m.timestamp, m.id)
+        ORDER BY n.timestamp ASC, n.id ASC LIMIT 1) AS context_after
+FROM {source}
+LEFT JOIN conversations c ON c.id = m.conversation_id
+WHERE {where}
+ORDER BY {order}
+LIMIT :limit
+"""
+
+SNIPPET_MARKERS = ("**", "**")
+
+_fts_tokenizer: str | None = None
+
+
+async def _search_index(db: AsyncSession) -> str:
+    """Return the messages_fts tokenizer name, or "" when the index does not exist."""
+    global _fts_tokenizer
+    if _fts_tokenizer is None:
+        sql = (await db.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'")
+        )).scalar()
+        _fts_tokenizer = "" if not sql else ("trigram" if "trigram" in sql else "unicode61")
+    return _fts_tokenizer
+
+
+def _fts_phrase(q: str) -> str:
+    # Quote the whole query as one FTS5 phrase so user input is never parsed as syntax
+    return '"' + q.replace('"', '""') + '"'
+
+
+def _like_escape(q: str) -> str:
+    # LIKE wildcards in user input match literally (ESCAPE '\')
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
 
 @router.get("/search", response_model=list[SearchResult])
-async def search_conversations(q: str = Query(..., min_length=1), db: Session = Depends(get_db)):
-    """Search across all conversations for matching text."""
-    search_term = f"%{q}%"
-    messages = (
-        db.query(Message)
-        .filter(
-            or_(
-                Message.original_text.ilike(search_term),
-                Message.translated_text.ilike(search_term),
-            )
+async def search_conversations(q: str = Query(..., min_length=1), db: AsyncSession = Depends(get_async_db)):
+    """Search across all conversations for matching text, best matches first."""
+    q = q.strip()
+    tokenizer = await _search_index(db)
+    # Trigram indexes cannot match queries shorter than three characters
+    use_fts = bool(q) and tokenizer and not (tokenizer == "trigram" and len(q) < 3)
+
+    if use_fts:
+        open_mark, close_mark = SNIPPET_MARKERS
+        sql = _SEARCH_SQL.format(
+            rank="bm25(messages_fts)",
+            original_snippet=f"snippet(messages_fts, 0, '{open_mark}', '{close_mark}', '…', 16)",
+            translated_snippet=f"snippet(messages_fts, 1, '{open_mark}', '{close_mark}', '…', 16)",
+            source="messages_fts JOIN messages m ON m.rowid = messages_fts.rowid",
+            where="messages_fts MATCH :query",
+            order="rank",
         )
-        .order_by(Message.timestamp.desc())
-        .limit(50)
-        .all()
-    )
-
-    results = []
-    for msg in messages:
-        conv = db.query(Conversation).filter(Conversation.id == msg.conversation_id).first()
-
-        # Get surrounding messages for context
-        all_msgs = (
-            db.query(Message)
-            .filter(Message.conversation_id == msg.conversation_id)
-            .order_by(Message.timestamp.asc())
-            .all()
+        params = {"query": _fts_phrase(q), "limit": 50}
+    else:
+        sql = _SEARCH_SQL.format(
+            rank="0.0",
+            original_snippet="''",
+            translated_snippet="''",
+            source="messages m",
+            where=(
+                "lower(m.original_text) LIKE lower(:pattern) ESCAPE '\\' "
+                "OR lower(m.translated_text) LIKE lower(:pattern) ESCAPE '\\'"
+            ),
+            order="m.timestamp DESC",
         )
-        msg_index = next((i for i, m in enumerate(all_msgs) if m.id == msg.id), -1)
-        context_before = all_msgs[msg_index - 1].original_text if msg_index > 0 else ""
-        context_after = all_msgs[msg_index + 1].original_text if msg_index < len(all_msgs) - 1 else ""
-
-        results.append(
-            SearchResult(
-                conversation_id=msg.conversation_id,
-                conversation_title=conv.title if conv else "Unknown",
-                message_id=msg.id,
-                role=msg.role,
-                original_text=msg.original_text,
-                translated_text=msg.translated_text,
-                timestamp=msg.timestamp.isoformat(),
-                context_before=context_before,
-                context_after=context_after,
-            )
+        params = {"pattern": f"%{_like_escape(q)}%", "limit": 50}
+
+    rows = (await db.execute(text(sql), params)).mappings().all()
+    return [
+        SearchResult(
+            conversation_id=row["conversation_id"],
+            conversation_title=row["conversation_title"] or "Unknown",
+            message_id=row["id"],
+            role=row["role"],
+            original_text=row["original_text"] or "",
+            translated_text=row["translated_text"] or "",
+            timestamp=_as_datetime(row["timestamp"]).isoformat(),
+            context_before=row["context_before"] or "",
+            context_after=row["context_after"] or "",
+            original_snippet=row["original_snippet"] or "",
+            translated_snippet=row["translated_snippet"] or "",
+            rank=row["rank"],
         )
-
-    return results
+        for row in rows
+    ]
 
 
 @router.get("/{conversation_id}", response_model=ConversationResponse)
-async def get_conversation(conversation_id: str, db: Session = Depends(get_db)):
+async def get_conversation(conversation_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get a specific conversation."""
-    conv = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+    conv = await db.get(Conversation, conversation_id)
     if not conv:
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    msg_count = db.query(Message).filter(Message.conversation_id == conv.id).count()
-    return ConversationResponse(
-        id=conv.id,
-        title=conv.title,
-        doctor_language=conv.doctor_language,
-        patient_language=conv.patient_language,
-        created_at=conv.created_at.isoformat(),
-        updated_at=conv.updated_at.isoformat(),
-        message_count=msg_count,
-    )
+    return _to_response(conv)
 
 
 @router.post("/{conversation_id}/summary")
-async def generate_summary(conversation_id: str, db: Session = Depends(get_db)):
-    """Generate an AI-powered medical summary of the conversation."""
-    conv = db.query(Conversation).filter(Conversation.id == conversation_id).first()
-    if not conv:
-        from fastapi import HTTPException
-        raise HTTPException(status_code=404, detail="Conversation not found")
-
-    messages = (
-        db.query(Message)
-        .filter(Message.conversation_id == conversation_id)
-        .order_by(Message.timestamp.asc())
-        .all()
-    )
-
-    if not messages:
-        return {"summary": "No messages in this conversation to summarize."}
-
-    msg_dicts = [
-        {"role": m.role, "original_text": m.original_text}
-        for m in messages
-    ]
+async def generate_summary(conversation_id: str):
+    """Generate an AI-powered medical summary of the conversation.
+
+    Summaries are persisted with the last message they cover. A repeat
+    request with no new messages is served from the stored summary; new
+    messages are folded into it incrementally.
+
+    No session is held while the summary is generated: that can take as long
+    as the upstream calls plus the scheduler's queueing, and would keep a
+    pooled connection checked out the whole time.
+    """
+    async with AsyncSessionLocal() as db:
+        conv = await db.get(Conversation, conversation_id)
+        if not conv:
+            from fastapi import HTTPException
+            raise HTTPException(status_code=404, detail="Conversation not found")
+
+        latest = (
+            await db.execute(
+                select(Message.id)
+                .where(Message.conversation_id == conversation_id)
+                .order_by(Message.timestamp.desc(), Message.id.desc())
+                .limit(1)
+            )
+        ).scalar()
+        if latest is None:
+            return {"summary": "No messages in this conversation to summarize."}
+
+        stored = await db.get(ConversationSummary, conversation_id)
+        if stored and stored.last_message_id == latest and stored.message_count == conv.message_count:
+            return {
+                "summary": stored.summary,
+                "message_count": stored.message_count,
+                "conversation_id": conversation_id,
+                "mode": "cached",
+            }
+
+        new_messages = None
+        if stored:
+            last_covered = await db.get(Message, stored.last_message_id)
+            if last_covered and last_covered.conversation_id == conversation_id:
+                new_messages = (
+                    await db.execute(
+                        select(Message)
+                        .where(
+                            Message.conversation_id == conversation_id,
+                            or_(
+                                Message.timestamp > last_covered.timestamp,
+                                and_(Message.timestamp == last_covered.timestamp, Message.id > last_covered.id),
+                            ),
+                        )
+                        .order_by(Message.timestamp.asc(), Message.id.asc())
+                    )
+                ).scalars().all()
+                # Anything else changed (e.g. rows removed) — start over
+                if not new_messages or stored.message_count + len(new_messages) != conv.message_count:
+                    new_messages = None
+
+        messages = new_messages or (
+            await db.execute(
+                select(Message)
+                .where(Message.conversation_id == conversation_id)
+                .order_by(Message.timestamp.asc(), Message.id.asc())
+            )
+        ).scalars().all()
+        # Plain values only: the session is closed before the upstream calls
+        msg_dicts = [
+            {"role": m.role, "original_text": m.original_text}
+            for m in messages
+        ]
+        last_message_id = messages[-1].id
+        stored_summary = stored.summary if stored else None
+        stored_count = stored.message_count if stored else 0
+
+    if new_messages:
+        mode = "incremental"
+        summary = await update_summary(stored_summary, msg_dicts)
+        message_count = stored_count + len(msg_dicts)
+    else:
+        mode = "full"
+        summary = await summarize_conversation(msg_dicts)
+        message_count = len(msg_dicts)
+
+    if summary == SUMMARY_DEFERRED and stored_summary is not None:
+        # Shed under load: an older summary beats none
+        return {
+            "summary": stored_summary,
+            "message_count": stored_count,
+            "conversation_id": conversation_id,
+            "mode": "stale",
+        }
+
+    if summary not in (SUMMARY_FAILED, SUMMARY_DEFERRED):
+        # Upsert: concurrent first summaries of one conversation all try to insert
+        values = {
+            "summary": summary,
+            "last_message_id": last_message_id,
+            "message_count": message_count,
+            "updated_at": datetime.now(timezone.utc),
+        }
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                sqlite_insert(ConversationSummary)
+                .values(conversation_id=conversation_id, **values)
+                .on_conflict_do_update(index_elements=[ConversationSummary.conversation_id], set_=values)
+            )
+            await db.commit()
 
-    summary = await summarize_conversation(msg_dicts)
-    return {"summary": summary, "message_count": len(messages), "conversation_id": conversation_id}
+    return {"summary": summary, "message_count": message_count, "conversation_id": conversation_id, "mode": mode}
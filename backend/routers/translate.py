@@ -0,0 +1,41 @@
+import os
+from fastapi import APIRouter
+from pydantic import BaseModel, Field
+
+from services.grok_service import translate_batch
+
+router = APIRouter(prefix="/api/translate", tags=["translate"])
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+
+class BatchItem(BaseModel):
+    text: str = Field(..., max_length=4000)
+    source_language: str
+    target_language: str
+
+
+class BatchTranslateRequest(BaseModel):
+    items: list[BatchItem] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class BatchTranslateResponse(BaseModel):
+    translations: list[str]
+    stats: dict[str, int]
+
+
+@router.post("/batch", response_model=BatchTranslateResponse)
+async def translate_batch_endpoint(req: BatchTranslateRequest):
+    """Translate many texts at once, e.g. a whole conversation after a language
+    change or an intake questionnaire. Translations are returned in item order.
+
+    Items with the same language pair are packed into shared upstream requests;
+    `stats` reports phrasebook and cache hits and how many upstream requests
+    were made.
+    """
+    stats: dict[str, int] = {}
+    translations = await translate_batch(
+        [(item.text, item.source_language, item.target_language) for item in req.items],
+        stats,
+    )
+    return BatchTranslateResponse(translations=translations, stats=stats)
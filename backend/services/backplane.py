@@ -0,0 +1,318 @@
+"""Cross-worker backplanes for real-time broadcasts.
+
+A backplane carries serialized conversation events between every process
+serving the API, so a message posted to one uvicorn worker (or instance)
+reaches sockets held by the others. The hub always delivers to its own
+sockets directly; a backplane only has to hand it events published elsewhere.
+
+- ``memory``: single process, nothing to relay (the default)
+- ``sqlite``: workers on one machine share an event table and poll it
+- ``redis``: PUBLISH/SUBSCRIBE over the Redis protocol, for multiple hosts
+"""
+import abc
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable
+from urllib.parse import urlparse
+
+from database import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_BACKPLANE = os.getenv("BROADCAST_BACKPLANE", "memory").lower()
+BACKPLANE_SQLITE_PATH = os.getenv("BACKPLANE_SQLITE_PATH") or os.path.join(DATA_DIR, "backplane.db")
+BACKPLANE_POLL_MS = int(os.getenv("BACKPLANE_POLL_MS", "50"))
+BACKPLANE_RETENTION_SECONDS = int(os.getenv("BACKPLANE_RETENTION_SECONDS", "60"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_CHANNEL = os.getenv("BACKPLANE_REDIS_CHANNEL", "medibridge:broadcast")
+
+_PAGE_SIZE = 500
+
+# Receives (conversation_id, frame) for events published by other processes
+DeliverFn = Callable[[str, str], None]
+
+
+class Backplane(abc.ABC):
+    """Interface: relay serialized frames to every other process."""
+
+    name = "base"
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self.stats = {"published": 0, "received": 0, "errors": 0}
+
+    async def start(self, deliver: DeliverFn):
+        self.deliver = deliver
+
+    @abc.abstractmethod
+    async def publish(self, conversation_id: str, frame: str):
+        """Send a frame to the other processes (this one delivers its own directly)."""
+
+    async def stop(self):
+        pass
+
+    def get_stats(self) -> dict:
+        return {"backend": self.name, "origin": self.origin, **self.stats}
+
+
+class InMemoryBackplane(Backplane):
+    """Single-process backplane: there are no other workers to reach."""
+
+    name = "memory"
+
+    async def publish(self, conversation_id: str, frame: str):
+        self.stats["published"] += 1
+
+
+class SQLiteBackplane(Backplane):
+    """Multi-process backplane for workers sharing a filesystem.
+
+    Events are appended to a WAL-mode SQLite table; each worker polls for rows
+    newer than the last one it has seen and skips its own.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, poll_ms: int, retention_seconds: int):
+        super().__init__()
+        self.path = path
+        self.poll_interval = poll_ms / 1000
+        self.retention_seconds = retention_seconds
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._task: asyncio.Task | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, origin TEXT NOT NULL, "
+                "conversation_id TEXT NOT NULL, frame TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _init(self):
+        with self._lock:
+            row = self._connect().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()
+            self._last_id = row[0]
+
+    def _insert(self, conversation_id: str, frame: str):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO events (origin, conversation_id, frame, created_at) VALUES (?, ?, ?, ?)",
+                (self.origin, conversation_id, frame, time.time()),
+            )
+            conn.commit()
+
+    def _fetch(self) -> list[tuple[int, str, str, str]]:
+        with self._lock:
+            return self._connect().execute(
+                "SELECT id, origin, conversation_id, frame FROM events WHERE id > ? ORDER BY id LIMIT ?",
+                (self._last_id, _PAGE_SIZE),
+            ).fetchall()
+
+    def _prune(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM events WHERE created_at < ?", (time.time() - self.retention_seconds,))
+            conn.commit()
+
+    async def start(self, deliver: DeliverFn):
+        await super().start(deliver)
+        await asyncio.to_thread(self._init)
+        self._task = asyncio.create_task(self._poll_loop())
+
+    async def _poll_loop(self):
+        last_prune = time.monotonic()
+        while True:
+            rows = []
+            try:
+                rows = await asyncio.to_thread(self._fetch)
+                for event_id, origin, conversation_id, frame in rows:
+                    self._last_id = event_id
+                    if origin != self.origin:
+                        self.stats["received"] += 1
+                        self.deliver(conversation_id, frame)
+                if time.monotonic() - last_prune > 10:
+                    last_prune = time.monotonic()
+                    await asyncio.to_thread(self._prune)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning("SQLite backplane poll error", extra={"error": repr(e)})
+            # A full page means more events are waiting; poll again without sleeping
+            if len(rows) < _PAGE_SIZE:
+                await asyncio.sleep(self.poll_interval)
+
+    async def publish(self, conversation_id: str, frame: str):
+        self.stats["published"] += 1
+        try:
+            await asyncio.to_thread(self._insert, conversation_id, frame)
+        except sqlite3.Error as e:
+            self.stats["errors"] += 1
+            logger.warning("SQLite backplane publish error", extra={"error": repr(e)})
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _encode_resp(*parts: str) -> bytes:
+    out = [f"*{len(parts)}\r\n".encode()]
+    for part in parts:
+        data = part.encode("utf-8")
+        out.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+    return b"".join(out)
+
+
+async def _read_resp(reader: asyncio.StreamReader):
+    """Read one RESP2 value."""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Redis connection closed")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        raise RuntimeError(f"Redis error: {rest.decode()}")
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2].decode("utf-8")
+    if kind == b"*":
+        length = int(rest)
+        if length < 0:
+            return None
+        return [await _read_resp(reader) for _ in range(length)]
+    raise RuntimeError(f"Unexpected Redis reply: {line!r}")
+
+
+class RedisBackplane(Backplane):
+    """Backplane over Redis PUBLISH/SUBSCRIBE, speaking RESP directly (no client library)."""
+
+    name = "redis"
+
+    def __init__(self, url: str, channel: str):
+        super().__init__()
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.channel = channel
+        self._pub: tuple[asyncio.StreamReader, asyncio.StreamWriter] | None = None
+        self._pub_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._subscribed = asyncio.Event()
+
+    async def _open(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            writer.write(_encode_resp("AUTH", self.password))
+            await writer.drain()
+            await _read_resp(reader)
+        return reader, writer
+
+    async def start(self, deliver: DeliverFn):
+        await super().start(deliver)
+        self._task = asyncio.create_task(self._subscribe_loop())
+        try:
+            await asyncio.wait_for(self._subscribed.wait(), 5)
+        except asyncio.TimeoutError:
+            logger.warning("Redis not reachable yet; retrying in background",
+                           extra={"host": self.host, "port": self.port})
+
+    async def _subscribe_loop(self):
+        while True:
+            writer = None
+            try:
+                reader, writer = await self._open()
+                writer.write(_encode_resp("SUBSCRIBE", self.channel))
+                await writer.drain()
+                while True:
+                    reply = await _read_resp(reader)
+                    if not isinstance(reply, list) or not reply:
+                        continue
+                    if reply[0] == "subscribe":
+                        self._subscribed.set()
+                    elif reply[0] == "message" and len(reply) == 3:
+                        self._on_message(reply[2])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                self._subscribed.clear()
+                logger.warning("Redis subscribe error; reconnecting", extra={"error": repr(e)})
+                await asyncio.sleep(1)
+            finally:
+                if writer is not None:
+                    writer.close()
+
+    def _on_message(self, data: str):
+        envelope = json.loads(data)
+        if envelope.get("o") == self.origin:
+            return
+        self.stats["received"] += 1
+        self.deliver(envelope["c"], envelope["f"])
+
+    async def publish(self, conversation_id: str, frame: str):
+        self.stats["published"] += 1
+        envelope = json.dumps({"o": self.origin, "c": conversation_id, "f": frame})
+        async with self._pub_lock:
+            try:
+                if self._pub is None:
+                    self._pub = await self._open()
+                reader, writer = self._pub
+                writer.write(_encode_resp("PUBLISH", self.channel, envelope))
+                await writer.drain()
+                await _read_resp(reader)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning("Redis publish error", extra={"error": repr(e)})
+                if self._pub is not None:
+                    self._pub[1].close()
+                self._pub = None
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._pub is not None:
+            self._pub[1].close()
+            self._pub = None
+
+
+def create_backplane(kind: str = BROADCAST_BACKPLANE) -> Backplane:
+    if kind == "sqlite":
+        return SQLiteBackplane(BACKPLANE_SQLITE_PATH, BACKPLANE_POLL_MS, BACKPLANE_RETENTION_SECONDS)
+    if kind == "redis":
+        return RedisBackplane(REDIS_URL, REDIS_CHANNEL)
+    if kind != "memory":
+        logger.warning("Unknown BROADCAST_BACKPLANE, using memory", extra={"backplane": kind})
+    return InMemoryBackplane()
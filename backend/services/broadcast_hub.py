@@ -0,0 +1,142 @@
+import asyncio
+import json
+import os
+
+from fastapi import WebSocket
+
+from services.backplane import Backplane, create_backplane
+
+# Outbound frames buffered per connection before it counts as a slow consumer
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "64"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+WS_CLOSE_TIMEOUT = 2.0
+
+# 1013 "Try Again Later": the client fell too far behind and should reconnect
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class Connection:
+    """One WebSocket with its bounded outbound queue and writer task."""
+
+    def __init__(self, hub: "BroadcastHub", conversation_id: str, websocket: WebSocket):
+        self.hub = hub
+        self.conversation_id = conversation_id
+        self.websocket = websocket
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=WS_QUEUE_SIZE)
+        self.closed = False
+        self.writer = asyncio.create_task(self._write_loop())
+
+    def offer(self, frame: str) -> bool:
+        """Queue a frame without waiting. Returns False when the queue is full."""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _write_loop(self):
+        try:
+            while True:
+                frame = await self.queue.get()
+                await asyncio.wait_for(self.websocket.send_text(frame), WS_SEND_TIMEOUT)
+                self.hub.stats["delivered"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Dead or stalled socket: drop it instead of failing silently forever
+            self.hub.stats["send_errors"] += 1
+            self.hub.disconnect(self)
+
+
+class BroadcastHub:
+    """Fans out conversation events to WebSockets without letting one slow client delay the rest."""
+
+    def __init__(self, backplane: Backplane | None = None):
+        self.connections: dict[str, set[Connection]] = {}
+        self.backplane = backplane or create_backplane()
+        self.stats = {
+            "published": 0,
+            "enqueued": 0,
+            "delivered": 0,
+            "evictions": 0,
+            "send_errors": 0,
+        }
+
+    async def start(self):
+        """Start relaying events published by other workers. Called from the app lifespan."""
+        await self.backplane.start(self.deliver)
+
+    async def stop(self):
+        await self.backplane.stop()
+
+    def connect(self, conversation_id: str, websocket: WebSocket, subscribe: bool = True) -> Connection:
+        """Register a socket. With subscribe=False it only gets the queued writer, not broadcasts."""
+        conn = Connection(self, conversation_id, websocket)
+        if subscribe:
+            self.connections.setdefault(conversation_id, set()).add(conn)
+        return conn
+
+    def disconnect(self, conn: Connection):
+        if conn.closed:
+            return
+        conn.closed = True
+        if asyncio.current_task() is not conn.writer:
+            conn.writer.cancel()
+        peers = self.connections.get(conn.conversation_id)
+        if peers is not None:
+            peers.discard(conn)
+            if not peers:
+                del self.connections[conn.conversation_id]
+
+    def _evict(self, conn: Connection):
+        self.stats["evictions"] += 1
+        self.disconnect(conn)
+
+        async def close():
+            try:
+                await asyncio.wait_for(conn.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE), WS_CLOSE_TIMEOUT)
+            except Exception:
+                pass
+
+        asyncio.create_task(close())
+
+    def deliver(self, conversation_id: str, frame: str):
+        """Queue an already-serialized frame for every local connection on a conversation."""
+        for conn in list(self.connections.get(conversation_id, ())):
+            if conn.offer(frame):
+                self.stats["enqueued"] += 1
+            else:
+                self._evict(conn)
+
+    def send(self, conn: Connection, payload: dict):
+        """Queue a payload for a single connection (acks, errors), evicting it if it is backed up."""
+        if conn.closed:
+            return
+        if conn.offer(json.dumps(payload)):
+            self.stats["enqueued"] += 1
+        else:
+            self._evict(conn)
+
+    async def publish(self, conversation_id: str, payload: dict):
+        """Serialize a payload once, fan it out locally and relay it to other workers."""
+        self.stats["published"] += 1
+        frame = json.dumps(payload)
+        self.deliver(conversation_id, frame)
+        await self.backplane.publish(conversation_id, frame)
+
+    def get_stats(self) -> dict:
+        depths = [conn.queue.qsize() for peers in self.connections.values() for conn in peers]
+        return {
+            **self.stats,
+            "conversations": len(self.connections),
+            "connections": len(depths),
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "queue_capacity": WS_QUEUE_SIZE,
+            "backplane": self.backplane.get_stats(),
+        }
+
+
+hub = BroadcastHub()
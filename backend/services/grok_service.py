@@ -1,18 +1,32 @@
+import asyncio
+import json
+import logging
 import os
+from typing import Awaitable, Callable
 import httpx
 from dotenv import load_dotenv
 
+from services import http_client
+from services.phrasebook import phrasebook, PHRASEBOOK_ENABLED
+from services.text_segmenter import join_translations, separator_after, split_segments
+from services.upstream_scheduler import Overloaded, work_class
+from services.translation_cache import translation_cache, TRANSLATION_CACHE_ENABLED
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+# OpenAI-compatible base URL; point it at a local stub for tests and benchmarks
+GROQ_API_BASE = os.getenv("GROQ_API_BASE", "https://api.groq.com/openai/v1").rstrip("/")
+GROQ_API_URL = f"{GROQ_API_BASE}/chat/completions"
 GROQ_MODEL = "llama-3.3-70b-versatile"
 
 # Audio models
 WHISPER_MODEL = "whisper-large-v3-turbo"
-WHISPER_API_URL = "https://api.groq.com/openai/v1/audio/transcriptions"
+WHISPER_API_URL = f"{GROQ_API_BASE}/audio/transcriptions"
 TTS_MODEL = "playai-tts"
-TTS_API_URL = "https://api.groq.com/openai/v1/audio/speech"
+TTS_API_URL = f"{GROQ_API_BASE}/audio/speech"
 
 LANGUAGE_NAMES = {
     "en": "English",
@@ -52,137 +66,525 @@ TTS_VOICES = {
 DEFAULT_VOICE = "Fritz-PlayAI"
 
 
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
 async def transcribe_audio(file_path: str, language: str = "") -> str:
     """Transcribe audio file using Groq Whisper API."""
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            with open(file_path, "rb") as f:
-                files = {"file": (os.path.basename(file_path), f, "audio/webm")}
-                data = {
-                    "model": WHISPER_MODEL,
-                    "response_format": "text",
-                }
-                if language and language != "auto":
-                    data["language"] = language
-
-                response = await client.post(
-                    WHISPER_API_URL,
-                    headers={"Authorization": f"Bearer {GROQ_API_KEY}"},
-                    files=files,
-                    data=data,
-                )
-                response.raise_for_status()
-                return response.text.strip()
+        # Read up front so a retried request can resend the same bytes
+        audio = await asyncio.to_thread(_read_file, file_path)
+        return await _transcribe((os.path.basename(file_path), audio, "audio/webm"), language)
+    except OSError as e:
+        logger.warning("Transcription error", extra={"error": repr(e)})
+        return ""
+
+
+async def transcribe_audio_bytes(audio: bytes, filename: str, language: str = "") -> str:
+    """Transcribe an in-memory audio segment (live transcription)."""
+    return await _transcribe((filename, audio, "audio/webm"), language)
+
+
+async def _transcribe(file: tuple, language: str) -> str:
+    try:
+        data = {
+            "model": WHISPER_MODEL,
+            "response_format": "text",
+        }
+        if language and language != "auto":
+            data["language"] = language
+
+        response = await http_client.post(
+            "transcribe",
+            WHISPER_API_URL,
+            headers={"Authorization": f"Bearer {GROQ_API_KEY}"},
+            files={"file": file},
+            data=data,
+        )
+        response.raise_for_status()
+        return response.text.strip()
     except httpx.HTTPStatusError as e:
-        print(f"Transcription HTTP error: {e.response.status_code} - {e.response.text}")
+        logger.warning("Transcription HTTP error", extra={
+            "status": e.response.status_code, "body": e.response.text[:500],
+        })
         return ""
     except Exception as e:
-        print(f"Transcription error: {e}")
+        logger.warning("Transcription error", extra={"error": repr(e)})
         return ""
 
 
+def tts_model_and_voice(language: str) -> tuple[str, str]:
+    """Choose TTS model and voice based on language."""
+    model = "playai-tts-arabic" if language == "ar" else TTS_MODEL
+    voice = TTS_VOICES.get(language, DEFAULT_VOICE)
+    return model, voice
+
+
 async def text_to_speech(text: str, language: str = "en") -> bytes | None:
     """Convert text to speech using Groq PlayAI TTS API. Returns audio bytes (wav)."""
     if not text.strip():
         return None
 
-    # Choose model and voice based on language
-    model = "playai-tts-arabic" if language == "ar" else TTS_MODEL
-    voice = TTS_VOICES.get(language, DEFAULT_VOICE)
+    model, voice = tts_model_and_voice(language)
 
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                TTS_API_URL,
-                headers={
-                    "Authorization": f"Bearer {GROQ_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": model,
-                    "input": text[:4096],  # PlayAI limit
-                    "voice": voice,
-                    "response_format": "wav",
-                },
-            )
-            response.raise_for_status()
-            return response.content
+        response = await http_client.post(
+            "tts",
+            TTS_API_URL,
+            headers={
+                "Authorization": f"Bearer {GROQ_API_KEY}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": model,
+                "input": text[:4096],  # PlayAI limit
+                "voice": voice,
+                "response_format": "wav",
+            },
+        )
+        response.raise_for_status()
+        return response.content
     except httpx.HTTPStatusError as e:
-        print(f"TTS HTTP error: {e.response.status_code} - {e.response.text}")
+        logger.warning("TTS HTTP error", extra={
+            "status": e.response.status_code, "body": e.response.text[:500],
+        })
         return None
     except Exception as e:
-        print(f"TTS error: {e}")
+        logger.warning("TTS error", extra={"error": repr(e)})
         return None
 
 
+def _translation_messages(
+    text: str, source_name: str, target_name: str, context: tuple[str, str] | None = None,
+) -> list[dict]:
+    system_prompt = (
+        f"Translate the user's message from {source_name} to {target_name}. "
+        f"Reply with ONLY the {target_name} translation. "
+        "No quotes, no labels, no commentary, no original text repeated."
+    )
+    if context:
+        # Neighbouring source text, so segments of one message use the same terminology
+        before, after = context
+        system_prompt += " The message is one part of a longer text."
+        if before:
+            system_prompt += f' It follows: "{before}".'
+        if after:
+            system_prompt += f' It is followed by: "{after}".'
+        system_prompt += " Translate only the user's message, not this surrounding text."
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": text},
+    ]
+
+
+def _clean_translation(result: str, source_name: str, target_name: str) -> str:
+    result = result.strip()
+    # Strip common prefixes models sometimes add
+    for prefix in [
+        "Translation:", "Translated text:", "Here is the translation:",
+        f"{target_name}:", f"{source_name} to {target_name}:",
+        "Here's the translation:", "Translated:",
+    ]:
+        if result.lower().startswith(prefix.lower()):
+            result = result[len(prefix):].strip()
+    # Strip wrapping quotes
+    if len(result) >= 2 and result[0] in ('"', "'", "\u201c") and result[-1] in ('"', "'", "\u201d"):
+        result = result[1:-1]
+    return result
+
+
+# Messages longer than this (chars) are split into sentence-aligned segments that
+# are translated in parallel; 0 always sends the whole message in one request
+TRANSLATE_CHUNK_THRESHOLD = int(os.getenv("TRANSLATE_CHUNK_THRESHOLD", "1200"))
+TRANSLATE_CHUNK_CHARS = int(os.getenv("TRANSLATE_CHUNK_CHARS", "500"))
+TRANSLATE_CHUNK_CONCURRENCY = int(os.getenv("TRANSLATE_CHUNK_CONCURRENCY", "6"))
+# Source text on either side of a segment sent along for consistency
+TRANSLATE_CHUNK_CONTEXT_CHARS = 200
+
+
+def _is_long(text: str) -> bool:
+    return 0 < TRANSLATE_CHUNK_THRESHOLD < len(text)
+
+
+async def _complete_translation(messages: list[dict], source_name: str, target_name: str) -> str:
+    response = await http_client.post(
+        "translate",
+        GROQ_API_URL,
+        headers={
+            "Authorization": f"Bearer {GROQ_API_KEY}",
+            "Content-Type": "application/json",
+        },
+        json={
+            "model": GROQ_MODEL,
+            "messages": messages,
+            "temperature": 0.1,
+            "max_tokens": 1024,
+        },
+    )
+    response.raise_for_status()
+    data = response.json()
+    return _clean_translation(data["choices"][0]["message"]["content"], source_name, target_name)
+
+
+async def _translate_long(
+    text: str,
+    source_lang: str,
+    target_lang: str,
+    on_delta: Callable[[str], Awaitable[None]] | None = None,
+) -> str:
+    """Translate a long message as sentence-aligned segments, concurrently.
+
+    Keeps each request well inside max_tokens and cuts decode time to that of
+    the longest segment. Segments are reassembled in order; with on_delta each
+    one is passed on as soon as everything before it is done. Any failed
+    segment fails the whole message rather than mixing in untranslated text.
+    """
+    source_name = LANGUAGE_NAMES.get(source_lang, source_lang)
+    target_name = LANGUAGE_NAMES.get(target_lang, target_lang)
+    segments = split_segments(text, source_lang, TRANSLATE_CHUNK_CHARS)
+    semaphore = asyncio.Semaphore(TRANSLATE_CHUNK_CONCURRENCY)
+
+    async def translate_segment(i: int) -> str:
+        before = "".join(segments[:i])[-TRANSLATE_CHUNK_CONTEXT_CHARS:].strip()
+        after = "".join(segments[i + 1:])[:TRANSLATE_CHUNK_CONTEXT_CHARS].strip()
+        messages = _translation_messages(segments[i].strip(), source_name, target_name, (before, after))
+        async with semaphore:
+            return await _complete_translation(messages, source_name, target_name)
+
+    tasks = [asyncio.ensure_future(translate_segment(i)) for i in range(len(segments))]
+    try:
+        if on_delta is not None:
+            for i, task in enumerate(tasks):
+                translation = (await task).strip()
+                if i < len(tasks) - 1:
+                    translation += separator_after(segments[i], target_lang)
+                await on_delta(translation)
+        result = join_translations(segments, await asyncio.gather(*tasks), target_lang)
+    except Exception as e:
+        for task in tasks:
+            task.cancel()
+        logger.warning("Long translation error", extra={
+            "error": repr(e), "language_pair": f"{source_lang}-{target_lang}", "segments": len(segments),
+        })
+        return f"[Translation failed] {text}"
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    if TRANSLATION_CACHE_ENABLED:
+        await translation_cache.put(text, source_lang, target_lang, GROQ_MODEL, result)
+    return result
+
+
 async def translate_text(text: str, source_lang: str, target_lang: str) -> str:
     """Translate text using Groq API with medical context awareness."""
     if source_lang == target_lang:
         return text
 
+    if PHRASEBOOK_ENABLED:
+        phrase = phrasebook.lookup(text, source_lang, target_lang)
+        if phrase is not None:
+            return phrase
+
+    if TRANSLATION_CACHE_ENABLED:
+        cached = await translation_cache.get(text, source_lang, target_lang, GROQ_MODEL)
+        if cached is not None:
+            return cached
+
+    if _is_long(text):
+        return await _translate_long(text, source_lang, target_lang)
+
     source_name = LANGUAGE_NAMES.get(source_lang, source_lang)
     target_name = LANGUAGE_NAMES.get(target_lang, target_lang)
 
-    system_prompt = (
-        f"Translate the user's message from {source_name} to {target_name}. "
-        f"Reply with ONLY the {target_name} translation. "
-        "No quotes, no labels, no commentary, no original text repeated."
-    )
+    try:
+        result = await _complete_translation(
+            _translation_messages(text, source_name, target_name), source_name, target_name,
+        )
+        if TRANSLATION_CACHE_ENABLED:
+            await translation_cache.put(text, source_lang, target_lang, GROQ_MODEL, result)
+        return result
+    except httpx.HTTPStatusError as e:
+        logger.warning("Translation HTTP error", extra={
+            "status": e.response.status_code, "body": e.response.text[:500],
+            "language_pair": f"{source_lang}-{target_lang}",
+        })
+        return f"[Translation failed] {text}"
+    except Exception as e:
+        logger.warning("Translation error", extra={
+            "error": repr(e), "language_pair": f"{source_lang}-{target_lang}",
+        })
+        return f"[Translation failed] {text}"
 
+
+async def translate_text_stream(
+    text: str,
+    source_lang: str,
+    target_lang: str,
+    on_delta: Callable[[str], Awaitable[None]],
+) -> str:
+    """Translate text with the streaming completions API.
+
+    Each content delta is passed to on_delta as it arrives. The returned
+    final text gets the same cleanup as translate_text.
+    """
+    if source_lang == target_lang:
+        await on_delta(text)
+        return text
+
+    if PHRASEBOOK_ENABLED:
+        phrase = phrasebook.lookup(text, source_lang, target_lang)
+        if phrase is not None:
+            await on_delta(phrase)
+            return phrase
+
+    if TRANSLATION_CACHE_ENABLED:
+        cached = await translation_cache.get(text, source_lang, target_lang, GROQ_MODEL)
+        if cached is not None:
+            await on_delta(cached)
+            return cached
+
+    if _is_long(text):
+        # Parallel segments beat one long stream; they are relayed in order as they finish
+        return await _translate_long(text, source_lang, target_lang, on_delta)
+
+    source_name = LANGUAGE_NAMES.get(source_lang, source_lang)
+    target_name = LANGUAGE_NAMES.get(target_lang, target_lang)
+
+    parts: list[str] = []
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                GROQ_API_URL,
-                headers={
-                    "Authorization": f"Bearer {GROQ_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": GROQ_MODEL,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": text},
-                    ],
-                    "temperature": 0.1,
-                    "max_tokens": 1024,
-                },
-            )
+        async with http_client.stream(
+            "translate",
+            "POST",
+            GROQ_API_URL,
+            headers={
+                "Authorization": f"Bearer {GROQ_API_KEY}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": GROQ_MODEL,
+                "messages": _translation_messages(text, source_name, target_name),
+                "temperature": 0.1,
+                "max_tokens": 1024,
+                "stream": True,
+            },
+        ) as response:
             response.raise_for_status()
-            data = response.json()
-            result = data["choices"][0]["message"]["content"].strip()
-            # Strip common prefixes models sometimes add
-            for prefix in [
-                "Translation:", "Translated text:", "Here is the translation:",
-                f"{target_name}:", f"{source_name} to {target_name}:",
-                "Here's the translation:", "Translated:",
-            ]:
-                if result.lower().startswith(prefix.lower()):
-                    result = result[len(prefix):].strip()
-            # Strip wrapping quotes
-            if len(result) >= 2 and result[0] in ('"', "'", "\u201c") and result[-1] in ('"', "'", "\u201d"):
-                result = result[1:-1]
-            return result
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+                choices = json.loads(payload).get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    parts.append(delta)
+                    await on_delta(delta)
+        result = _clean_translation("".join(parts), source_name, target_name)
+        if TRANSLATION_CACHE_ENABLED:
+            await translation_cache.put(text, source_lang, target_lang, GROQ_MODEL, result)
+        return result
     except httpx.HTTPStatusError as e:
-        print(f"Translation HTTP error: {e.response.status_code} - {e.response.text}")
+        logger.warning("Translation stream HTTP error", extra={
+            "status": e.response.status_code, "language_pair": f"{source_lang}-{target_lang}",
+        })
         return f"[Translation failed] {text}"
     except Exception as e:
-        print(f"Translation error: {e}")
+        logger.warning("Translation stream error", extra={
+            "error": repr(e), "language_pair": f"{source_lang}-{target_lang}",
+        })
         return f"[Translation failed] {text}"
 
 
-async def summarize_conversation(messages: list[dict]) -> str:
-    """Generate a medical summary of the conversation using Groq API."""
-    conversation_text = ""
-    for msg in messages:
-        role_label = "Doctor" if msg["role"] == "doctor" else "Patient"
-        conversation_text += f"{role_label}: {msg['original_text']}\n"
+# Batch translation: items sharing a language pair are packed into one completion
+BATCH_PACK_MAX_ITEMS = int(os.getenv("BATCH_PACK_MAX_ITEMS", "25"))
+BATCH_PACK_MAX_CHARS = int(os.getenv("BATCH_PACK_MAX_CHARS", "6000"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
 
-    prompt = f"""You are a medical documentation specialist. Analyze the following doctor-patient conversation and generate a structured clinical summary.
 
-Conversation:
-{conversation_text}
+def _batch_messages(texts: list[str], source_name: str, target_name: str) -> list[dict]:
+    system_prompt = (
+        f"You translate medical conversation snippets from {source_name} to {target_name}. "
+        "The user sends a JSON array of strings. Reply with ONLY a JSON array of their "
+        f"{target_name} translations: same length, same order, one translation per string, "
+        "no commentary."
+    )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": json.dumps(texts, ensure_ascii=False)},
+    ]
+
 
-Generate a summary with the following sections (only include sections that have relevant information):
+def _parse_batch(content: str, expected: int) -> list[str] | None:
+    """Pull the JSON array out of a batch reply. None if it does not line up with the input."""
+    start, end = content.find("["), content.rfind("]")
+    if start < 0 or end <= start:
+        return None
+    try:
+        parsed = json.loads(content[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(parsed, list) or len(parsed) != expected or not all(isinstance(t, str) for t in parsed):
+        return None
+    return parsed
+
+
+def _pack(texts: list[str]) -> list[list[str]]:
+    """Split texts into packs within the item/char limits, balanced so packs finish together."""
+    total_chars = sum(len(t) for t in texts)
+    count = max(-(-len(texts) // BATCH_PACK_MAX_ITEMS), -(-total_chars // BATCH_PACK_MAX_CHARS), 1)
+    per_pack = -(-len(texts) // count)
+    packs: list[list[str]] = []
+    current: list[str] = []
+    size = 0
+    for text in texts:
+        if current and (len(current) >= per_pack or size + len(text) > BATCH_PACK_MAX_CHARS):
+            packs.append(current)
+            current, size = [], 0
+        current.append(text)
+        size += len(text)
+    if current:
+        packs.append(current)
+    return packs
+
+
+async def _translate_pack(texts: list[str], source_lang: str, target_lang: str, stats: dict) -> list[str]:
+    """Translate several texts for one language pair in a single request.
+
+    Falls back to one request per text when the reply cannot be matched up.
+    """
+    if len(texts) == 1:
+        stats["upstream_requests"] += 1
+        return [await translate_text(texts[0], source_lang, target_lang)]
+
+    source_name = LANGUAGE_NAMES.get(source_lang, source_lang)
+    target_name = LANGUAGE_NAMES.get(target_lang, target_lang)
+    stats["upstream_requests"] += 1
+    try:
+        response = await http_client.post(
+            "translate",
+            GROQ_API_URL,
+            headers={
+                "Authorization": f"Bearer {GROQ_API_KEY}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": GROQ_MODEL,
+                "messages": _batch_messages(texts, source_name, target_name),
+                "temperature": 0.1,
+                # Translations run about as long as the source; leave room for JSON quoting
+                "max_tokens": min(8192, 1024 + sum(len(t) for t in texts)),
+            },
+        )
+        response.raise_for_status()
+        parsed = _parse_batch(response.json()["choices"][0]["message"]["content"], len(texts))
+    except Overloaded as e:
+        # Retrying item by item would only add load; the caller can resubmit later
+        logger.warning("Batch translation shed", extra={
+            "error": str(e), "language_pair": f"{source_lang}-{target_lang}", "items": len(texts),
+        })
+        stats["shed"] += 1
+        return [f"[Translation failed] {t}" for t in texts]
+    except httpx.HTTPStatusError as e:
+        logger.warning("Batch translation HTTP error", extra={
+            "status": e.response.status_code, "body": e.response.text[:500],
+            "language_pair": f"{source_lang}-{target_lang}", "items": len(texts),
+        })
+        parsed = None
+    except Exception as e:
+        logger.warning("Batch translation error", extra={
+            "error": repr(e), "language_pair": f"{source_lang}-{target_lang}", "items": len(texts),
+        })
+        parsed = None
+
+    if parsed is None:
+        logger.info("Batch reply did not parse; translating items one by one",
+                    extra={"language_pair": f"{source_lang}-{target_lang}", "items": len(texts)})
+        stats["fallbacks"] += 1
+        stats["upstream_requests"] += len(texts)
+        return list(await asyncio.gather(*(translate_text(t, source_lang, target_lang) for t in texts)))
+
+    results = [_clean_translation(t, source_name, target_name) for t in parsed]
+    if TRANSLATION_CACHE_ENABLED:
+        for text, result in zip(texts, results):
+            if result:
+                await translation_cache.put(text, source_lang, target_lang, GROQ_MODEL, result)
+    return results
+
+
+async def translate_batch(items: list[tuple[str, str, str]], stats: dict | None = None) -> list[str]:
+    """Translate many (text, source_lang, target_lang) items; results come back in input order.
+
+    Phrasebook hits, cache hits and identical items are resolved first. The
+    remaining texts are grouped by language pair, packed into as few
+    completions as BATCH_PACK_MAX_ITEMS / BATCH_PACK_MAX_CHARS allow, and the
+    packs run with at most BATCH_MAX_CONCURRENCY requests in flight, in the
+    scheduler's batch class so they yield to live translations.
+    """
+    stats = {} if stats is None else stats
+    stats.update(
+        items=len(items), phrasebook=0, cached=0, unique=0, packs=0, upstream_requests=0, fallbacks=0, shed=0,
+    )
+    results: list[str | None] = [None] * len(items)
+    # (source, target) -> text -> positions in `items`
+    pending: dict[tuple[str, str], dict[str, list[int]]] = {}
+
+    for i, (text, source_lang, target_lang) in enumerate(items):
+        if not text.strip() or source_lang == target_lang:
+            results[i] = text
+            continue
+        positions = pending.setdefault((source_lang, target_lang), {})
+        if text in positions:
+            positions[text].append(i)
+            continue
+        if PHRASEBOOK_ENABLED:
+            phrase = phrasebook.lookup(text, source_lang, target_lang)
+            if phrase is not None:
+                stats["phrasebook"] += 1
+                results[i] = phrase
+                continue
+        if TRANSLATION_CACHE_ENABLED:
+            cached = await translation_cache.get(text, source_lang, target_lang, GROQ_MODEL)
+            if cached is not None:
+                stats["cached"] += 1
+                results[i] = cached
+                continue
+        positions[text] = [i]
+
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+
+    async def run_pack(pack: list[str], source_lang: str, target_lang: str):
+        async with semaphore:
+            translations = await _translate_pack(pack, source_lang, target_lang, stats)
+        for text, translation in zip(pack, translations):
+            for i in pending[(source_lang, target_lang)][text]:
+                results[i] = translation
+
+    jobs = []
+    for (source_lang, target_lang), positions in pending.items():
+        stats["unique"] += len(positions)
+        for pack in _pack(list(positions)):
+            jobs.append(run_pack(pack, source_lang, target_lang))
+    stats["packs"] = len(jobs)
+    with work_class("batch"):
+        await asyncio.gather(*jobs)
+    return results
+
+
+SUMMARY_FAILED = "Failed to generate summary. Please try again."
+# Returned when the scheduler sheds summary work under load
+SUMMARY_DEFERRED = "The summary service is busy. Please try again in a minute."
+
+# Transcripts longer than this are summarized map-reduce style
+SUMMARY_CHUNK_CHARS = int(os.getenv("SUMMARY_CHUNK_CHARS", "12000"))
+SUMMARY_MAX_CONCURRENCY = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4"))
+
+SUMMARY_SYSTEM_PROMPT = "You are a medical documentation specialist who creates structured clinical summaries from doctor-patient conversations."
+
+SUMMARY_SECTIONS = """Generate a summary with the following sections (only include sections that have relevant information):
 
 ## Chief Complaint
 Brief description of the patient's primary concern.
@@ -207,30 +609,155 @@ Brief description of the patient's primary concern.
 
 Format the summary in clear markdown. Be concise but thorough."""
 
+
+def _format_transcript(messages: list[dict]) -> str:
+    conversation_text = ""
+    for msg in messages:
+        role_label = "Doctor" if msg["role"] == "doctor" else "Patient"
+        conversation_text += f"{role_label}: {msg['original_text']}\n"
+    return conversation_text
+
+
+def _chunk_messages(messages: list[dict], max_chars: int) -> list[list[dict]]:
+    """Split messages into consecutive chunks whose transcripts stay under max_chars."""
+    chunks: list[list[dict]] = []
+    current: list[dict] = []
+    size = 0
+    for msg in messages:
+        length = len(msg["original_text"]) + 10
+        if current and size + length > max_chars:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(msg)
+        size += length
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def _summary_completion(prompt: str, max_tokens: int = 2048) -> str:
+    response = await http_client.post(
+        "summary",
+        GROQ_API_URL,
+        headers={
+            "Authorization": f"Bearer {GROQ_API_KEY}",
+            "Content-Type": "application/json",
+        },
+        json={
+            "model": GROQ_MODEL,
+            "messages": [
+                {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": 0.4,
+            "max_tokens": max_tokens,
+        },
+    )
+    response.raise_for_status()
+    data = response.json()
+    return data["choices"][0]["message"]["content"].strip()
+
+
+async def _run_summary(prompt: str) -> str:
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                GROQ_API_URL,
-                headers={
-                    "Authorization": f"Bearer {GROQ_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": GROQ_MODEL,
-                    "messages": [
-                        {"role": "system", "content": "You are a medical documentation specialist who creates structured clinical summaries from doctor-patient conversations."},
-                        {"role": "user", "content": prompt},
-                    ],
-                    "temperature": 0.4,
-                    "max_tokens": 2048,
-                },
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data["choices"][0]["message"]["content"].strip()
+        return await _summary_completion(prompt)
+    except Overloaded as e:
+        logger.warning("Summary shed", extra={"error": str(e)})
+        return SUMMARY_DEFERRED
     except httpx.HTTPStatusError as e:
-        print(f"Summary HTTP error: {e.response.status_code} - {e.response.text}")
-        return "Failed to generate summary. Please try again."
+        logger.warning("Summary HTTP error", extra={
+            "status": e.response.status_code, "body": e.response.text[:500],
+        })
+        return SUMMARY_FAILED
     except Exception as e:
-        print(f"Summary error: {e}")
-        return "Failed to generate summary. Please try again."
+        logger.warning("Summary error", extra={"error": repr(e)})
+        return SUMMARY_FAILED
+
+
+async def _summarize_chunks(messages: list[dict]) -> list[str]:
+    """Map step: extract clinical notes from each transcript chunk concurrently."""
+    chunks = _chunk_messages(messages, SUMMARY_CHUNK_CHARS)
+    semaphore = asyncio.Semaphore(SUMMARY_MAX_CONCURRENCY)
+
+    async def summarize_chunk(index: int, chunk: list[dict]) -> str:
+        prompt = f"""This is part {index + 1} of {len(chunks)} of a doctor-patient conversation.
+
+Conversation excerpt:
+{_format_transcript(chunk)}
+
+List every medically relevant fact in this excerpt as concise bullet points: complaints, symptoms (with onset and duration), diagnoses, medications and doses, treatments, follow-up actions and other clinical notes. Do not add facts that are not in the excerpt."""
+        async with semaphore:
+            return await _summary_completion(prompt, max_tokens=1024)
+
+    tasks = [asyncio.ensure_future(summarize_chunk(i, chunk)) for i, chunk in enumerate(chunks)]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        # One chunk failed (or was shed); the summary is lost, so free the others' slots
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+def _notes_block(notes: list[str]) -> str:
+    return "\n\n".join(f"### Part {i + 1}\n{note}" for i, note in enumerate(notes))
+
+
+async def summarize_conversation(messages: list[dict]) -> str:
+    """Generate a medical summary of the conversation using Groq API.
+
+    Long transcripts are split into chunks that are summarized concurrently
+    and then combined (map-reduce), so they never overflow the model context.
+    """
+    conversation_text = _format_transcript(messages)
+
+    if len(conversation_text) <= SUMMARY_CHUNK_CHARS:
+        prompt = f"""You are a medical documentation specialist. Analyze the following doctor-patient conversation and generate a structured clinical summary.
+
+Conversation:
+{conversation_text}
+
+{SUMMARY_SECTIONS}"""
+        return await _run_summary(prompt)
+
+    try:
+        notes = await _summarize_chunks(messages)
+    except Overloaded as e:
+        logger.warning("Summary shed", extra={"error": str(e)})
+        return SUMMARY_DEFERRED
+    except Exception as e:
+        logger.warning("Summary chunk error", extra={"error": repr(e)})
+        return SUMMARY_FAILED
+
+    prompt = f"""You are a medical documentation specialist. The following notes were extracted, in order, from consecutive parts of one long doctor-patient conversation. Combine them into a single structured clinical summary, merging duplicates and keeping later information where it supersedes earlier information.
+
+Notes:
+{_notes_block(notes)}
+
+{SUMMARY_SECTIONS}"""
+    return await _run_summary(prompt)
+
+
+async def update_summary(previous_summary: str, new_messages: list[dict]) -> str:
+    """Fold new messages into an existing summary instead of re-reading the whole transcript."""
+    new_text = _format_transcript(new_messages)
+    if len(new_text) > SUMMARY_CHUNK_CHARS:
+        try:
+            new_text = _notes_block(await _summarize_chunks(new_messages))
+        except Overloaded as e:
+            logger.warning("Summary shed", extra={"error": str(e)})
+            return SUMMARY_DEFERRED
+        except Exception as e:
+            logger.warning("Summary chunk error", extra={"error": repr(e)})
+            return SUMMARY_FAILED
+
+    prompt = f"""You are a medical documentation specialist. Below is the current clinical summary of an ongoing doctor-patient conversation, followed by what was said since it was written. Update the summary so it covers the whole conversation, keeping everything that is still accurate and revising anything the new messages change.
+
+Current summary:
+{previous_summary}
+
+New messages:
+{new_text}
+
+{SUMMARY_SECTIONS}"""
+    return await _run_summary(prompt)
@@ -0,0 +1,238 @@
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+import httpx
+from dotenv import load_dotenv
+
+from services import metrics
+from services.single_flight import SingleFlight
+from services.upstream_governor import governor
+from services.upstream_scheduler import class_for, scheduler
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Connection pool configuration
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "50"))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "20"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30"))
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "10"))
+UPSTREAM_POOL_TIMEOUT = float(os.getenv("UPSTREAM_POOL_TIMEOUT", "10"))
+UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "false").lower() in ("1", "true", "yes")
+
+# Read timeouts per upstream operation (seconds)
+OPERATION_TIMEOUTS = {
+    "transcribe": float(os.getenv("TRANSCRIBE_TIMEOUT", "60")),
+    "translate": float(os.getenv("TRANSLATE_TIMEOUT", "30")),
+    "tts": float(os.getenv("TTS_TIMEOUT", "60")),
+    "summary": float(os.getenv("SUMMARY_TIMEOUT", "60")),
+}
+DEFAULT_TIMEOUT = 60.0
+
+# Rate-limit / breaker group for each operation (see upstream_governor)
+OPERATION_KINDS = {
+    "transcribe": "whisper",
+    "translate": "chat",
+    "summary": "chat",
+    "tts": "tts",
+}
+
+# Operations whose identical concurrent requests share one upstream call
+UPSTREAM_COALESCE_ENABLED = os.getenv("UPSTREAM_COALESCE_ENABLED", "true").lower() in ("1", "true", "yes")
+COALESCED_OPERATIONS = {"translate", "summary"}
+
+_client: httpx.AsyncClient | None = None
+_http2_enabled = False
+
+# Usage counters, keyed by operation name
+_in_flight: dict[str, int] = {}
+_single_flight = SingleFlight()
+_stats = {
+    "requests": 0,
+    "errors": 0,
+    "in_flight": 0,
+    "peak_in_flight": 0,
+    "saturated": 0,
+    "total_seconds": 0.0,
+}
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def _build_client() -> httpx.AsyncClient:
+    global _http2_enabled
+    _http2_enabled = UPSTREAM_HTTP2 and _http2_available()
+    if UPSTREAM_HTTP2 and not _http2_enabled:
+        logger.warning("UPSTREAM_HTTP2 is set but the 'h2' package is missing; using HTTP/1.1")
+    return httpx.AsyncClient(
+        http2=_http2_enabled,
+        limits=httpx.Limits(
+            max_connections=UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+            keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+        ),
+        timeout=get_timeout(None),
+    )
+
+
+def get_timeout(operation: str | None) -> httpx.Timeout:
+    """Build the timeout for an upstream operation."""
+    read = OPERATION_TIMEOUTS.get(operation, DEFAULT_TIMEOUT) if operation else DEFAULT_TIMEOUT
+    return httpx.Timeout(read, connect=UPSTREAM_CONNECT_TIMEOUT, pool=UPSTREAM_POOL_TIMEOUT)
+
+
+async def start_client() -> httpx.AsyncClient:
+    """Create the shared upstream client. Called from the app lifespan."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared upstream client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared upstream client, creating it lazily outside the app lifespan."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+class track_request:
+    """Async context manager recording in-flight and latency counters for one upstream call.
+
+    Set `status` to the response status so the latency histogram can tell
+    successes from errors.
+    """
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.started = 0.0
+        self.status: int | None = None
+
+    async def __aenter__(self):
+        self.started = time.perf_counter()
+        _in_flight[self.operation] = _in_flight.get(self.operation, 0) + 1
+        _stats["requests"] += 1
+        _stats["in_flight"] += 1
+        _stats["peak_in_flight"] = max(_stats["peak_in_flight"], _stats["in_flight"])
+        if _stats["in_flight"] >= UPSTREAM_MAX_CONNECTIONS:
+            _stats["saturated"] += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        _in_flight[self.operation] -= 1
+        _stats["in_flight"] -= 1
+        _stats["total_seconds"] += elapsed
+        if exc_type is not None:
+            _stats["errors"] += 1
+        outcome = "error" if exc_type is not None or self.status is None else f"{self.status // 100}xx"
+        metrics.observe_upstream(self.operation, elapsed, outcome)
+        return False
+
+
+async def post(operation: str, url: str, **kwargs) -> httpx.Response:
+    """POST to the upstream API over the shared client with the operation's timeout.
+
+    Waits for a slot of its priority class in the upstream scheduler, then
+    is rate limited and retried by the upstream governor; raises
+    UpstreamUnavailable (Overloaded when shed by the scheduler) without
+    calling out while the circuit is open. Identical concurrent JSON requests
+    for coalesced operations share one upstream call and receive the same
+    (fully read) response.
+    """
+    kwargs.setdefault("timeout", get_timeout(operation))
+    work_class = class_for(operation)
+
+    async def send() -> httpx.Response:
+        async with track_request(operation) as tracked:
+            response = await get_client().post(url, **kwargs)
+            tracked.status = response.status_code
+            return response
+
+    async def governed() -> httpx.Response:
+        async with scheduler.slot(work_class):
+            return await governor.run(OPERATION_KINDS.get(operation, "chat"), send)
+
+    if UPSTREAM_COALESCE_ENABLED and operation in COALESCED_OPERATIONS and "json" in kwargs:
+        body = json.dumps(kwargs["json"], sort_keys=True, ensure_ascii=False)
+        # Per class, so live callers never wait on a batch leader's queue slot
+        key = hashlib.sha256(f"{operation}\n{work_class}\n{url}\n{body}".encode()).hexdigest()
+        return await _single_flight.do(key, governed)
+    return await governed()
+
+
+@asynccontextmanager
+async def stream(operation: str, method: str, url: str, **kwargs):
+    """Open a streaming upstream response over the shared client with the operation's timeout.
+
+    Failures before the body starts are retried like post(); once the
+    response is handed to the caller it is not retried. The scheduler slot is
+    held until the stream is closed.
+    """
+    kwargs.setdefault("timeout", get_timeout(operation))
+    client = get_client()
+
+    async def send() -> httpx.Response:
+        async with track_request(operation) as tracked:
+            response = await client.send(client.build_request(method, url, **kwargs), stream=True)
+            tracked.status = response.status_code
+            return response
+
+    async def discard(response: httpx.Response):
+        await response.aclose()
+
+    async with scheduler.slot(class_for(operation)):
+        response = await governor.run(OPERATION_KINDS.get(operation, "chat"), send, discard)
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+
+def _pool_connections() -> dict:
+    """Inspect the underlying connection pool (best effort — relies on httpcore internals)."""
+    if _client is None or _client.is_closed:
+        return {"open": 0, "idle": 0, "active": 0}
+    pool = getattr(getattr(_client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []) or [])
+    idle = sum(1 for c in connections if getattr(c, "is_idle", lambda: False)())
+    return {"open": len(connections), "idle": idle, "active": len(connections) - idle}
+
+
+def get_pool_stats() -> dict:
+    """Return pool usage stats for monitoring upstream saturation."""
+    requests = _stats["requests"]
+    return {
+        "http2": _http2_enabled,
+        "limits": {
+            "max_connections": UPSTREAM_MAX_CONNECTIONS,
+            "max_keepalive_connections": UPSTREAM_MAX_KEEPALIVE,
+            "keepalive_expiry": UPSTREAM_KEEPALIVE_EXPIRY,
+        },
+        "connections": _pool_connections(),
+        "requests": requests,
+        "errors": _stats["errors"],
+        "in_flight": _stats["in_flight"],
+        "in_flight_by_operation": {k: v for k, v in _in_flight.items() if v},
+        "peak_in_flight": _stats["peak_in_flight"],
+        "saturated": _stats["saturated"],
+        "utilization": round(_stats["in_flight"] / UPSTREAM_MAX_CONNECTIONS, 3) if UPSTREAM_MAX_CONNECTIONS else 0.0,
+        "avg_latency_ms": round(_stats["total_seconds"] / requests * 1000, 1) if requests else 0.0,
+        "coalescing": {"enabled": UPSTREAM_COALESCE_ENABLED, **_single_flight.get_stats()},
+    }
@@ -0,0 +1,114 @@
+"""Live transcription of a voice message while it is still being recorded.
+
+The client records in short, self-contained segments (each one a complete
+audio file) and sends them as they are produced. Every segment is sent to
+Whisper as soon as it arrives, so by the time recording stops most of the
+utterance is already transcribed. On stop, translation of that stable prefix
+starts immediately while the last segments finish, and the tail is translated
+on its own; the two translations are joined.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable
+
+from services.grok_service import transcribe_audio_bytes, translate_text
+from services.translation_cache import FAILED_PREFIX
+
+logger = logging.getLogger(__name__)
+
+LIVE_MAX_SEGMENTS = int(os.getenv("LIVE_MAX_SEGMENTS", "120"))
+LIVE_MAX_SEGMENT_BYTES = int(os.getenv("LIVE_MAX_SEGMENT_BYTES", str(2 * 1024 * 1024)))
+LIVE_TRANSCRIBE_CONCURRENCY = int(os.getenv("LIVE_TRANSCRIBE_CONCURRENCY", "4"))
+
+# Receives (segment index, segment text, stable transcript so far)
+PartialFn = Callable[[int, str, str], Awaitable[None]]
+
+
+class SegmentLimitExceeded(Exception):
+    pass
+
+
+def _join(parts) -> str:
+    return " ".join(part for part in parts if part)
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+class LiveTranscription:
+    """One utterance: transcribes segments concurrently and assembles the final text."""
+
+    def __init__(self, source_lang: str, target_lang: str, extension: str, on_partial: PartialFn):
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.extension = extension
+        self.on_partial = on_partial
+        self.texts: list[str | None] = []
+        self.tasks: list[asyncio.Task] = []
+        # Number of leading segments that are all transcribed
+        self.stable_count = 0
+        self._semaphore = asyncio.Semaphore(LIVE_TRANSCRIBE_CONCURRENCY)
+
+    def add_segment(self, audio: bytes):
+        if len(self.tasks) >= LIVE_MAX_SEGMENTS:
+            raise SegmentLimitExceeded(f"At most {LIVE_MAX_SEGMENTS} segments per recording")
+        if len(audio) > LIVE_MAX_SEGMENT_BYTES:
+            raise SegmentLimitExceeded(f"Segments are limited to {LIVE_MAX_SEGMENT_BYTES} bytes")
+        index = len(self.tasks)
+        self.texts.append(None)
+        self.tasks.append(asyncio.create_task(self._transcribe_segment(index, audio)))
+
+    async def _transcribe_segment(self, index: int, audio: bytes):
+        async with self._semaphore:
+            text = await transcribe_audio_bytes(audio, f"segment-{index}{self.extension}", self.source_lang)
+        self.texts[index] = text
+        while self.stable_count < len(self.texts) and self.texts[self.stable_count] is not None:
+            self.stable_count += 1
+        try:
+            await self.on_partial(index, text, self.stable_text())
+        except Exception as e:
+            logger.info("Could not send partial transcript", extra={"error": repr(e)})
+
+    def stable_text(self) -> str:
+        return _join(self.texts[:self.stable_count])
+
+    async def finish(self) -> tuple[str, str, dict[str, float]]:
+        """Called when recording stops. Returns (transcript, translation, timings)."""
+        stopped = time.perf_counter()
+        timings: dict[str, float] = {"segments": len(self.tasks)}
+
+        prefix_count = self.stable_count
+        prefix = self.stable_text()
+        prefix_translation = None
+        if prefix and prefix_count < len(self.tasks):
+            # Start on what is already final while the tail is still transcribing
+            prefix_translation = asyncio.create_task(translate_text(prefix, self.source_lang, self.target_lang))
+        else:
+            prefix_count = 0
+
+        await asyncio.gather(*self.tasks)
+        timings["tail_transcribe_ms"] = _elapsed_ms(stopped)
+        transcript = _join(self.texts)
+        if not transcript:
+            if prefix_translation:
+                prefix_translation.cancel()
+            return "", "", timings
+
+        if prefix_translation is None:
+            translation = await translate_text(transcript, self.source_lang, self.target_lang)
+        else:
+            tail = _join(self.texts[prefix_count:])
+            tail_translation = await translate_text(tail, self.source_lang, self.target_lang) if tail else ""
+            head_translation = await prefix_translation
+            translation = _join([head_translation, tail_translation])
+            if head_translation.startswith(FAILED_PREFIX) or tail_translation.startswith(FAILED_PREFIX):
+                translation = await translate_text(transcript, self.source_lang, self.target_lang)
+        timings["stop_to_translation_ms"] = _elapsed_ms(stopped)
+        return transcript, translation, timings
+
+    def cancel(self):
+        for task in self.tasks:
+            task.cancel()
@@ -0,0 +1,202 @@
+"""Latency histograms in Prometheus text format, plus per-request Server-Timing.
+
+Three histograms cover a chat turn end to end:
+
+- medibridge_http_request_duration_seconds{method, route, status}
+- medibridge_stage_duration_seconds{stage, endpoint, language_pair, outcome}:
+  transcribe, translate, tts, persist and broadcast for each turn
+- medibridge_upstream_request_duration_seconds{operation, outcome}: every
+  Groq request, including retries
+
+plus medibridge_scheduler_queue_seconds{work_class, outcome}, the time
+upstream work waited for a slot in the priority scheduler.
+
+MetricsMiddleware records the first one and, for HTTP requests, echoes the
+stages measured while handling the request in a Server-Timing header.
+Observations are in-process counters (no locks needed on one event loop); with
+several workers each exposes its own /metrics.
+"""
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Seconds; spans a cached lookup up to a slow Whisper call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Stage durations (ms) measured during the current HTTP request, for Server-Timing
+_request_timings: ContextVar[dict[str, float] | None] = ContextVar("request_timings", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...], buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count], sum
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, seconds: float, **labels: str):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect_left(self.buckets, seconds)] += 1
+        series[1][0] += seconds
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self._series.items()):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key))
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total[0]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+HTTP_SECONDS = Histogram(
+    "medibridge_http_request_duration_seconds",
+    "HTTP request handling time by route.",
+    ("method", "route", "status"),
+)
+STAGE_SECONDS = Histogram(
+    "medibridge_stage_duration_seconds",
+    "Chat turn pipeline stage time.",
+    ("stage", "endpoint", "language_pair", "outcome"),
+)
+UPSTREAM_SECONDS = Histogram(
+    "medibridge_upstream_request_duration_seconds",
+    "Groq API request time per attempt.",
+    ("operation", "outcome"),
+)
+QUEUE_SECONDS = Histogram(
+    "medibridge_scheduler_queue_seconds",
+    "Time upstream work waited for a scheduler slot.",
+    ("work_class", "outcome"),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+HISTOGRAMS = [HTTP_SECONDS, STAGE_SECONDS, UPSTREAM_SECONDS, QUEUE_SECONDS]
+
+
+def _bounded_pair(language_pair: str) -> str:
+    """Map language codes the app does not support to "other", so the label set stays bounded."""
+    # Imported here: grok_service depends on this module through http_client
+    from services.grok_service import LANGUAGE_NAMES
+
+    source, _, target = language_pair.partition("-")
+    return "-".join(lang if lang in LANGUAGE_NAMES else "other" for lang in (source, target))
+
+
+def observe_stage(stage: str, ms: float, endpoint: str, language_pair: str, outcome: str = "ok"):
+    """Record one pipeline stage (duration in ms, as the turn timings use)."""
+    if METRICS_ENABLED:
+        STAGE_SECONDS.observe(ms / 1000, stage=stage, endpoint=endpoint, language_pair=_bounded_pair(language_pair),
+                              outcome=outcome)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + ms
+
+
+def observe_upstream(operation: str, seconds: float, outcome: str):
+    if METRICS_ENABLED:
+        UPSTREAM_SECONDS.observe(seconds, operation=operation, outcome=outcome)
+
+
+def observe_queue(work_class: str, seconds: float, outcome: str):
+    if METRICS_ENABLED:
+        QUEUE_SECONDS.observe(seconds, work_class=work_class, outcome=outcome)
+
+
+def render() -> str:
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+
+def server_timing_header(timings: dict[str, float], total_ms: float) -> bytes:
+    parts = [f"{name};dur={ms:.1f}" for name, ms in timings.items()]
+    parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts).encode("latin-1")
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: request histogram and Server-Timing header.
+
+    Pure ASGI rather than BaseHTTPMiddleware so streaming responses and
+    WebSockets pass straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: dict | None = None
+
+    def _route(self, scope) -> str:
+        if self._routes is None:
+            self._routes = {
+                getattr(route, "endpoint", None): route.path
+                for route in getattr(scope.get("app"), "routes", [])
+                if hasattr(route, "path")
+            }
+        # The router records the matched endpoint in the (shared) scope
+        return self._routes.get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (METRICS_ENABLED or SERVER_TIMING_ENABLED):
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings: dict[str, float] = {}
+        token = _request_timings.set(timings)
+        status = 500
+        recorded = False
+
+        def record():
+            nonlocal recorded
+            if METRICS_ENABLED and not recorded:
+                recorded = True
+                HTTP_SECONDS.observe(time.perf_counter() - started, method=scope["method"],
+                                     route=self._route(scope), status=str(status))
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING_ENABLED:
+                    total_ms = (time.perf_counter() - started) * 1000
+                    message.setdefault("headers", [])
+                    message["headers"] = [
+                        *message["headers"], (b"server-timing", server_timing_header(timings, total_ms)),
+                    ]
+            await send(message)
+            # Stop the clock at the last body chunk: background tasks run after it
+            # inside the same app call, and the client does not wait for them
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            # Requests that failed or disconnected before the response completed
+            record()
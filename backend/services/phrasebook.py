@@ -0,0 +1,276 @@
+"""Curated phrase tables answered without an upstream call.
+
+Stock clinical phrases and one-word answers ("Yes", "Where does it hurt?")
+are looked up in tables loaded from PHRASEBOOK_DIR (*.json, UTF-8). Two file
+layouts are accepted:
+
+- multilingual: {"entries": [{"en": "Yes", "es": "Sí", ...}, ...]}. Each
+  entry is one phrase in several languages and serves every pair among them.
+  A list value gives the form to output first, then other accepted inputs:
+  {"en": ["Yes", "Yeah"], ...}
+- pair table: {"source": "en", "target": "es", "phrases": {"...": "..."}}.
+  Pair tables are applied after all multilingual files and override them.
+
+Lookups try the text as written, then a normalized key: NFKC, casefolded,
+punctuation dropped and whitespace collapsed, so "yes." and "YES!" both hit
+"Yes". Questions keep a question mark in the key, so "No?" never gets the
+translation of "No.". A hit returns the table's translation verbatim.
+
+The index is rebuilt off the event loop and swapped in whole, either when the
+files change on disk (checked every PHRASEBOOK_RELOAD_INTERVAL seconds) or on
+POST /api/admin/phrasebook/reload. A file that fails to load keeps the
+previous index in service.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import unicodedata
+from collections import Counter
+from typing import NamedTuple
+
+from services.translation_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+PHRASEBOOK_ENABLED = os.getenv("PHRASEBOOK_ENABLED", "true").lower() in ("1", "true", "yes")
+PHRASEBOOK_DIR = os.getenv(
+    "PHRASEBOOK_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "phrasebook"),
+)
+# Seconds between checks for changed files; 0 reloads only on request
+PHRASEBOOK_RELOAD_INTERVAL = float(os.getenv("PHRASEBOOK_RELOAD_INTERVAL", "5"))
+
+# Punctuation in the Basic Multilingual Plane (every script the app supports), for str.translate
+_PUNCTUATION = dict.fromkeys(cp for cp in range(0x10000) if unicodedata.category(chr(cp))[0] == "P")
+# Latin, Spanish inverted, fullwidth and Arabic question marks
+_QUESTION_MARKS = frozenset("?¿？؟")
+
+
+def phrase_key(text: str) -> str:
+    """Normalized lookup key: NFKC, casefolded, without punctuation, single spaces.
+
+    A question keeps a trailing "?" so it is keyed apart from the statement.
+    """
+    key = normalize_text(text.translate(_PUNCTUATION)).casefold()
+    if key and not _QUESTION_MARKS.isdisjoint(text):
+        key += "?"
+    return key
+
+
+class Phrase(NamedTuple):
+    phrase: str  # canonical source form; hits are counted under it
+    translation: str
+
+
+class _Index(NamedTuple):
+    exact: dict[tuple[str, str, str], Phrase]
+    normalized: dict[tuple[str, str], dict[str, Phrase]]
+    # Longer texts cannot be a phrase; they skip normalization
+    max_chars: int
+    entries: int
+    files: list[str]
+
+
+_EMPTY = _Index(exact={}, normalized={}, max_chars=0, entries=0, files=[])
+
+
+def _forms(value) -> list[str]:
+    forms = [value] if isinstance(value, str) else value
+    if not isinstance(forms, list) or not forms or not all(isinstance(f, str) and f.strip() for f in forms):
+        raise ValueError(f"expected a phrase or a non-empty list of phrases, got {value!r}")
+    return [f.strip() for f in forms]
+
+
+def _build(directory: str) -> _Index:
+    """Load every table in `directory` into a fresh index. Raises on a malformed file."""
+    multilingual: list[tuple[str, list[dict]]] = []
+    pairs: list[tuple[str, dict]] = []
+    names = sorted(n for n in os.listdir(directory) if n.endswith(".json")) if os.path.isdir(directory) else []
+    for name in names:
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"{name}: expected a JSON object")
+        if isinstance(data.get("entries"), list):
+            multilingual.append((name, data["entries"]))
+        elif isinstance(data.get("phrases"), dict) and data.get("source") and data.get("target"):
+            pairs.append((name, data))
+        else:
+            raise ValueError(f"{name}: expected an 'entries' list or 'source', 'target' and 'phrases'")
+
+    exact: dict[tuple[str, str, str], Phrase] = {}
+    normalized: dict[tuple[str, str], dict[str, Phrase]] = {}
+    max_chars = 0
+    conflicts = 0
+
+    def add(source: str, target: str, text: str, entry: Phrase, override: bool):
+        nonlocal max_chars, conflicts
+        key = phrase_key(text)
+        if not key:
+            return
+        table = normalized.setdefault((source, target), {})
+        if key in table and table[key].translation != entry.translation and not override:
+            conflicts += 1
+            return
+        table[key] = entry
+        exact[(source, target, text)] = entry
+        max_chars = max(max_chars, len(text))
+
+    for name, entries in multilingual:
+        for n, row in enumerate(entries):
+            try:
+                forms = {lang: _forms(value) for lang, value in row.items()}
+            except (AttributeError, ValueError) as e:
+                raise ValueError(f"{name}: entry {n}: {e}") from None
+            for source, inputs in forms.items():
+                for target, outputs in forms.items():
+                    if target == source:
+                        continue
+                    entry = Phrase(inputs[0], outputs[0])
+                    for text in inputs:
+                        add(source, target, text, entry, override=False)
+    for name, data in pairs:
+        for text, translation in data["phrases"].items():
+            if not isinstance(translation, str) or not translation.strip() or not text.strip():
+                raise ValueError(f"{name}: empty phrase or translation for {text!r}")
+            add(data["source"], data["target"], text.strip(), Phrase(text.strip(), translation.strip()), override=True)
+
+    if conflicts:
+        logger.warning("Phrasebook phrases with conflicting translations skipped", extra={"conflicts": conflicts})
+    return _Index(
+        exact=exact,
+        normalized=normalized,
+        max_chars=max_chars + 16,
+        entries=sum(len(table) for table in normalized.values()),
+        files=names,
+    )
+
+
+class Phrasebook:
+    def __init__(self, directory: str, reload_interval: float):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self._index: _Index | None = None
+        self._signature: tuple | None = None
+        self._reload_lock = threading.Lock()
+        self._watcher: asyncio.Task | None = None
+        self._hits: Counter[tuple[str, str, str]] = Counter()
+        self.loaded_at: float | None = None
+        self.stats = {
+            "lookups": 0,
+            "exact_hits": 0,
+            "normalized_hits": 0,
+            "misses": 0,
+            "reloads": 0,
+            "reload_errors": 0,
+        }
+
+    # -- Loading (runs in a worker thread, except for the first lookup outside the app) --
+
+    def _files_signature(self) -> tuple:
+        try:
+            names = sorted(n for n in os.listdir(self.directory) if n.endswith(".json"))
+        except OSError:
+            return ()
+        signature = []
+        for name in names:
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            signature.append((name, st.st_mtime_ns, st.st_size))
+        return tuple(signature)
+
+    def reload(self) -> bool:
+        """Rebuild the index from disk and swap it in. False (old index kept) on error."""
+        with self._reload_lock:
+            signature = self._files_signature()
+            try:
+                index = _build(self.directory)
+            except (OSError, ValueError) as e:
+                self.stats["reload_errors"] += 1
+                # Remember the broken files so the watcher does not retry until they change
+                self._signature = signature
+                logger.warning("Phrasebook reload failed", extra={"error": str(e), "dir": self.directory})
+                if self._index is None:
+                    self._index = _EMPTY
+                return False
+            self._index = index
+            self._signature = signature
+            self.loaded_at = time.time()
+            self.stats["reloads"] += 1
+            logger.info("Phrasebook loaded", extra={"files": len(index.files), "entries": index.entries})
+            return True
+
+    def _reload_if_changed(self) -> bool:
+        if self._files_signature() == self._signature:
+            return False
+        return self.reload()
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await asyncio.to_thread(self._reload_if_changed)
+            except Exception as e:
+                logger.warning("Phrasebook watch error", extra={"error": repr(e)})
+
+    async def start(self):
+        """Load the tables and watch them for changes. Called from the app lifespan."""
+        await asyncio.to_thread(self.reload)
+        if self.reload_interval > 0 and self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+    # -- Lookup --
+
+    def lookup(self, text: str, source_lang: str, target_lang: str) -> str | None:
+        """Translation of a known phrase, or None."""
+        index = self._index
+        if index is None:
+            self.reload()
+            index = self._index
+        self.stats["lookups"] += 1
+        text = text.strip()
+        entry = index.exact.get((source_lang, target_lang, text))
+        if entry is not None:
+            self.stats["exact_hits"] += 1
+        elif len(text) <= index.max_chars and (table := index.normalized.get((source_lang, target_lang))):
+            entry = table.get(phrase_key(text))
+            if entry is not None:
+                self.stats["normalized_hits"] += 1
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self._hits[(source_lang, target_lang, entry.phrase)] += 1
+        return entry.translation
+
+    def get_stats(self, top: int = 10) -> dict:
+        index = self._index
+        hits = self.stats["exact_hits"] + self.stats["normalized_hits"]
+        return {
+            **self.stats,
+            "enabled": PHRASEBOOK_ENABLED,
+            "files": index.files if index else [],
+            "language_pairs": len(index.normalized) if index else 0,
+            "entries": index.entries if index else 0,
+            "loaded_at": self.loaded_at,
+            "hit_rate": round(hits / self.stats["lookups"], 3) if self.stats["lookups"] else 0.0,
+            "top_phrases": [
+                {"source": source, "target": target, "phrase": phrase, "hits": count}
+                for (source, target, phrase), count in self._hits.most_common(top)
+            ],
+        }
+
+
+phrasebook = Phrasebook(PHRASEBOOK_DIR, reload_interval=PHRASEBOOK_RELOAD_INTERVAL)
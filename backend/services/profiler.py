@@ -0,0 +1,338 @@
+"""Opt-in sampling profiler for live requests, with event-loop stall detection.
+
+When PROFILING_ENABLED is set, a background thread wakes every
+PROFILE_INTERVAL_MS and looks at the event-loop thread:
+
+- if a profiled request's task is the one running, the loop thread's stack is
+  recorded for that request (folded "a;b;c" stacks with sample counts), so a
+  profile shows where the request spent time *on* the event loop: CPU work and
+  any blocking call (sync DB session, file write) made from async code
+- independently, a heartbeat callback scheduled on the loop proves it is
+  responsive; if it has not run for PROFILE_STALL_MS the loop is stalled, and
+  the stack is sampled while the stall lasts, catching the blocking call in
+  the act along with the request that made it
+
+Requests are profiled at random (PROFILE_SAMPLE_RATE) or on demand with an
+`X-Profile: 1` header plus the admin token. Profiles and stalls are written as
+JSON files to a bounded ring directory, listed and downloaded via
+routers/admin.py. Nothing runs unless PROFILING_ENABLED is true.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+from database import DATA_DIR
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_STALL_MS = float(os.getenv("PROFILE_STALL_MS", "100"))
+PROFILE_RING_SIZE = int(os.getenv("PROFILE_RING_SIZE", "200"))
+PROFILE_DIR = os.getenv("PROFILE_DIR") or os.path.join(DATA_DIR, "profiles")
+PROFILE_MAX_DEPTH = 96
+# Shared secret for the admin endpoints and the X-Profile header; unset disables both
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+PROFILE_HEADER = b"x-profile"
+ADMIN_TOKEN_HEADER = b"x-admin-token"
+
+
+def check_admin_token(token: str | None) -> bool:
+    return bool(ADMIN_TOKEN) and token is not None and secrets.compare_digest(token, ADMIN_TOKEN)
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def folded_stack(frame) -> str:
+    """Stack as "outer;...;inner" of "function (file:line)", starting at the running task."""
+    entries = []
+    while frame is not None and len(entries) < PROFILE_MAX_DEPTH:
+        code = frame.f_code
+        # Everything above the handle being run is event-loop machinery
+        if code.co_name == "_run" and code.co_filename.endswith(os.path.join("asyncio", "events.py")):
+            break
+        entries.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(entries))
+
+
+class ProfileRing:
+    """Newest PROFILE_RING_SIZE records as JSON files; names sort oldest first."""
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        self._lock = threading.Lock()
+
+    def write(self, record: dict):
+        name = f"{int(time.time() * 1000):013d}-{record['kind']}-{record['id']}.json"
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            tmp = os.path.join(self.path, f".{name}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(record, f)
+            os.replace(tmp, os.path.join(self.path, name))
+            names = self._names()
+            for old in names[:max(len(names) - self.size, 0)]:
+                try:
+                    os.remove(os.path.join(self.path, old))
+                except FileNotFoundError:
+                    pass
+
+    def _names(self) -> list[str]:
+        try:
+            return sorted(n for n in os.listdir(self.path) if n.endswith(".json") and not n.startswith("."))
+        except FileNotFoundError:
+            return []
+
+    def list(self, kind: str | None = None, limit: int = 50) -> list[dict]:
+        """Newest first, without the stacks."""
+        summaries = []
+        for name in reversed(self._names()):
+            if kind and f"-{kind}-" not in name:
+                continue
+            record = self._read(name)
+            if record is None:
+                continue
+            record.pop("stacks", None)
+            summaries.append(record)
+            if len(summaries) >= limit:
+                break
+        return summaries
+
+    def get(self, record_id: str) -> dict | None:
+        for name in self._names():
+            if name.endswith(f"-{record_id}.json"):
+                return self._read(name)
+        return None
+
+    def _read(self, name: str) -> dict | None:
+        try:
+            with open(os.path.join(self.path, name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str, reason: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.started_at = _now_iso()
+        self.started = time.perf_counter()
+        self.stacks: Counter = Counter()
+        self.stalls: list[str] = []
+
+    def to_record(self, status: int | None, interval_ms: float) -> dict:
+        samples = sum(self.stacks.values())
+        return {
+            "id": self.id,
+            "kind": "request",
+            "started_at": self.started_at,
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "reason": self.reason,
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "interval_ms": interval_ms,
+            "samples": samples,
+            # Approximate time this request held the event loop
+            "on_loop_ms": round(samples * interval_ms, 1),
+            "stalls": self.stalls,
+            "stacks": dict(self.stacks.most_common()),
+        }
+
+
+class Profiler:
+    def __init__(self, interval_ms: float, stall_ms: float, ring: ProfileRing):
+        self.interval = interval_ms / 1000
+        self.interval_ms = interval_ms
+        self.stall = stall_ms / 1000
+        self.ring = ring
+        self.running = False
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: int | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._last_beat = 0.0
+        # Task -> "METHOD /path" for every request, and RequestProfile for profiled ones
+        self._requests: dict[asyncio.Task, str] = {}
+        self._profiles: dict[asyncio.Task, RequestProfile] = {}
+        self._stall_record: dict | None = None
+        # Held briefly by the sampler; keeps a profile from being finished mid-sample
+        self._lock = threading.Lock()
+        self.stats = {"profiled": 0, "stalls": 0, "samples": 0, "longest_stall_ms": 0.0}
+
+    def start(self):
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._loop.call_soon(self._beat)
+        self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._thread.start()
+        self.running = True
+        logger.info("Profiler started", extra={"interval_ms": self.interval_ms, "stall_ms": self.stall * 1000})
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _beat(self):
+        self._last_beat = time.monotonic()
+        if self.running:
+            self._loop.call_later(self.interval, self._beat)
+
+    def track(self, task: asyncio.Task, label: str, profile: RequestProfile | None = None):
+        self._requests[task] = label
+        if profile is not None:
+            self._profiles[task] = profile
+            self.stats["profiled"] += 1
+
+    def untrack(self, task: asyncio.Task) -> RequestProfile | None:
+        with self._lock:
+            self._requests.pop(task, None)
+            return self._profiles.pop(task, None)
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception:
+                logger.exception("Profiler sample failed")
+
+    def _sample(self):
+        stalled = time.monotonic() - self._last_beat >= self.stall
+        if not stalled and self._stall_record is not None:
+            self._finish_stall()
+        with self._lock:
+            task = asyncio.current_task(self._loop)
+            profile = self._profiles.get(task) if task is not None else None
+            if stalled or profile is not None:
+                self._record_sample(task, profile, stalled)
+
+    def _record_sample(self, task: asyncio.Task | None, profile: RequestProfile | None, stalled: bool):
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return
+        stack = folded_stack(frame)
+        del frame
+        self.stats["samples"] += 1
+        if profile is not None:
+            profile.stacks[stack] += 1
+        if stalled:
+            if self._stall_record is None:
+                self._stall_record = {
+                    "id": uuid.uuid4().hex[:12],
+                    "kind": "stall",
+                    "started_at": _now_iso(),
+                    "began": self._last_beat,
+                    "request": self._requests.get(task),
+                    "task": task.get_name() if task is not None else None,
+                    "stacks": Counter(),
+                }
+                if profile is not None:
+                    profile.stalls.append(self._stall_record["id"])
+            self._stall_record["stacks"][stack] += 1
+
+    def _finish_stall(self):
+        record, self._stall_record = self._stall_record, None
+        duration_ms = round((self._last_beat - record.pop("began")) * 1000, 1)
+        record["duration_ms"] = duration_ms
+        record["threshold_ms"] = self.stall * 1000
+        record["samples"] = sum(record["stacks"].values())
+        record["stacks"] = dict(record["stacks"].most_common())
+        self.stats["stalls"] += 1
+        self.stats["longest_stall_ms"] = max(self.stats["longest_stall_ms"], duration_ms)
+        logger.warning("Event loop stalled", extra={
+            "stall_id": record["id"], "duration_ms": duration_ms, "request": record["request"],
+        })
+        self.ring.write(record)
+
+    def save(self, profile: RequestProfile, status: int | None):
+        """Write a finished request profile from a worker thread."""
+        record = profile.to_record(status, self.interval_ms)
+        self._loop.run_in_executor(None, self.ring.write, record)
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": PROFILING_ENABLED,
+            "running": self.running,
+            "sample_rate": PROFILE_SAMPLE_RATE,
+            "interval_ms": self.interval_ms,
+            "stall_threshold_ms": self.stall * 1000,
+            "ring_size": self.ring.size,
+            "active_profiles": len(self._profiles),
+            **self.stats,
+        }
+
+
+profiler = Profiler(PROFILE_INTERVAL_MS, PROFILE_STALL_MS, ProfileRing(PROFILE_DIR, PROFILE_RING_SIZE))
+
+
+class ProfilerMiddleware:
+    """Pure ASGI middleware: registers request tasks and decides which to profile.
+
+    Profiled HTTP responses carry an X-Profile-Id header naming the record.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not profiler.running or scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+        method = scope.get("method", "WS")
+        profile = None
+        if scope["type"] == "http":
+            headers = dict(scope["headers"])
+            if headers.get(PROFILE_HEADER) == b"1" and check_admin_token(
+                headers.get(ADMIN_TOKEN_HEADER, b"").decode("latin-1")
+            ):
+                profile = RequestProfile(method, scope["path"], "header")
+            elif PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+                profile = RequestProfile(method, scope["path"], "sampled")
+        profiler.track(task, f"{method} {scope['path']}", profile)
+        status = None
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profile is not None:
+                    message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            finished = profiler.untrack(task)
+            if finished is not None:
+                profiler.save(finished, status)
@@ -0,0 +1,54 @@
+"""Coalesce identical concurrent calls into one in-flight task.
+
+The first caller for a key starts the work; callers arriving while it runs
+await the same task and get the same result or exception. The work runs in
+its own task, so a caller giving up (cancelled, client disconnected) does not
+cancel it for the others; it is only cancelled once every caller has left.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: dict[Hashable, tuple[asyncio.Task, list[int]]] = {}
+        self._stats = {"leaders": 0, "coalesced": 0, "errors": 0, "abandoned": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() once for all concurrent callers with the same key."""
+        loop = asyncio.get_running_loop()
+        call = self._calls.get(key)
+        if call is not None and call[0].get_loop() is loop and not call[0].done():
+            self._stats["coalesced"] += 1
+        else:
+            self._stats["leaders"] += 1
+            call = (loop.create_task(fn()), [0])
+            self._calls[key] = call
+            call[0].add_done_callback(lambda task: self._finished(key, task))
+
+        task, waiters = call
+        waiters[0] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and waiters[0] == 1:
+                # Last caller left: nobody needs the result any more
+                self._stats["abandoned"] += 1
+                task.cancel()
+            raise
+        finally:
+            waiters[0] -= 1
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key, (None,))[0] is task:
+            del self._calls[key]
+        if not task.cancelled() and task.exception() is not None:
+            self._stats["errors"] += 1
+
+    def get_stats(self) -> dict:
+        calls = self._stats["leaders"] + self._stats["coalesced"]
+        return {
+            **self._stats,
+            "in_flight": len(self._calls),
+            "saved_ratio": round(self._stats["coalesced"] / calls, 3) if calls else 0.0,
+        }
@@ -0,0 +1,116 @@
+"""Split long messages into sentence-aligned segments and join their translations.
+
+Sentence ends are found per script:
+
+- Latin, Cyrillic and similar: . ! ? … followed by whitespace, skipping
+  common abbreviations ("Dr.", "e.g.") and decimals ("2.5 mg")
+- Chinese and Japanese: full-width 。！？, with no space after them
+- Devanagari and Bengali: danda । and double danda ॥
+- Arabic and Urdu: ؟ and the Urdu full stop ۔ (besides the Latin ones)
+- Thai, which has no sentence punctuation: the spaces between clauses
+- line breaks, everywhere
+
+Sentences are packed greedily into segments of at most `max_chars`; a single
+sentence longer than that is cut at a clause break (comma, semicolon or space)
+when there is one. Segments keep their trailing whitespace, so joining them
+gives back the original text exactly.
+"""
+import re
+
+# Written without spaces between sentences
+NO_SPACE_LANGUAGES = {"zh", "ja"}
+
+_SENTENCE_END = re.compile(
+    r"[.!?…]+[\"'”’»)\]]*\s+"          # Latin-style: needs whitespace after it
+    r"|[。！？]+[」』”’）)]*\s*"          # CJK full-width
+    r"|[।॥۔؟]+\s*"                      # danda, Urdu full stop, Arabic question mark
+    r"|\s*\n\s*"                        # line breaks
+)
+_THAI_BREAK = re.compile(r"\s+")
+# Clause breaks a too-long sentence may be cut at, in order of preference
+_CLAUSE_BREAKS = ("\n", "; ", "；", "، ", ", ", "，", "、", " ")
+
+_ABBREVIATIONS = {
+    "dr", "mr", "mrs", "ms", "prof", "st", "vs", "etc", "e.g", "i.e", "approx", "no", "fig",
+    "sr", "jr", "sra", "dra", "str", "bzw", "z.b", "ca",
+}
+
+
+def _is_abbreviation(text: str, end: int) -> bool:
+    """True when the "." at text[end] closes an abbreviation or single initial."""
+    start = end
+    while start > 0 and (text[start - 1].isalpha() or text[start - 1] == "."):
+        start -= 1
+    word = text[start:end].lower()
+    return word in _ABBREVIATIONS or (len(word) == 1 and word.isalpha())
+
+
+def split_sentences(text: str, language: str) -> list[str]:
+    """Sentences with their trailing whitespace; "".join(result) == text."""
+    pattern = _THAI_BREAK if language == "th" else _SENTENCE_END
+    sentences = []
+    start = 0
+    for match in pattern.finditer(text):
+        end = match.end()
+        if end >= len(text):
+            break
+        if text[match.start()] == "." and _is_abbreviation(text, match.start()):
+            continue
+        # Leading whitespace stays with the first sentence
+        if not text[start:end].strip():
+            continue
+        sentences.append(text[start:end])
+        start = end
+    sentences.append(text[start:])
+    return [s for s in sentences if s]
+
+
+def _cut(sentence: str, max_chars: int) -> list[str]:
+    """Cut one overlong sentence at clause breaks, falling back to a hard cut."""
+    pieces = []
+    while len(sentence) > max_chars:
+        window = sentence[:max_chars]
+        cut = -1
+        for mark in _CLAUSE_BREAKS:
+            position = window.rfind(mark, max_chars // 2)
+            if position >= 0:
+                cut = position + len(mark)
+                break
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(sentence[:cut])
+        sentence = sentence[cut:]
+    if sentence:
+        pieces.append(sentence)
+    return pieces
+
+
+def split_segments(text: str, language: str, max_chars: int) -> list[str]:
+    """Segments of whole sentences, each at most max_chars where possible."""
+    segments: list[str] = []
+    current = ""
+    for sentence in split_sentences(text, language):
+        for piece in _cut(sentence, max_chars) if len(sentence) > max_chars else [sentence]:
+            if current and len(current) + len(piece.rstrip()) > max_chars:
+                segments.append(current)
+                current = ""
+            current += piece
+    if current:
+        segments.append(current)
+    return segments
+
+
+def separator_after(segment: str, target_language: str) -> str:
+    """Whitespace to put after a segment's translation in the target script."""
+    trailing = segment[len(segment.rstrip()):]
+    if "\n" in trailing:
+        return trailing
+    return "" if target_language in NO_SPACE_LANGUAGES else " "
+
+
+def join_translations(segments: list[str], translations: list[str], target_language: str) -> str:
+    pieces = [
+        translation.strip() + (separator_after(segment, target_language) if i < len(segments) - 1 else "")
+        for i, (segment, translation) in enumerate(zip(segments, translations))
+    ]
+    return "".join(pieces)
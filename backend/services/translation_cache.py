@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from database import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+TRANSLATION_CACHE_ENABLED = os.getenv("TRANSLATION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+TRANSLATION_CACHE_PATH = os.getenv("TRANSLATION_CACHE_PATH", os.path.join(DATA_DIR, "translation_cache.db"))
+TRANSLATION_CACHE_MEMORY_SIZE = int(os.getenv("TRANSLATION_CACHE_MEMORY_SIZE", "2048"))
+TRANSLATION_CACHE_DISK_SIZE = int(os.getenv("TRANSLATION_CACHE_DISK_SIZE", "200000"))
+TRANSLATION_CACHE_TTL = int(os.getenv("TRANSLATION_CACHE_TTL", str(30 * 24 * 3600)))
+
+# Prune the disk tier after this many writes
+_PRUNE_EVERY = 500
+
+FAILED_PREFIX = "[Translation failed]"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for cache lookups: unicode NFKC and collapsed whitespace."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def make_key(text: str, source_lang: str, target_lang: str, model: str) -> str:
+    raw = "\x1f".join([model, source_lang, target_lang, normalize_text(text)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """Two-tier translation cache: a bounded in-process LRU backed by SQLite."""
+
+    def __init__(self, path: str, memory_size: int, disk_size: int, ttl: int):
+        self.path = path
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.ttl = ttl
+        self._memory: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "skipped_failures": 0,
+            "evictions": 0,
+        }
+
+    # -- SQLite tier (runs in a worker thread) --
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "key TEXT PRIMARY KEY, translation TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_translations_last_used ON translations (last_used)")
+            self._conn.commit()
+        return self._conn
+
+    def _disk_get(self, key: str) -> tuple[str, float] | None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT translation, expires_at FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                conn.execute("DELETE FROM translations WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE translations SET last_used = ? WHERE key = ?", (now, key))
+            conn.commit()
+            return row[0], row[1]
+
+    def _disk_put(self, key: str, translation: str, expires_at: float) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO translations (key, translation, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, translation, expires_at, time.time()),
+            )
+            conn.commit()
+            self._writes += 1
+            if self._writes % _PRUNE_EVERY == 0:
+                self._prune(conn)
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        """Drop expired rows, then the least recently used rows beyond the size limit."""
+        removed = conn.execute("DELETE FROM translations WHERE expires_at < ?", (time.time(),)).rowcount
+        count = conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        if count > self.disk_size:
+            removed += conn.execute(
+                "DELETE FROM translations WHERE key IN "
+                "(SELECT key FROM translations ORDER BY last_used ASC LIMIT ?)",
+                (count - self.disk_size,),
+            ).rowcount
+        conn.commit()
+        self.stats["evictions"] += removed
+
+    def _disk_clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM translations")
+            conn.commit()
+
+    # -- In-process LRU tier --
+
+    def _memory_get(self, key: str) -> str | None:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        if entry[1] < time.time():
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return entry[0]
+
+    def _memory_put(self, key: str, translation: str, expires_at: float) -> None:
+        self._memory[key] = (translation, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    # -- Public API --
+
+    async def get(self, text: str, source_lang: str, target_lang: str, model: str) -> str | None:
+        key = make_key(text, source_lang, target_lang, model)
+        result = self._memory_get(key)
+        if result is not None:
+            self.stats["memory_hits"] += 1
+            return result
+        try:
+            entry = await asyncio.to_thread(self._disk_get, key)
+        except sqlite3.Error as e:
+            logger.warning("Translation cache disk read error", extra={"error": repr(e)})
+            entry = None
+        if entry is not None:
+            self.stats["disk_hits"] += 1
+            self._memory_put(key, entry[0], entry[1])
+            return entry[0]
+        self.stats["misses"] += 1
+        return None
+
+    async def put(self, text: str, source_lang: str, target_lang: str, model: str, translation: str) -> None:
+        if not translation or translation.startswith(FAILED_PREFIX):
+            self.stats["skipped_failures"] += 1
+            return
+        key = make_key(text, source_lang, target_lang, model)
+        expires_at = time.time() + self.ttl
+        self._memory_put(key, translation, expires_at)
+        self.stats["stores"] += 1
+        try:
+            await asyncio.to_thread(self._disk_put, key, translation, expires_at)
+        except sqlite3.Error as e:
+            logger.warning("Translation cache disk write error", extra={"error": repr(e)})
+
+    async def clear(self) -> None:
+        self._memory.clear()
+        await asyncio.to_thread(self._disk_clear)
+
+    def get_stats(self) -> dict:
+        lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        return {
+            **self.stats,
+            "enabled": TRANSLATION_CACHE_ENABLED,
+            "memory_entries": len(self._memory),
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+translation_cache = TranslationCache(
+    TRANSLATION_CACHE_PATH,
+    memory_size=TRANSLATION_CACHE_MEMORY_SIZE,
+    disk_size=TRANSLATION_CACHE_DISK_SIZE,
+    ttl=TRANSLATION_CACHE_TTL,
+)
@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+
+from sqlalchemy import func
+
+from database import SessionLocal
+from models import Message
+from services.grok_service import text_to_speech, tts_model_and_voice
+
+logger = logging.getLogger(__name__)
+
+# Same directory that routers/audio.py serves from: backend/uploads/
+UPLOADS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uploads")
+os.makedirs(UPLOADS_DIR, exist_ok=True)
+
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Files younger than this are never evicted, so audio produced for a message
+# that has not been committed yet cannot disappear underneath it.
+TTS_CACHE_GRACE_SECONDS = int(os.getenv("TTS_CACHE_GRACE_SECONDS", "300"))
+
+AUDIO_URL_PREFIX = "/api/audio/"
+
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "evicted_bytes": 0, "pinned_skips": 0}
+_total_bytes: int | None = None
+_last_eviction = float("-inf")
+_eviction_lock = asyncio.Lock()
+
+# Evict down to this fraction of the limit so eviction is not re-run on every store
+_LOW_WATER = 0.9
+# Minimum seconds between directory scans when everything left is pinned
+_EVICTION_INTERVAL = 60
+
+
+def tts_filename(text: str, language: str) -> str:
+    """Content-addressed file name for the audio of (text, language, model, voice)."""
+    model, voice = tts_model_and_voice(language)
+    raw = "\x1f".join([model, voice, language, text[:4096]])
+    return f"tts_{hashlib.sha256(raw.encode('utf-8')).hexdigest()}.wav"
+
+
+def _tts_files() -> list[tuple[str, int, float]]:
+    """List (filename, size, mtime) for TTS files in the uploads directory."""
+    entries = []
+    with os.scandir(UPLOADS_DIR) as it:
+        for entry in it:
+            if entry.name.startswith("tts_") and entry.name.endswith(".wav") and entry.is_file():
+                st = entry.stat()
+                entries.append((entry.name, st.st_size, st.st_mtime))
+    return entries
+
+
+def _reference_counts(filenames: list[str]) -> dict[str, int]:
+    """How many messages reference each TTS file through translated_audio_url."""
+    urls = [AUDIO_URL_PREFIX + name for name in filenames]
+    db = SessionLocal()
+    try:
+        counts = {}
+        # Chunk to stay under SQLite's bound-parameter limit
+        for i in range(0, len(urls), 500):
+            rows = (
+                db.query(Message.translated_audio_url, func.count(Message.id))
+                .filter(Message.translated_audio_url.in_(urls[i:i + 500]))
+                .group_by(Message.translated_audio_url)
+                .all()
+            )
+            for url, count in rows:
+                counts[url[len(AUDIO_URL_PREFIX):]] = count
+        return counts
+    finally:
+        db.close()
+
+
+def _write_file(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _touch(path: str) -> bool:
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _evict(max_bytes: int) -> tuple[int, int, int]:
+    """Once over the cache limit, remove least recently used, unreferenced TTS files until under max_bytes.
+
+    Returns (remaining_bytes, files_removed, bytes_removed).
+    """
+    files = _tts_files()
+    total = sum(size for _, size, _ in files)
+    if total <= TTS_CACHE_MAX_BYTES:
+        return total, 0, 0
+
+    refs = _reference_counts([name for name, _, _ in files])
+    cutoff = time.time() - TTS_CACHE_GRACE_SECONDS
+    removed = removed_bytes = 0
+    for name, size, mtime in sorted(files, key=lambda f: f[2]):
+        if total <= max_bytes:
+            break
+        if refs.get(name, 0) > 0 or mtime > cutoff:
+            _stats["pinned_skips"] += 1
+            continue
+        try:
+            os.remove(os.path.join(UPLOADS_DIR, name))
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+        removed_bytes += size
+    return total, removed, removed_bytes
+
+
+async def _maybe_evict() -> None:
+    global _total_bytes, _last_eviction
+    if _total_bytes is not None and _total_bytes <= TTS_CACHE_MAX_BYTES:
+        return
+    if time.monotonic() - _last_eviction < _EVICTION_INTERVAL:
+        return
+    async with _eviction_lock:
+        _last_eviction = time.monotonic()
+        total, removed, removed_bytes = await asyncio.to_thread(_evict, int(TTS_CACHE_MAX_BYTES * _LOW_WATER))
+        _total_bytes = total
+        _stats["evictions"] += removed
+        _stats["evicted_bytes"] += removed_bytes
+        if removed:
+            logger.info("Evicted cached TTS files", extra={"files": removed, "bytes": removed_bytes})
+
+
+async def _synthesize(filename: str, text: str, language: str) -> str | None:
+    global _total_bytes
+    audio = await text_to_speech(text, language=language)
+    if not audio:
+        return None
+    await asyncio.to_thread(_write_file, os.path.join(UPLOADS_DIR, filename), audio)
+    _stats["stores"] += 1
+    if _total_bytes is None:
+        _total_bytes = sum(size for _, size, _ in await asyncio.to_thread(_tts_files))
+    else:
+        _total_bytes += len(audio)
+    await _maybe_evict()
+    return AUDIO_URL_PREFIX + filename
+
+
+async def get_or_create_tts(text: str, language: str) -> str | None:
+    """Return the audio URL for text, reusing a cached file when one exists."""
+    if not text.strip():
+        return None
+
+    filename = tts_filename(text, language)
+    if await asyncio.to_thread(_touch, os.path.join(UPLOADS_DIR, filename)):
+        _stats["hits"] += 1
+        return AUDIO_URL_PREFIX + filename
+
+    _stats["misses"] += 1
+    return await _synthesize(filename, text, language)
+
+
+def get_stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "bytes": _total_bytes,
+        "max_bytes": TTS_CACHE_MAX_BYTES,
+        "hit_rate": round(_stats["hits"] / lookups, 3) if lookups else 0.0,
+    }
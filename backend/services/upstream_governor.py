@@ -0,0 +1,270 @@
+"""Shared guard rails for Groq calls: rate limiting, retries and circuit breaking.
+
+Every upstream request goes through `Governor.run` (via http_client.post /
+http_client.stream), keyed by endpoint kind:
+
+- a token bucket per kind keeps us under the provider's request rate; a 429
+  with Retry-After pauses the whole bucket, not just the request that saw it
+- 429/5xx responses and transport errors are retried with jittered
+  exponential backoff, honoring Retry-After when the server sends one
+- a circuit breaker per kind opens after consecutive failures and fails fast
+  until a cooldown has passed, then lets a single probe through
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "3"))
+UPSTREAM_BACKOFF_BASE = float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.5"))
+UPSTREAM_BACKOFF_MAX = float(os.getenv("UPSTREAM_BACKOFF_MAX", "8"))
+# A Retry-After longer than this is not worth holding the caller for
+UPSTREAM_RETRY_AFTER_MAX = float(os.getenv("UPSTREAM_RETRY_AFTER_MAX", "20"))
+UPSTREAM_BREAKER_THRESHOLD = int(os.getenv("UPSTREAM_BREAKER_THRESHOLD", "5"))
+UPSTREAM_BREAKER_COOLDOWN = float(os.getenv("UPSTREAM_BREAKER_COOLDOWN", "30"))
+# Longest a request may queue for a rate-limit token before giving up
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", "30"))
+
+# Requests per second and burst size per endpoint kind; a rate of 0 disables limiting
+RATE_LIMITS = {
+    "chat": (float(os.getenv("UPSTREAM_RATE_CHAT", "10")), int(os.getenv("UPSTREAM_BURST_CHAT", "20"))),
+    "whisper": (float(os.getenv("UPSTREAM_RATE_WHISPER", "5")), int(os.getenv("UPSTREAM_BURST_WHISPER", "10"))),
+    "tts": (float(os.getenv("UPSTREAM_RATE_TTS", "5")), int(os.getenv("UPSTREAM_BURST_TTS", "10"))),
+}
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class UpstreamUnavailable(Exception):
+    """Raised without calling upstream: the breaker is open or the rate-limit queue is too long."""
+
+
+def retry_after_seconds(response: httpx.Response) -> float | None:
+    """Parse Retry-After (delta-seconds or HTTP date)."""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given retry number (0-based)."""
+    return random.uniform(0, min(UPSTREAM_BACKOFF_MAX, UPSTREAM_BACKOFF_BASE * 2 ** attempt))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock: asyncio.Lock | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, timeout: float):
+        """Take one token, waiting in FIFO order. Raises UpstreamUnavailable after `timeout`."""
+        if self.rate <= 0 and time.monotonic() >= self.blocked_until:
+            return
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Locks are bound to one event loop (tests and benchmarks run several)
+            self._lock, self._loop = asyncio.Lock(), loop
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.rate <= 0:
+                        break
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        break
+                    wait = (1 - self.tokens) / self.rate
+                if now + wait - started > timeout:
+                    raise UpstreamUnavailable("rate limit queue timeout")
+                await asyncio.sleep(wait)
+        waited = time.monotonic() - started
+        if waited > 0.001:
+            self.waits += 1
+            self.wait_seconds += waited
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for a while (the upstream said Retry-After)."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def get_stats(self) -> dict:
+        self._refill(time.monotonic())
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "tokens": round(self.tokens, 2),
+            "paused_seconds": round(max(self.blocked_until - time.monotonic(), 0.0), 2),
+            "waits": self.waits,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
+
+
+class CircuitBreaker:
+    """closed -> open after `threshold` consecutive failures -> half_open after `cooldown` -> closed on success."""
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = "half_open"
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def release_probe(self):
+        """Give up the half-open probe slot without a verdict, e.g. when the probe was cancelled."""
+        self._probe_in_flight = False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self._probe_in_flight = False
+        self.failures += 1
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.threshold):
+            if self.state != "open":
+                self.times_opened += 1
+                logger.warning("Circuit opened", extra={"consecutive_failures": self.failures})
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def get_stats(self) -> dict:
+        retry_in = self.cooldown - (time.monotonic() - self.opened_at) if self.state == "open" else 0.0
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "retry_in_seconds": round(max(retry_in, 0.0), 1),
+        }
+
+
+class Governor:
+    def __init__(self):
+        self.buckets = {kind: TokenBucket(rate, burst) for kind, (rate, burst) in RATE_LIMITS.items()}
+        self.breakers = {
+            kind: CircuitBreaker(UPSTREAM_BREAKER_THRESHOLD, UPSTREAM_BREAKER_COOLDOWN) for kind in RATE_LIMITS
+        }
+        self.stats = {kind: {"calls": 0, "retries": 0, "failures": 0} for kind in RATE_LIMITS}
+
+    async def run(
+        self,
+        kind: str,
+        send: Callable[[], Awaitable[httpx.Response]],
+        discard: Callable[[httpx.Response], Awaitable[None]] | None = None,
+    ) -> httpx.Response:
+        """Send a request under the kind's rate limit, retrying transient failures.
+
+        `send` performs one attempt. `discard` releases a response that is being
+        retried (streaming responses must be closed). The final response is
+        returned even if it is an error; callers handle it with raise_for_status.
+        """
+        bucket, breaker, stats = self.buckets[kind], self.breakers[kind], self.stats[kind]
+        stats["calls"] += 1
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                raise UpstreamUnavailable(f"{kind} circuit open")
+
+            delay = None
+            try:
+                await bucket.acquire(UPSTREAM_QUEUE_TIMEOUT)
+                response = await send()
+            except httpx.TransportError:
+                breaker.record_failure()
+                stats["failures"] += 1
+                if attempt >= UPSTREAM_MAX_RETRIES:
+                    raise
+                delay = backoff_delay(attempt)
+            except BaseException:
+                # Cancelled (caller left, sibling failed) or failed before reaching the
+                # upstream: says nothing about its health, but a half-open probe slot
+                # left taken would keep the breaker open for good
+                breaker.release_probe()
+                raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS:
+                    breaker.record_success()
+                    return response
+                retry_after = retry_after_seconds(response)
+                if response.status_code == 429:
+                    # Throttled, not down: slow everyone down instead of tripping the breaker
+                    breaker.record_success()
+                    if retry_after:
+                        bucket.pause(min(retry_after, UPSTREAM_RETRY_AFTER_MAX))
+                else:
+                    breaker.record_failure()
+                stats["failures"] += 1
+                if attempt >= UPSTREAM_MAX_RETRIES or (retry_after or 0) > UPSTREAM_RETRY_AFTER_MAX:
+                    return response
+                delay = retry_after if retry_after is not None else backoff_delay(attempt)
+                if discard is not None:
+                    await discard(response)
+
+            attempt += 1
+            stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+    def get_stats(self) -> dict:
+        return {
+            kind: {
+                **self.stats[kind],
+                "limiter": self.buckets[kind].get_stats(),
+                "breaker": self.breakers[kind].get_stats(),
+            }
+            for kind in RATE_LIMITS
+        } | {
+            "retry": {
+                "max_retries": UPSTREAM_MAX_RETRIES,
+                "backoff_base": UPSTREAM_BACKOFF_BASE,
+                "backoff_max": UPSTREAM_BACKOFF_MAX,
+            },
+        }
+
+
+governor = Governor()
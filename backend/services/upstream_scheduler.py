@@ -0,0 +1,231 @@
+"""Priority scheduling for Groq calls, in front of the upstream governor.
+
+Every upstream request takes a slot from one of these work classes, highest
+priority first:
+
+  live        — translations of chat messages and live recordings
+  transcribe  — Whisper transcriptions
+  tts         — speech synthesis
+  batch       — /api/translate/batch packs (re-translating history)
+  summary     — conversation summaries and their map-reduce chunks
+
+The class comes from the http_client operation, or from `work_class()` for
+callers that reuse an operation at lower priority (batch translation). Each
+class has its own concurrency cap under a shared UPSTREAM_SCHED_CONCURRENCY
+limit, so summaries can never take every slot. When a slot frees up, waiting
+work is handed it in priority order and FIFO within a class.
+
+Admission is deadline aware: each class has a maximum queue wait. Work whose
+estimated wait (queue ahead of it times the class's recent service time) is
+already past that deadline is refused at once, and work still queued when the
+deadline passes gives up, both with `Overloaded`. Callers degrade instead of
+waiting: no audio for a shed TTS call, the stored summary for a shed summary.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dotenv import load_dotenv
+
+from services import metrics
+from services.upstream_governor import UpstreamUnavailable
+
+load_dotenv()
+
+UPSTREAM_SCHED_ENABLED = os.getenv("UPSTREAM_SCHED_ENABLED", "true").lower() in ("1", "true", "yes")
+# Upstream requests in flight across all classes
+UPSTREAM_SCHED_CONCURRENCY = int(os.getenv("UPSTREAM_SCHED_CONCURRENCY", "32"))
+
+# Highest priority first: (name, concurrency cap, max queue wait in seconds)
+WORK_CLASSES = [
+    ("live", int(os.getenv("UPSTREAM_SCHED_LIVE_CONCURRENCY", "32")),
+     float(os.getenv("UPSTREAM_SCHED_LIVE_MAX_WAIT", "10"))),
+    ("transcribe", int(os.getenv("UPSTREAM_SCHED_TRANSCRIBE_CONCURRENCY", "16")),
+     float(os.getenv("UPSTREAM_SCHED_TRANSCRIBE_MAX_WAIT", "15"))),
+    ("tts", int(os.getenv("UPSTREAM_SCHED_TTS_CONCURRENCY", "8")),
+     float(os.getenv("UPSTREAM_SCHED_TTS_MAX_WAIT", "5"))),
+    ("batch", int(os.getenv("UPSTREAM_SCHED_BATCH_CONCURRENCY", "8")),
+     float(os.getenv("UPSTREAM_SCHED_BATCH_MAX_WAIT", "30"))),
+    ("summary", int(os.getenv("UPSTREAM_SCHED_SUMMARY_CONCURRENCY", "4")),
+     float(os.getenv("UPSTREAM_SCHED_SUMMARY_MAX_WAIT", "20"))),
+]
+
+# Default class for each http_client operation
+OPERATION_CLASSES = {
+    "translate": "live",
+    "transcribe": "transcribe",
+    "tts": "tts",
+    "summary": "summary",
+}
+
+# Weight of the newest request in the per-class service time average
+SERVICE_TIME_ALPHA = 0.2
+
+_work_class: ContextVar[str | None] = ContextVar("upstream_work_class", default=None)
+
+
+class Overloaded(UpstreamUnavailable):
+    """Raised without calling upstream: the work's class could not get a slot before its deadline."""
+
+
+@contextmanager
+def work_class(name: str):
+    """Run upstream calls made in this block (and tasks it starts) in the given class."""
+    token = _work_class.set(name)
+    try:
+        yield
+    finally:
+        _work_class.reset(token)
+
+
+def class_for(operation: str) -> str | None:
+    return _work_class.get() or OPERATION_CLASSES.get(operation)
+
+
+class WorkClass:
+    def __init__(self, name: str, priority: int, concurrency: int, max_wait: float):
+        self.name = name
+        self.priority = priority
+        self.concurrency = max(concurrency, 1)
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.waiters: deque[asyncio.Future] = deque()
+        # Moving average of how long one request holds its slot
+        self.service_seconds = 0.0
+        self.stats = {"admitted": 0, "queued": 0, "shed": 0, "expired": 0, "wait_seconds": 0.0}
+
+
+class Scheduler:
+    def __init__(self, classes: list[tuple[str, int, float]], concurrency: int):
+        self.classes = {
+            name: WorkClass(name, priority, cap, max_wait)
+            for priority, (name, cap, max_wait) in enumerate(classes)
+        }
+        self.concurrency = max(concurrency, 1)
+        self.in_flight = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Futures are bound to one event loop (tests and benchmarks run several)
+            self._loop = loop
+            self.in_flight = 0
+            for wc in self.classes.values():
+                wc.in_flight = 0
+                wc.waiters.clear()
+
+    def _has_room(self, wc: WorkClass) -> bool:
+        return self.in_flight < self.concurrency and wc.in_flight < wc.concurrency
+
+    def _grant(self, wc: WorkClass):
+        wc.in_flight += 1
+        self.in_flight += 1
+        wc.stats["admitted"] += 1
+
+    def estimated_wait(self, wc: WorkClass) -> float:
+        """Seconds until a new request of this class would start, from the queues ahead of it."""
+        if not wc.service_seconds:
+            return 0.0
+        ahead = sum(len(other.waiters) for other in self.classes.values() if other.priority <= wc.priority)
+        return (ahead + 1) / min(wc.concurrency, self.concurrency) * wc.service_seconds
+
+    def _dispatch(self):
+        for wc in self.classes.values():
+            while wc.waiters and self._has_room(wc):
+                waiter = wc.waiters.popleft()
+                if not waiter.done():
+                    self._grant(wc)
+                    waiter.set_result(None)
+            if self.in_flight >= self.concurrency:
+                return
+
+    def _observe(self, wc: WorkClass, waited: float, outcome: str):
+        wc.stats["wait_seconds"] += waited
+        metrics.observe_queue(wc.name, waited, outcome)
+
+    async def acquire(self, name: str):
+        """Wait for a slot in the class. Raises Overloaded when it cannot start in time."""
+        self._bind()
+        wc = self.classes[name]
+        if self._has_room(wc):
+            self._grant(wc)
+            self._observe(wc, 0.0, "admitted")
+            return
+
+        estimate = self.estimated_wait(wc)
+        if estimate > wc.max_wait:
+            wc.stats["shed"] += 1
+            self._observe(wc, 0.0, "shed")
+            raise Overloaded(f"{name} queue full (estimated wait {estimate:.1f}s)")
+
+        started = time.monotonic()
+        waiter = self._loop.create_future()
+        wc.waiters.append(waiter)
+        wc.stats["queued"] += 1
+        try:
+            await asyncio.wait_for(waiter, wc.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we gave up; pass the slot on
+                self.release(name)
+            else:
+                try:
+                    wc.waiters.remove(waiter)
+                except ValueError:
+                    pass
+            waited = time.monotonic() - started
+            if isinstance(e, asyncio.CancelledError):
+                self._observe(wc, waited, "cancelled")
+                raise
+            wc.stats["expired"] += 1
+            self._observe(wc, waited, "expired")
+            raise Overloaded(f"{name} queue wait exceeded {wc.max_wait:g}s") from None
+        self._observe(wc, time.monotonic() - started, "admitted")
+
+    def release(self, name: str, service_seconds: float | None = None):
+        wc = self.classes[name]
+        wc.in_flight = max(wc.in_flight - 1, 0)
+        self.in_flight = max(self.in_flight - 1, 0)
+        if service_seconds is not None:
+            wc.service_seconds += SERVICE_TIME_ALPHA * (service_seconds - wc.service_seconds)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, name: str | None):
+        """Hold a slot of the class for the duration of the block."""
+        if not UPSTREAM_SCHED_ENABLED or name not in self.classes:
+            yield
+            return
+        await self.acquire(name)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(name, time.monotonic() - started)
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": UPSTREAM_SCHED_ENABLED,
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "classes": {
+                wc.name: {
+                    "priority": wc.priority,
+                    "concurrency": wc.concurrency,
+                    "max_wait_seconds": wc.max_wait,
+                    "in_flight": wc.in_flight,
+                    "waiting": len(wc.waiters),
+                    "estimated_wait_seconds": round(self.estimated_wait(wc), 3),
+                    "avg_service_ms": round(wc.service_seconds * 1000, 1),
+                    **wc.stats,
+                    "wait_seconds": round(wc.stats["wait_seconds"], 3),
+                }
+                for wc in self.classes.values()
+            },
+        }
+
+
+scheduler = Scheduler(WORK_CLASSES, UPSTREAM_SCHED_CONCURRENCY)
@@ -1,4 +1,6 @@
+import type { Message, Role } from '../types';
 import { useAudioRecorder } from '../hooks/useAudioRecorder';
+import { useLiveTranscription } from '../hooks/useLiveTranscription';
 import { IconMic, IconX, IconSquareStop, IconSend } from './Icons';
 
 interface AudioRecorderProps {
@@ -66,3 +68,60 @@ export default function AudioRecorder({ onSend }: AudioRecorderProps) {
         </button>
     );
 }
+
+interface LiveAudioRecorderProps {
+    conversationId: string;
+    role: Role;
+    onMessage: (msg: Message) => void;
+    onSendingChange?: (sending: boolean) => void;
+}
+
+// Streams short segments while recording and shows the transcript as it forms;
+// Stop sends the message directly, without a preview step.
+export function LiveAudioRecorder({ conversationId, role, onMessage, onSendingChange }: LiveAudioRecorderProps) {
+    const { isRecording, transcript, recordingDuration, startRecording, stopRecording, cancelRecording } =
+        useLiveTranscription(conversationId);
+
+    const handleStart = () => {
+        startRecording(role).catch((err) => console.error('Failed to start live recording:', err));
+    };
+
+    const handleStop = async () => {
+        onSendingChange?.(true);
+        try {
+            onMessage(await stopRecording());
+        } catch (err) {
+            console.error('Live recording failed:', err);
+        } finally {
+            onSendingChange?.(false);
+        }
+    };
+
+    if (isRecording) {
+        return (
+            <div className="recording-indicator">
+                <div className="recording-dot" />
+                <span className="recording-text">{transcript || 'Listening...'}</span>
+                <span className="recording-time">{formatDuration(recordingDuration)}</span>
+                <div className="recording-actions">
+                    <button className="recording-cancel" onClick={cancelRecording}>
+                        <IconX size={14} /> Cancel
+                    </button>
+                    <button className="recording-send" onClick={handleStop}>
+                        <IconSend size={14} /> Send
+                    </button>
+                </div>
+            </div>
+        );
+    }
+
+    return (
+        <button
+            className="chat-input__mic"
+            onClick={handleStart}
+            title="Record audio message (live transcription)"
+        >
+            <IconMic size={20} />
+        </button>
+    );
+}
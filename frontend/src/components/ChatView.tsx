@@ -1,9 +1,13 @@
 import { useState, useEffect, useRef } from 'react';
 import type { Message, Role, Conversation } from '../types';
 import { LANGUAGES } from '../types';
-import { sendMessage, getMessages, uploadAudio, createWebSocket, renameConversation } from '../services/api';
+import {
+    getMessages, uploadAudio, createWebSocket, renameConversation,
+    sendMessageOverSocket, settleAck, sendTyping,
+} from '../services/api';
+import type { PendingAcks } from '../services/api';
 import MessageBubble from './MessageBubble';
-import AudioRecorder from './AudioRecorder';
+import AudioRecorder, { LiveAudioRecorder } from './AudioRecorder';
 import SearchPanel from './SearchPanel';
 import SummaryPanel from './SummaryPanel';
 import ConversationSidebar from './ConversationSidebar';
@@ -12,6 +16,9 @@ import {
     IconLanguages, IconMessageSquare, IconUserDoctor, IconUserPatient, IconEdit
 } from './Icons';
 
+// Stream voice messages in segments for live transcription instead of uploading them whole
+const LIVE_TRANSCRIPTION = import.meta.env.VITE_LIVE_TRANSCRIPTION === 'true';
+
 interface ChatViewProps {
     conversation: Conversation;
     onBack: () => void;
@@ -38,8 +45,12 @@ export default function ChatView({
     const [isEditingTitle, setIsEditingTitle] = useState(false);
     const [editTitle, setEditTitle] = useState(conversation.title);
     const [currentTitle, setCurrentTitle] = useState(conversation.title);
+    const [peerTyping, setPeerTyping] = useState<Role | null>(null);
     const messagesEndRef = useRef<HTMLDivElement>(null);
     const wsRef = useRef<WebSocket | null>(null);
+    const pendingAcksRef = useRef<PendingAcks>(new Map());
+    const typingIdRef = useRef(crypto.randomUUID());
+    const lastTypingRef = useRef(0);
     const textareaRef = useRef<HTMLTextAreaElement>(null);
     const titleInputRef = useRef<HTMLInputElement>(null);
 
@@ -62,11 +73,64 @@ export default function ChatView({
         const ws = createWebSocket(conversation.id);
         wsRef.current = ws;
 
+        const pending = pendingAcksRef.current;
+
         ws.onmessage = (event) => {
             try {
-                const msg: Message = JSON.parse(event.data);
+                const data = JSON.parse(event.data);
+                if (data.type === 'ack') {
+                    settleAck(pending, data);
+                    return;
+                }
+                if (data.type === 'typing') {
+                    if (data.client_id !== typingIdRef.current) {
+                        setPeerTyping(data.active ? data.role : null);
+                    }
+                    return;
+                }
+                if (data.type === 'error') {
+                    console.error('WebSocket error frame:', data.error);
+                    return;
+                }
+                if (data.type === 'audio_ready') {
+                    setMessages((prev) =>
+                        prev.map((m) =>
+                            m.id === data.id ? { ...m, translated_audio_url: data.translated_audio_url } : m
+                        )
+                    );
+                    return;
+                }
+                if (data.type === 'translation_delta') {
+                    setMessages((prev) => {
+                        const existing = prev.find((m) => m.id === data.id);
+                        if (existing) {
+                            return prev.map((m) =>
+                                m.id === data.id ? { ...m, translated_text: m.translated_text + data.delta } : m
+                            );
+                        }
+                        const partial: Message = {
+                            id: data.id,
+                            conversation_id: data.conversation_id,
+                            role: data.role,
+                            original_text: data.original_text,
+                            translated_text: data.delta,
+                            original_language: '',
+                            translated_language: '',
+                            audio_url: null,
+                            translated_audio_url: null,
+                            timestamp: new Date().toISOString(),
+                            streaming: true,
+                        };
+                        return [...prev, partial];
+                    });
+                    return;
+                }
+                const msg: Message = data;
+                setPeerTyping(null);
                 setMessages((prev) => {
-                    if (prev.some((m) => m.id === msg.id)) return prev;
+                    const existing = prev.find((m) => m.id === msg.id);
+                    if (existing?.streaming) return prev.map((m) => (m.id === msg.id ? msg : m));
+                    if (existing) return prev;
                     return [...prev, msg];
                 });
             } catch {
@@ -74,6 +138,11 @@ export default function ChatView({
             }
         };
 
+        ws.onclose = () => {
+            pending.forEach(({ reject }) => reject(new Error('WebSocket closed')));
+            pending.clear();
+        };
+
         const interval = setInterval(() => {
             if (ws.readyState === WebSocket.OPEN) {
                 ws.send('ping');
@@ -106,11 +175,17 @@ export default function ChatView({
 
         setInputText('');
         setSending(true);
+        lastTypingRef.current = 0;
+        sendTyping(wsRef.current, typingIdRef.current, currentRole, false);
 
         try {
-            const msg = await sendMessage(conversation.id, currentRole, text);
+            const msg = await sendMessageOverSocket(
+                wsRef.current, pendingAcksRef.current, conversation.id, currentRole, text
+            );
             setMessages((prev) => {
-                if (prev.some((m) => m.id === msg.id)) return prev;
+                const existing = prev.find((m) => m.id === msg.id);
+                if (existing?.streaming) return prev.map((m) => (m.id === msg.id ? msg : m));
+                if (existing) return prev;
                 return [...prev, msg];
             });
             setRefreshTrigger((t) => t + 1);
@@ -127,14 +202,18 @@ export default function ChatView({
         setSending(true);
         try {
             const upload = await uploadAudio(blob);
-            const msg = await sendMessage(
+            const msg = await sendMessageOverSocket(
+                wsRef.current,
+                pendingAcksRef.current,
                 conversation.id,
                 currentRole,
                 '',
                 upload.url
             );
             setMessages((prev) => {
-                if (prev.some((m) => m.id === msg.id)) return prev;
+                const existing = prev.find((m) => m.id === msg.id);
+                if (existing?.streaming) return prev.map((m) => (m.id === msg.id ? msg : m));
+                if (existing) return prev;
                 return [...prev, msg];
             });
             setRefreshTrigger((t) => t + 1);
@@ -145,6 +224,16 @@ export default function ChatView({
         }
     };
 
+    const handleLiveMessage = (msg: Message) => {
+        setMessages((prev) => {
+            const existing = prev.find((m) => m.id === msg.id);
+            if (existing?.streaming) return prev.map((m) => (m.id === msg.id ? msg : m));
+            if (existing) return prev;
+            return [...prev, msg];
+        });
+        setRefreshTrigger((t) => t + 1);
+    };
+
     // Rename conversation
     const handleRename = async () => {
         const trimmed = editTitle.trim();
@@ -176,6 +265,12 @@ export default function ChatView({
     // Auto-resize textarea
     const handleInputChange = (e: React.ChangeEvent<HTMLTextAreaElement>) => {
         setInputText(e.target.value);
+        // Announce typing at most every 3 seconds
+        const now = Date.now();
+        if (e.target.value && now - lastTypingRef.current > 3000) {
+            lastTypingRef.current = now;
+            sendTyping(wsRef.current, typingIdRef.current, currentRole, true);
+        }
         const ta = textareaRef.current;
         if (ta) {
             ta.style.height = 'auto';
@@ -294,6 +389,11 @@ export default function ChatView({
                             Translating...
                         </div>
                     )}
+                    {peerTyping && !sending && (
+                        <div className="sending-indicator">
+                            {peerTyping === 'doctor' ? 'Doctor' : 'Patient'} is typing...
+                        </div>
+                    )}
                     <div ref={messagesEndRef} />
                 </div>
 
@@ -315,7 +415,16 @@ export default function ChatView({
                                 <IconUserPatient size={14} /> Patient
                             </button>
                         </div>
-                        <AudioRecorder onSend={handleAudioSend} />
+                        {LIVE_TRANSCRIPTION ? (
+                            <LiveAudioRecorder
+                                conversationId={conversation.id}
+                                role={currentRole}
+                                onMessage={handleLiveMessage}
+                                onSendingChange={setSending}
+                            />
+                        ) : (
+                            <AudioRecorder onSend={handleAudioSend} />
+                        )}
                     </div>
 
                     <div className="chat-input__row">
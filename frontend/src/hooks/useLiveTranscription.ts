@@ -0,0 +1,173 @@
+import { useState, useRef, useCallback } from 'react';
+import type { Message, Role } from '../types';
+import { createLiveAudioSocket, uploadAudio } from '../services/api';
+
+// Each segment is a complete recording the server can transcribe on its own
+const SEGMENT_MS = 3000;
+
+interface UseLiveTranscriptionReturn {
+    isRecording: boolean;
+    transcript: string;
+    recordingDuration: number;
+    startRecording: (role: Role) => Promise<void>;
+    stopRecording: () => Promise<Message>;
+    cancelRecording: () => void;
+}
+
+function mimeType(): string {
+    return MediaRecorder.isTypeSupported('audio/webm;codecs=opus') ? 'audio/webm;codecs=opus' : 'audio/webm';
+}
+
+export function useLiveTranscription(conversationId: string): UseLiveTranscriptionReturn {
+    const [isRecording, setIsRecording] = useState(false);
+    const [transcript, setTranscript] = useState('');
+    const [recordingDuration, setRecordingDuration] = useState(0);
+    const wsRef = useRef<WebSocket | null>(null);
+    const streamRef = useRef<MediaStream | null>(null);
+    const fullRecorderRef = useRef<MediaRecorder | null>(null);
+    const fullChunksRef = useRef<Blob[]>([]);
+    const segmentRecorderRef = useRef<MediaRecorder | null>(null);
+    const activeRef = useRef(false);
+    // Segments and the stop frame are sent strictly in order
+    const sendChainRef = useRef<Promise<void>>(Promise.resolve());
+    const segmentTimerRef = useRef<ReturnType<typeof setInterval> | null>(null);
+    const clockRef = useRef<ReturnType<typeof setInterval> | null>(null);
+    const ackRef = useRef<{ clientId: string; resolve: (m: Message) => void; reject: (e: Error) => void } | null>(null);
+
+    const enqueue = (task: () => Promise<void> | void) => {
+        sendChainRef.current = sendChainRef.current.then(task).catch((err) => console.error('Live send failed:', err));
+    };
+
+    const startSegment = (stream: MediaStream) => {
+        const chunks: Blob[] = [];
+        const recorder = new MediaRecorder(stream, { mimeType: mimeType() });
+        recorder.ondataavailable = (e) => {
+            if (e.data.size > 0) chunks.push(e.data);
+        };
+        recorder.onstop = () => {
+            const blob = new Blob(chunks, { type: 'audio/webm' });
+            enqueue(async () => {
+                const ws = wsRef.current;
+                if (blob.size > 0 && ws?.readyState === WebSocket.OPEN) ws.send(await blob.arrayBuffer());
+            });
+            if (activeRef.current) startSegment(stream);
+        };
+        recorder.start();
+        segmentRecorderRef.current = recorder;
+    };
+
+    const cleanup = () => {
+        activeRef.current = false;
+        if (segmentTimerRef.current) clearInterval(segmentTimerRef.current);
+        if (clockRef.current) clearInterval(clockRef.current);
+        segmentTimerRef.current = null;
+        clockRef.current = null;
+        streamRef.current?.getTracks().forEach((track) => track.stop());
+        streamRef.current = null;
+        setIsRecording(false);
+    };
+
+    const startRecording = useCallback(async (role: Role) => {
+        const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
+        const ws = createLiveAudioSocket(conversationId);
+        const clientId = crypto.randomUUID();
+        wsRef.current = ws;
+        streamRef.current = stream;
+        sendChainRef.current = new Promise((resolve, reject) => {
+            ws.onopen = () => resolve();
+            ws.onerror = () => reject(new Error('Live audio socket failed'));
+        });
+        enqueue(() => ws.send(JSON.stringify({ type: 'start', client_id: clientId, role })));
+
+        ws.onmessage = (event) => {
+            const data = JSON.parse(event.data);
+            if (data.type === 'partial_transcript' || data.type === 'final_transcript') {
+                setTranscript(data.type === 'final_transcript' ? data.text : data.transcript);
+            } else if (data.type === 'ack' && ackRef.current?.clientId === data.client_id) {
+                if (data.ok) ackRef.current.resolve(data.message);
+                else ackRef.current.reject(new Error(data.error || 'Live recording failed'));
+                ackRef.current = null;
+                ws.close();
+            }
+        };
+        ws.onclose = () => {
+            ackRef.current?.reject(new Error('Live audio socket closed'));
+            ackRef.current = null;
+        };
+        ackRef.current = { clientId, resolve: () => {}, reject: () => {} };
+
+        // Continuous recording of the whole message, uploaded for playback
+        fullChunksRef.current = [];
+        const full = new MediaRecorder(stream, { mimeType: mimeType() });
+        full.ondataavailable = (e) => {
+            if (e.data.size > 0) fullChunksRef.current.push(e.data);
+        };
+        full.start(100);
+        fullRecorderRef.current = full;
+
+        activeRef.current = true;
+        startSegment(stream);
+        segmentTimerRef.current = setInterval(() => segmentRecorderRef.current?.stop(), SEGMENT_MS);
+
+        setTranscript('');
+        setRecordingDuration(0);
+        setIsRecording(true);
+        clockRef.current = setInterval(() => setRecordingDuration((d) => d + 1), 1000);
+    }, [conversationId]);
+
+    const stopRecording = useCallback((): Promise<Message> => {
+        const pending = ackRef.current;
+        const full = fullRecorderRef.current;
+        if (!pending || !full) {
+            // The server already rejected this recording (e.g. unknown conversation)
+            activeRef.current = false;
+            segmentRecorderRef.current?.stop();
+            full?.stop();
+            cleanup();
+            return Promise.reject(new Error('Live recording was rejected'));
+        }
+
+        const acked = new Promise<Message>((resolve, reject) => {
+            ackRef.current = { clientId: pending.clientId, resolve, reject };
+        });
+        const fullBlob = new Promise<Blob>((resolve) => {
+            full.onstop = () => resolve(new Blob(fullChunksRef.current, { type: 'audio/webm' }));
+        });
+
+        // The final segment is queued by its recorder's onstop handler, which
+        // runs before this listener, so the stop frame always follows it
+        const segment = segmentRecorderRef.current;
+        const lastSegmentQueued = new Promise<void>((resolve) => {
+            if (!segment || segment.state === 'inactive') resolve();
+            else segment.addEventListener('stop', () => resolve());
+        });
+
+        activeRef.current = false;
+        segment?.stop();
+        full.stop();
+        cleanup();
+
+        lastSegmentQueued.then(() =>
+            enqueue(async () => {
+                const upload = await uploadAudio(await fullBlob).catch(() => null);
+                wsRef.current?.send(JSON.stringify({ type: 'stop', audio_url: upload?.url ?? null }));
+            })
+        );
+        return acked;
+    }, []);
+
+    const cancelRecording = useCallback(() => {
+        activeRef.current = false;
+        segmentRecorderRef.current?.stop();
+        fullRecorderRef.current?.stop();
+        cleanup();
+        ackRef.current = null;
+        enqueue(() => {
+            wsRef.current?.send(JSON.stringify({ type: 'cancel' }));
+            wsRef.current?.close();
+        });
+        setTranscript('');
+    }, []);
+
+    return { isRecording, transcript, recordingDuration, startRecording, stopRecording, cancelRecording };
+}
@@ -105,5 +105,61 @@ export function getAudioUrl(path: string): string {
 // WebSocket
 export function createWebSocket(conversationId: string): WebSocket {
     const wsBase = API_BASE.replace(/^http/, 'ws');
-    return new WebSocket(`${wsBase}/ws/${conversationId}`);
+    return new WebSocket(`${wsBase}/api/ws/${conversationId}`);
+}
+
+// Streaming audio channel for live transcription (see useLiveTranscription)
+export function createLiveAudioSocket(conversationId: string): WebSocket {
+    const wsBase = API_BASE.replace(/^http/, 'ws');
+    const ws = new WebSocket(`${wsBase}/api/ws/${conversationId}/audio`);
+    ws.binaryType = 'arraybuffer';
+    return ws;
+}
+
+export interface SocketAck {
+    type: 'ack';
+    client_id: string;
+    ok: boolean;
+    message?: Message;
+    error?: string;
+}
+
+export type PendingAcks = Map<string, { resolve: (msg: Message) => void; reject: (err: Error) => void }>;
+
+// Send a chat turn as a WebSocket frame; resolves when the server acks it.
+// Falls back to POST /api/messages when the socket is not open.
+export function sendMessageOverSocket(
+    ws: WebSocket | null,
+    pending: PendingAcks,
+    conversationId: string,
+    role: string,
+    text: string,
+    audioUrl?: string
+): Promise<Message> {
+    if (!ws || ws.readyState !== WebSocket.OPEN) {
+        return sendMessage(conversationId, role, text, audioUrl);
+    }
+    const clientId = crypto.randomUUID();
+    const frame = audioUrl
+        ? { type: 'send_audio', client_id: clientId, role, audio_url: audioUrl }
+        : { type: 'send_text', client_id: clientId, role, text };
+    return new Promise((resolve, reject) => {
+        pending.set(clientId, { resolve, reject });
+        ws.send(JSON.stringify(frame));
+    });
+}
+
+// Resolve or reject the pending send for an ack frame
+export function settleAck(pending: PendingAcks, ack: SocketAck) {
+    const entry = pending.get(ack.client_id);
+    if (!entry) return;
+    pending.delete(ack.client_id);
+    if (ack.ok && ack.message) entry.resolve(ack.message);
+    else entry.reject(new Error(ack.error || 'Send failed'));
+}
+
+export function sendTyping(ws: WebSocket | null, clientId: string, role: string, active: boolean) {
+    if (ws && ws.readyState === WebSocket.OPEN) {
+        ws.send(JSON.stringify({ type: 'typing', client_id: clientId, role, active }));
+    }
 }
@@ -19,6 +19,9 @@ export interface Message {
     audio_url: string | null;
     translated_audio_url: string | null;
     timestamp: string;
+    audio_pending?: boolean;
+    streaming?: boolean;
+    timings?: Record<string, number>;
 }
 
 export interface SearchResult {